@@ -6,6 +6,9 @@ from .google_calendar import (
     get_busy_slots
 )
 from .monitor import calendar_monitor, CalendarMonitor
+from .outbox_worker import booking_outbox_worker, BookingOutboxWorker
+from .scheduler import monitor_scheduler, MonitorScheduler
+from .ownership import shard_ownership, ShardOwnership
 
 __all__ = [
     'get_calendar_service',
@@ -14,5 +17,11 @@ __all__ = [
     'get_busy_slots',
     'get_calendar_events',
     'calendar_monitor',
-    'CalendarMonitor'
+    'CalendarMonitor',
+    'booking_outbox_worker',
+    'BookingOutboxWorker',
+    'monitor_scheduler',
+    'MonitorScheduler',
+    'shard_ownership',
+    'ShardOwnership'
 ]
\ No newline at end of file
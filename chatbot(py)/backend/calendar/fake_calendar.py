@@ -0,0 +1,325 @@
+# backend/calendar/fake_calendar.py
+import datetime
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Callable
+
+logger = logging.getLogger(__name__)
+
+class FakeHttpError(Exception):
+    """A googleapiclient HttpError-jához hasonló hiba (a szövegben benne a státuszkód)"""
+
+    def __init__(self, status: int, reason: str):
+        self.status = status
+        self.reason = reason
+        super().__init__(f"<HttpError {status} \"{reason}\">")
+
+class _FakeRequest:
+    """Lusta kérés - csak execute()-ra fut le, mint a valódi kliensben"""
+
+    def __init__(self, service: "FakeCalendarService", method: str, func: Callable[[], dict]):
+        self._service = service
+        self.method = method
+        self._func = func
+
+    def execute(self, num_retries: int = 0):
+        return self._service._run(self.method, self._func)
+
+class _FakeBatchRequest:
+    """new_batch_http_request() megfelelője"""
+
+    def __init__(self, service: "FakeCalendarService", callback: Optional[Callable] = None):
+        self._service = service
+        self._callback = callback
+        self._requests = []
+
+    def add(self, request: _FakeRequest, callback: Optional[Callable] = None, request_id: str = None):
+        request_id = request_id or str(len(self._requests) + 1)
+        self._requests.append((request_id, request, callback or self._callback))
+
+    def execute(self):
+        # Egy batch egy HTTP körút: a késleltetés egyszer számít, a hibák kérésenként
+        self._service._sleep_latency()
+        for request_id, request, callback in self._requests:
+            response, exception = None, None
+            try:
+                response = self._service._run(request.method, request._func, apply_latency=False)
+            except FakeHttpError as e:
+                exception = e
+            if callback:
+                callback(request_id, response, exception)
+
+class _FakeEventsResource:
+    def __init__(self, service: "FakeCalendarService"):
+        self._service = service
+
+    def insert(self, calendarId: str, body: dict, **kwargs) -> _FakeRequest:
+        return _FakeRequest(self._service, "events.insert",
+                            lambda: self._service._insert_event(calendarId, body))
+
+    def get(self, calendarId: str, eventId: str, **kwargs) -> _FakeRequest:
+        return _FakeRequest(self._service, "events.get",
+                            lambda: self._service._get_event(calendarId, eventId))
+
+    def delete(self, calendarId: str, eventId: str, **kwargs) -> _FakeRequest:
+        return _FakeRequest(self._service, "events.delete",
+                            lambda: self._service._delete_event(calendarId, eventId))
+
+    def list(self, calendarId: str, syncToken: str = None, pageToken: str = None,
+             maxResults: int = 250, showDeleted: bool = False,
+             timeMin: str = None, timeMax: str = None, **kwargs) -> _FakeRequest:
+        return _FakeRequest(self._service, "events.list",
+                            lambda: self._service._list_events(calendarId, syncToken, pageToken,
+                                                               maxResults, showDeleted, timeMin, timeMax))
+
+class _FakeFreebusyResource:
+    def __init__(self, service: "FakeCalendarService"):
+        self._service = service
+
+    def query(self, body: dict, **kwargs) -> _FakeRequest:
+        return _FakeRequest(self._service, "freebusy.query",
+                            lambda: self._service._freebusy(body))
+
+class FakeCalendarService:
+    """In-process Google Calendar hamisítvány integrációs és terheléses tesztekhez.
+
+    A googleapiclient `build("calendar", "v3")` objektumának általunk használt
+    részhalmazát valósítja meg, állítható késleltetéssel és hibainjektálással.
+    """
+
+    def __init__(self, latency_ms: float = 0.0, latency_jitter_ms: float = 0.0,
+                 error_rate: float = 0.0, seed: Optional[int] = None):
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.RLock()
+        self._calendars: Dict[str, Dict[str, dict]] = {}  # calendar_id -> {event_id: event}
+        self._sequence: Dict[str, int] = {}               # calendar_id -> változásszámláló
+        self._forced_errors: List[tuple] = []             # (method vagy None, status, reason)
+        self.call_counts: Dict[str, int] = {}
+
+    # --- Konfiguráció / tesztsegédek ---
+
+    def fail_next(self, status: int = 500, reason: str = "backendError", method: str = None, count: int = 1):
+        """A következő `count` híváskor (opcionálisan csak `method`-nál) hibát dob"""
+        with self._lock:
+            self._forced_errors.extend([(method, status, reason)] * count)
+
+    def seed_events(self, calendar_id: str, events: List[dict]):
+        """Események betöltése közvetlenül (késleltetés és hibák nélkül)"""
+        for event in events:
+            self._insert_event(calendar_id, event)
+
+    def reset(self):
+        """Teljes állapot törlése"""
+        with self._lock:
+            self._calendars.clear()
+            self._sequence.clear()
+            self._forced_errors.clear()
+            self.call_counts.clear()
+
+    # --- googleapiclient-kompatibilis felület ---
+
+    def events(self) -> _FakeEventsResource:
+        return _FakeEventsResource(self)
+
+    def freebusy(self) -> _FakeFreebusyResource:
+        return _FakeFreebusyResource(self)
+
+    def new_batch_http_request(self, callback: Optional[Callable] = None) -> _FakeBatchRequest:
+        return _FakeBatchRequest(self, callback)
+
+    # --- Belső működés ---
+
+    def _sleep_latency(self):
+        delay_ms = self.latency_ms
+        if self.latency_jitter_ms:
+            delay_ms += self._random.uniform(0, self.latency_jitter_ms)
+        if delay_ms > 0:
+            time.sleep(delay_ms / 1000.0)
+
+    def _run(self, method: str, func: Callable[[], dict], apply_latency: bool = True):
+        if apply_latency:
+            self._sleep_latency()
+
+        with self._lock:
+            self.call_counts[method] = self.call_counts.get(method, 0) + 1
+
+            for index, (forced_method, status, reason) in enumerate(self._forced_errors):
+                if forced_method is None or forced_method == method:
+                    del self._forced_errors[index]
+                    raise FakeHttpError(status, reason)
+
+            if self.error_rate and self._random.random() < self.error_rate:
+                raise FakeHttpError(503, "Service Unavailable (injected)")
+
+            return func()
+
+    def _next_sequence(self, calendar_id: str) -> int:
+        self._sequence[calendar_id] = self._sequence.get(calendar_id, 0) + 1
+        return self._sequence[calendar_id]
+
+    def _insert_event(self, calendar_id: str, body: dict) -> dict:
+        with self._lock:
+            calendar = self._calendars.setdefault(calendar_id, {})
+            event_id = body.get("id") or uuid.uuid4().hex
+            if event_id in calendar:
+                # A valódi API törölt ID-t sem enged újra felhasználni
+                raise FakeHttpError(409, "The requested identifier already exists.")
+
+            now = datetime.datetime.now(datetime.timezone.utc).isoformat().replace("+00:00", "Z")
+            sequence = self._next_sequence(calendar_id)
+            event = dict(body)
+            event.update({
+                "id": event_id,
+                "status": body.get("status", "confirmed"),
+                "etag": f"\"{sequence}\"",
+                "created": now,
+                "updated": now,
+                "_seq": sequence,
+            })
+            calendar[event_id] = event
+            return self._public(event)
+
+    def _get_event(self, calendar_id: str, event_id: str) -> dict:
+        with self._lock:
+            event = self._calendars.get(calendar_id, {}).get(event_id)
+            if event is None:
+                raise FakeHttpError(404, "Not Found")
+            return self._public(event)
+
+    def _delete_event(self, calendar_id: str, event_id: str) -> dict:
+        with self._lock:
+            event = self._calendars.get(calendar_id, {}).get(event_id)
+            if event is None:
+                raise FakeHttpError(404, "Not Found")
+            if event["status"] == "cancelled":
+                raise FakeHttpError(410, "Resource has been deleted")
+            sequence = self._next_sequence(calendar_id)
+            event.update({
+                "status": "cancelled",
+                "etag": f"\"{sequence}\"",
+                "updated": datetime.datetime.now(datetime.timezone.utc).isoformat().replace("+00:00", "Z"),
+                "_seq": sequence,
+            })
+            return {}
+
+    def update_event_time(self, calendar_id: str, event_id: str,
+                          start_dt: datetime.datetime, end_dt: datetime.datetime):
+        """Esemény áthelyezése (a szalon oldali módosítás szimulálásához)"""
+        with self._lock:
+            event = self._calendars.get(calendar_id, {}).get(event_id)
+            if event is None:
+                raise FakeHttpError(404, "Not Found")
+            sequence = self._next_sequence(calendar_id)
+            event["start"] = {"dateTime": start_dt.isoformat(), "timeZone": "Europe/Budapest"}
+            event["end"] = {"dateTime": end_dt.isoformat(), "timeZone": "Europe/Budapest"}
+            event["etag"] = f"\"{sequence}\""
+            event["updated"] = datetime.datetime.now(datetime.timezone.utc).isoformat().replace("+00:00", "Z")
+            event["_seq"] = sequence
+
+    def _list_events(self, calendar_id: str, sync_token: Optional[str], page_token: Optional[str],
+                     max_results: int, show_deleted: bool,
+                     time_min: Optional[str], time_max: Optional[str]) -> dict:
+        with self._lock:
+            events = sorted(self._calendars.get(calendar_id, {}).values(), key=lambda e: e["_seq"])
+            current_sequence = self._sequence.get(calendar_id, 0)
+
+            if sync_token is not None:
+                try:
+                    since = int(sync_token)
+                except ValueError:
+                    raise FakeHttpError(410, "Sync token is no longer valid, a full sync is required.")
+                if since > current_sequence:
+                    raise FakeHttpError(410, "Sync token is no longer valid, a full sync is required.")
+                # Inkrementális szinkron: minden változás, a törléseket is beleértve
+                events = [e for e in events if e["_seq"] > since]
+            else:
+                if not show_deleted:
+                    events = [e for e in events if e["status"] != "cancelled"]
+                if time_min or time_max:
+                    range_start = _parse_dt(time_min) if time_min else None
+                    range_end = _parse_dt(time_max) if time_max else None
+                    events = [e for e in events if _event_in_range(e, range_start, range_end)]
+
+            offset = int(page_token) if page_token else 0
+            page = events[offset:offset + max_results]
+            response = {"kind": "calendar#events", "items": [self._public(e) for e in page]}
+            if offset + max_results < len(events):
+                response["nextPageToken"] = str(offset + max_results)
+            else:
+                response["nextSyncToken"] = str(current_sequence)
+            return response
+
+    def _freebusy(self, body: dict) -> dict:
+        range_start = _parse_dt(body["timeMin"])
+        range_end = _parse_dt(body["timeMax"])
+
+        with self._lock:
+            calendars = {}
+            for item in body.get("items", []):
+                calendar_id = item["id"]
+                busy = []
+                for event in self._calendars.get(calendar_id, {}).values():
+                    if event["status"] == "cancelled" or "dateTime" not in event.get("start", {}):
+                        continue
+                    start = _parse_dt(event["start"]["dateTime"])
+                    end = _parse_dt(event["end"]["dateTime"])
+                    if start < range_end and end > range_start:
+                        busy.append((max(start, range_start), min(end, range_end)))
+                busy.sort()
+                calendars[calendar_id] = {
+                    "busy": [{"start": _format_utc(s), "end": _format_utc(e)} for s, e in busy]
+                }
+            return {"kind": "calendar#freeBusy", "calendars": calendars}
+
+    @staticmethod
+    def _public(event: dict) -> dict:
+        return {k: v for k, v in event.items() if not k.startswith("_")}
+
+def _parse_dt(value: str) -> datetime.datetime:
+    """ISO időpont -> aware datetime (naiv érték Europe/Budapest téli időnek számít)"""
+    dt = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=datetime.timezone(datetime.timedelta(hours=1)))
+    return dt
+
+def _format_utc(dt: datetime.datetime) -> str:
+    return dt.astimezone(datetime.timezone.utc).isoformat().replace("+00:00", "Z")
+
+def _event_in_range(event: dict, range_start, range_end) -> bool:
+    if "dateTime" not in event.get("start", {}):
+        return True
+    start = _parse_dt(event["start"]["dateTime"])
+    end = _parse_dt(event["end"]["dateTime"])
+    if range_start and end <= range_start:
+        return False
+    if range_end and start >= range_end:
+        return False
+    return True
+
+_fake_service: Optional[FakeCalendarService] = None
+_fake_service_lock = threading.Lock()
+
+def get_fake_calendar_service() -> FakeCalendarService:
+    """Process-szintű fake példány (állapota a hívások között megmarad)"""
+    global _fake_service
+    with _fake_service_lock:
+        if _fake_service is None:
+            seed = os.getenv("FAKE_CALENDAR_SEED")
+            _fake_service = FakeCalendarService(
+                latency_ms=float(os.getenv("FAKE_CALENDAR_LATENCY_MS", "0")),
+                latency_jitter_ms=float(os.getenv("FAKE_CALENDAR_LATENCY_JITTER_MS", "0")),
+                error_rate=float(os.getenv("FAKE_CALENDAR_ERROR_RATE", "0")),
+                seed=int(seed) if seed else None,
+            )
+            logger.info(
+                f"🧪 Fake Google Calendar aktív (latency: {_fake_service.latency_ms} ms, "
+                f"hibaarány: {_fake_service.error_rate})"
+            )
+        return _fake_service
@@ -1,24 +1,34 @@
 # backend/calendar/google_calendar.py
 import datetime
 import logging
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
+import os
 from typing import List, Tuple
 
 logger = logging.getLogger(__name__)
 
-SERVICE_ACCOUNT_FILE = "d:/wired-victor-472511-g0-1512c0260e32.json"
+SERVICE_ACCOUNT_FILE = os.getenv("GOOGLE_SERVICE_ACCOUNT_FILE", "d:/wired-victor-472511-g0-1512c0260e32.json")
 SCOPES = ["https://www.googleapis.com/auth/calendar"]
 
+# "google" = valódi API, "fake" = in-process hamisítvány (backend/calendar/fake_calendar.py)
+CALENDAR_BACKEND = os.getenv("CALENDAR_BACKEND", "google").strip().lower()
+
 def get_calendar_service():
-    """Google Calendar service létrehozása"""
+    """Google Calendar service létrehozása (vagy a fake, ha CALENDAR_BACKEND=fake)"""
+    if CALENDAR_BACKEND == "fake":
+        from .fake_calendar import get_fake_calendar_service
+        return get_fake_calendar_service()
+    
+    from google.oauth2 import service_account
+    from googleapiclient.discovery import build
+    
     credentials = service_account.Credentials.from_service_account_file(
         SERVICE_ACCOUNT_FILE, scopes=SCOPES
     )
     return build("calendar", "v3", credentials=credentials, cache_discovery=False)
 
-def create_event(start_dt: datetime.datetime, calendar_id: str, service_name: str, duration_minutes: int = 60):
-    """Esemény létrehozása"""
+def create_event(start_dt: datetime.datetime, calendar_id: str, service_name: str, duration_minutes: int = 60,
+                 event_id: str = None):
+    """Esemény létrehozása (opcionális, kliens által megadott event ID-val)"""
     service = get_calendar_service()
     
     end_dt = start_dt + datetime.timedelta(minutes=duration_minutes)
@@ -28,6 +38,9 @@ def create_event(start_dt: datetime.datetime, calendar_id: str, service_name: st
         "start": {"dateTime": start_dt.isoformat(), "timeZone": "Europe/Budapest"},
         "end": {"dateTime": end_dt.isoformat(), "timeZone": "Europe/Budapest"},
     }
+    if event_id:
+        # Idempotencia: ugyanazzal az ID-val a második insert 409-et ad
+        event["id"] = event_id
     
     try:
         result = service.events().insert(calendarId=calendar_id, body=event).execute()
@@ -2,7 +2,7 @@
 import asyncio
 import logging
 import datetime
-from typing import Dict, Set
+from typing import Dict, Set, Tuple, Optional
 import os
 import sys
 
@@ -16,82 +16,136 @@ class CalendarMonitor:
     
     def __init__(self):
         self.is_running = False
+        # (salon_name, event_id) -> utoljára látott Calendar etag / updated
+        self._event_etags: Dict[Tuple[str, str], str] = {}
     
     async def start_monitoring(self, application, salon_name: str, calendar_id: str):
-        """Monitor indítása - IDŐPONT ÉRTESÍTÉSSEL"""
+        """Monitor indítása - IDŐPONT ÉRTESÍTÉSSEL (egy szalon, fix intervallum)"""
         self.is_running = True
         logger.info(f"🔍 Monitor elindítva: {salon_name}")
         
         while self.is_running:
             try:
                 await asyncio.sleep(10)  # 5 perc
+                await self.check_salon_once(application, salon_name, calendar_id)
                 
-                # 1. CSAK A SAJÁT ESEMÉNYEINKET KÉRJÜK LE
-                from backend.database.event_operations import get_all_events_from_database
-                our_events = await get_all_events_from_database(salon_name)
-                
-                logger.info(f"🔍 {len(our_events)} saját esemény ellenőrzése")
+            except Exception as e:
+                logger.error(f"❌ Hiba a monitorban ({salon_name}): {e}")
+                await asyncio.sleep(300)
+
+    async def check_salon_once(self, application, salon_name: str, calendar_id: str) -> int:
+        """Egy ellenőrzési ciklus egy szalonra - visszaadja az észlelt változások számát"""
+        changes = 0
+        failures = 0
+        
+        # 1. CSAK A SAJÁT ESEMÉNYEINKET KÉRJÜK LE
+        from backend.database.event_operations import get_all_events_from_database
+        our_events = await get_all_events_from_database(salon_name)
+        
+        logger.info(f"🔍 {len(our_events)} saját esemény ellenőrzése")
+        
+        # 2. MINDEN SAJÁT ESEMÉNYT ELLENŐRZÜNK
+        from backend.calendar.google_calendar import get_event
+        from backend.database.event_operations import update_event_status, update_event_times_batch
+        from backend.notifications.telegram_queue import get_notification_queue
+        from backend.notifications.reminders import reminder_scheduler
+        
+        time_updates = []
+        # Az új etagek csak a DB frissítés után kerülnek a cache-be - hiba esetén a
+        # következő ciklus újra összeveti az időpontot
+        pending_etags: Dict[Tuple[str, str], str] = {}
+        
+        for event_data in our_events:
+            event_id = event_data['event_id']
+            chat_id = event_data['chat_id']
+            service_name = event_data['service']
+            event_date = event_data['event_date']
+            start_time = event_data['start_time']
+            end_time = event_data['end_time']
+            formatted_time = f"{event_date} {start_time}"
+            
+            try:
+                # 3. MEGNÉZZÜK, LÉTEZIK-E MÉG - ÉS IDŐPONT ADATOKAT GYŰJTÜNK
+                # A Google kliens blokkoló, ezért külön szálon fut
+                event = await asyncio.to_thread(get_event, event_id, calendar_id)
                 
-                # 2. MINDEN SAJÁT ESEMÉNYT ELLENŐRZÜNK
-                from backend.calendar.google_calendar import get_event
-                from backend.database.event_operations import update_event_status
+                # ✅ Még létezik - csak valódi időpont változást írunk vissza
+                time_update = self._detect_time_change(salon_name, event_data, event, pending_etags)
+                if time_update:
+                    time_updates.append((chat_id, event_id) + time_update)
                 
-                for event_data in our_events:
-                    event_id = event_data['event_id']
-                    chat_id = event_data['chat_id']
-                    service_name = event_data['service']
-                    event_date = event_data['event_date']
-                    start_time = event_data['start_time']
-                    end_time = event_data['end_time']
-                    formatted_time = f"{event_date} {start_time}"
+            except Exception as e:
+                # ❌ NEM LÉTEZIK - ÉRTESÍTJÜK IDŐPONTTAL
+                if "Event not found" in str(e) or "404" in str(e) or "cancelled" in str(e):
+                    logger.warning(f"🗑️ ESEMÉNY TÖRÖLVE: {event_id} (User: {chat_id})")
+                    changes += 1
+                    self._event_etags.pop((salon_name, event_id), None)
                     
                     try:
-                        # 3. MEGNÉZZÜK, LÉTEZIK-E MÉG - ÉS IDŐPONT ADATOKAT GYŰJTÜNK
-                        event = get_event(event_id, calendar_id)
+                        # ⏰ IDŐPONT FORMÁZÁSA
+                        event_time = self._format_event_time_for_message(event_data)
                         
-                        # ✅ Még létezik - frissítjük az időpont adatokat
-                        await self._update_event_time_from_google(salon_name, event_id, event, chat_id)
+                        # 📧 ÉRTESÍTJÜK A FELHASZNÁLÓT - IDŐPONTTAL
+                        message = (
+                            "❌ <b>IDŐPONT TÖRÖLVE</b>\n\n"
+                            "Az alábbi időpontot törölték a naptárból:\n"
+                            f"💇 <b>Szolgáltatás:</b> {service_name}\n"
+                            f"🏪 <b>Szalon:</b> {salon_name}\n\n"
+                            f"📅 Dátum: {event_date}\n"
+                            f"⏰ Időtartam: {formatted_time}\n"
+                            "Új időpontot foglalhatsz a <code>/idopont</code> paranccsal."
+                        )
                         
-                    except Exception as e:
-                        # ❌ NEM LÉTEZIK - ÉRTESÍTJÜK IDŐPONTTAL
-                        if "Event not found" in str(e) or "404" in str(e) or "cancelled" in str(e):
-                            logger.warning(f"🗑️ ESEMÉNY TÖRÖLVE: {event_id} (User: {chat_id})")
-                            
-                            try:
-                                # ⏰ IDŐPONT FORMÁZÁSA
-                                event_time = self._format_event_time_for_message(event_data)
-                                
-                                # 📧 ÉRTESÍTJÜK A FELHASZNÁLÓT - IDŐPONTTAL
-                                message = (
-                                    "❌ <b>IDŐPONT TÖRÖLVE</b>\n\n"
-                                    "Az alábbi időpontot törölték a naptárból:\n"
-                                    f"💇 <b>Szolgáltatás:</b> {service_name}\n"
-                                    f"🏪 <b>Szalon:</b> {salon_name}\n\n"
-                                    f"📅 Dátum: {event_date}\n"
-                                    f"⏰ Időtartam: {formatted_time}\n"
-                                    "Új időpontot foglalhatsz a <code>/idopont</code> paranccsal."
-                                )
-                                
-                                await application.bot.send_message(
-                                    chat_id=chat_id,
-                                    text=message,
-                                    parse_mode='HTML'
-                                )
-                                logger.info(f"✅ Értesítés elküldve: {chat_id}")
-                                
-                                # 💾 ADATBÁZIS FRISSÍTÉSE (0 → 3)
-                                await update_event_status(salon_name, chat_id, event_id, 3)
-                                logger.info(f"✅ Státusz frissítve: {event_id} (0 → 3)")
-                                
-                            except Exception as notify_error:
-                                logger.error(f"❌ Hiba az értesítés küldésénél: {notify_error}")
-                                
-                        else:
-                            logger.error(f"❌ Egyéb hiba: {event_id} - {e}")
-                
-            except Exception as e:
-                logger.error(f"❌ Hiba a monitorban ({salon_name}): {e}")
-                await asyncio.sleep(300)
+                        # A kimenő sor kezeli a rate limitet és az újrapróbálást,
+                        # így a monitor ciklus nem blokkol tömeges törlésnél
+                        get_notification_queue(application).enqueue(chat_id, message, parse_mode='HTML')
+                        logger.info(f"📨 Értesítés sorba állítva: {chat_id}")
+                        
+                        # 💾 ADATBÁZIS FRISSÍTÉSE (0 → 3)
+                        await update_event_status(salon_name, chat_id, event_id, 3)
+                        logger.info(f"✅ Státusz frissítve: {event_id} (0 → 3)")
+                        
+                        # ⏰ Törölt időponthoz nem megy emlékeztető
+                        await reminder_scheduler.cancel(salon_name, event_id)
+                        
+                    except Exception as notify_error:
+                        logger.error(f"❌ Hiba az értesítés küldésénél: {notify_error}")
+                        
+                else:
+                    failures += 1
+                    logger.error(f"❌ Egyéb hiba: {event_id} - {e}")
+        
+        # Már nem aktív események etagjeinek eldobása
+        active_keys = {(salon_name, event_data['event_id']) for event_data in our_events}
+        for key in [k for k in self._event_etags if k[0] == salon_name and k not in active_keys]:
+            del self._event_etags[key]
+        
+        # 4. IDŐPONT VÁLTOZÁSOK EGY TRANZAKCIÓBAN
+        changed_keys = {(salon_name, event_id) for _, event_id, _, _, _ in time_updates}
+        for key, etag in pending_etags.items():
+            if key not in changed_keys:
+                self._event_etags[key] = etag
+        
+        if time_updates:
+            updated = await update_event_times_batch(salon_name, time_updates)
+            changes += updated
+            if updated:
+                for key in changed_keys:
+                    if key in pending_etags:
+                        self._event_etags[key] = pending_etags[key]
+                for _, event_id, event_date, start_time, _ in time_updates:
+                    new_start = datetime.datetime.strptime(f"{event_date} {start_time}", '%Y-%m-%d %H:%M')
+                    reminder_scheduler.reschedule(salon_name, event_id, new_start)
+            else:
+                # Visszagörgetett köteg: a régi etag se maradjon, így újra diffeljük
+                for key in changed_keys:
+                    self._event_etags.pop(key, None)
+        
+        # Ha egyetlen ellenőrzés sem sikerült, a Calendar elérhetetlen - a hívó lassít
+        if our_events and failures == len(our_events):
+            raise RuntimeError(f"Calendar nem elérhető ({salon_name}): {failures} sikertelen lekérés")
+        
+        return changes
 
     def _format_event_time_for_message(self, event_data: dict) -> str:
         """Időpont formázása az üzenethez"""
@@ -122,35 +176,82 @@ class CalendarMonitor:
             logger.error(f"❌ Hiba az időpont formázásánál: {e}")
             return "Ismeretlen időpont"
 
-    async def _update_event_time_from_google(self, salon_name: str, event_id: str, event: dict, chat_id: int):
-        """Időpont adatok frissítése Google Calendar-ból"""
+    def _detect_time_change(self, salon_name: str, event_data: dict, event: dict,
+                            pending_etags: Dict[Tuple[str, str], str]) -> Optional[Tuple[str, str, Optional[str]]]:
+        """Etag alapú változásészlelés - (event_date, start_time, end_time), ha az időpont tényleg változott
+
+        A látott etag a `pending_etags`-be kerül; a hívó a sikeres mentés után véglegesíti.
+        """
+        key = (salon_name, event_data['event_id'])
+        etag = event.get('etag') or event.get('updated')
+        
+        # Változatlan etag: az eseményhez nem nyúltak, nincs mit összevetni
+        if etag and self._event_etags.get(key) == etag:
+            return None
+        
         try:
-            from backend.database.event_operations import update_event_time
-            
-            start = event.get('start', {})
-            end = event.get('end', {})
-            
-            start_time_str = start.get('dateTime', '')
-            end_time_str = end.get('dateTime', '')
-            
-            if start_time_str:
-                # ISO string feldolgozása
-                start_dt = datetime.datetime.fromisoformat(start_time_str.replace('Z', '+00:00'))
-                
-                event_date = start_dt.strftime('%Y-%m-%d')
-                start_time = start_dt.strftime('%H:%M')
-                
-                end_time = None
-                if end_time_str:
-                    end_dt = datetime.datetime.fromisoformat(end_time_str.replace('Z', '+00:00'))
-                    end_time = end_dt.strftime('%H:%M')
-                
-                # Frissítjük az adatbázist
-                await update_event_time(salon_name, event_id, event_date, start_time, end_time, chat_id)
-                logger.info(f"✅ Esemény idő frissítve: {event_id} - {event_date} {start_time}")
-                
+            new_time = self._extract_event_time(event)
         except Exception as e:
-            logger.error(f"❌ Hiba az esemény idő frissítésénél: {e}")
+            logger.error(f"❌ Hiba az esemény idő feldolgozásánál: {e}")
+            return None
+        
+        if etag:
+            pending_etags[key] = etag
+        
+        if new_time is None:
+            return None
+        
+        stored_time = (
+            self._normalize_db_date(event_data.get('event_date')),
+            self._normalize_db_time(event_data.get('start_time')),
+            self._normalize_db_time(event_data.get('end_time'))
+        )
+        if new_time == stored_time:
+            return None
+        
+        logger.info(f"🔁 Időpont változott: {event_data['event_id']} - {stored_time} → {new_time}")
+        return new_time
+
+    @staticmethod
+    def _extract_event_time(event: dict) -> Optional[Tuple[str, str, Optional[str]]]:
+        """Google esemény időpontja (YYYY-MM-DD, HH:MM, HH:MM) formában"""
+        start_time_str = event.get('start', {}).get('dateTime', '')
+        end_time_str = event.get('end', {}).get('dateTime', '')
+        
+        if not start_time_str:
+            return None
+        
+        # ISO string feldolgozása
+        start_dt = datetime.datetime.fromisoformat(start_time_str.replace('Z', '+00:00'))
+        
+        end_time = None
+        if end_time_str:
+            end_dt = datetime.datetime.fromisoformat(end_time_str.replace('Z', '+00:00'))
+            end_time = end_dt.strftime('%H:%M')
+        
+        return start_dt.strftime('%Y-%m-%d'), start_dt.strftime('%H:%M'), end_time
+
+    @staticmethod
+    def _normalize_db_date(value) -> Optional[str]:
+        """MySQL DATE -> YYYY-MM-DD"""
+        if value is None:
+            return None
+        if hasattr(value, 'strftime'):
+            return value.strftime('%Y-%m-%d')
+        return str(value)[:10]
+
+    @staticmethod
+    def _normalize_db_time(value) -> Optional[str]:
+        """MySQL TIME (timedelta / time / str) -> HH:MM"""
+        if value is None:
+            return None
+        if isinstance(value, datetime.timedelta):
+            total_minutes = int(value.total_seconds()) // 60
+            return f"{total_minutes // 60:02d}:{total_minutes % 60:02d}"
+        if hasattr(value, 'strftime'):
+            return value.strftime('%H:%M')
+        hour, minute = str(value).split(':')[:2]
+        return f"{int(hour):02d}:{int(minute):02d}"
 
     def stop_monitoring(self):
         """Monitor leállítása"""
@@ -0,0 +1,142 @@
+# backend/calendar/outbox_worker.py
+import asyncio
+import logging
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+class BookingOutboxWorker:
+    """Foglalási outbox feldolgozó - Calendar események aszinkron létrehozása"""
+
+    def __init__(self, batch_size: int = 20, max_attempts: int = 8,
+                 idle_interval: float = 30.0, max_backoff: int = 900):
+        self.is_running = False
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.idle_interval = idle_interval
+        self.max_backoff = max_backoff
+        self.salons: Dict[str, Dict[str, Any]] = {}  # salon_name -> {calendar_id, application}
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def register_salon(self, salon_name: str, calendar_id: str, application=None):
+        """Szalon regisztrálása a feldolgozóhoz"""
+        self.salons[salon_name] = {'calendar_id': calendar_id, 'application': application}
+        logger.info(f"📤 Outbox worker szalon regisztrálva: {salon_name}")
+
+    def unregister_salon(self, salon_name: str):
+        """Szalon kivétele (pl. ha egy másik processz vette át)"""
+        if self.salons.pop(salon_name, None) is not None:
+            logger.info(f"📤 Outbox worker szalon kivéve: {salon_name}")
+
+    def notify(self):
+        """Azonnali feldolgozás kérése (új foglalás után)"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def start(self):
+        """Feldolgozó ciklus indítása"""
+        self.is_running = True
+        self._wakeup = asyncio.Event()
+        logger.info(f"📤 Outbox worker elindítva ({len(self.salons)} szalon)")
+
+        from .ownership import shard_ownership
+
+        while self.is_running:
+            processed = 0
+            for salon_name, salon in list(self.salons.items()):
+                if not shard_ownership.holds_lease(salon_name):
+                    continue  # lejárt lease: egy másik processz dolgozhatja fel
+                try:
+                    processed += await self.process_salon_once(salon_name, salon['calendar_id'])
+                except Exception as e:
+                    logger.error(f"❌ Outbox worker hiba ({salon_name}): {e}")
+
+            # Ha teli batch jött, azonnal folytatjuk; egyébként várunk ébresztésre
+            if processed >= self.batch_size:
+                continue
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.idle_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def process_salon_once(self, salon_name: str, calendar_id: str) -> int:
+        """Egy szalon esedékes outbox sorainak feldolgozása"""
+        from backend.database.outbox_operations import fetch_pending_bookings
+
+        bookings = await fetch_pending_bookings(salon_name, self.batch_size)
+        for booking in bookings:
+            await self._push_booking(salon_name, calendar_id, booking)
+        return len(bookings)
+
+    async def _push_booking(self, salon_name: str, calendar_id: str, booking: Dict):
+        """Egy foglalás feltöltése a Calendar-ba determinisztikus event ID-val"""
+        from backend.calendar.google_calendar import create_event
+        from backend.database.outbox_operations import (
+            mark_booking_synced, mark_booking_retry, mark_booking_failed
+        )
+
+        event_id = booking['event_id']
+        chat_id = booking['chat_id']
+
+        try:
+            await asyncio.to_thread(
+                create_event,
+                booking['start_at'],
+                calendar_id,
+                booking['summary'],
+                booking['duration_minutes'],
+                event_id
+            )
+        except Exception as e:
+            error_msg = str(e)
+            if not self._is_duplicate_error(error_msg):
+                attempts = booking['attempts'] + 1
+                if attempts >= self.max_attempts:
+                    await mark_booking_failed(salon_name, event_id, chat_id, attempts, error_msg)
+                    from backend.notifications.reminders import reminder_scheduler
+                    reminder_scheduler.discard(salon_name, event_id)
+                    await self._notify_failure(salon_name, booking)
+                else:
+                    delay = min(self.max_backoff, 2 ** attempts * 5)
+                    await mark_booking_retry(salon_name, event_id, attempts, delay, error_msg)
+                return
+            # 409: egy korábbi próbálkozás már létrehozta - ez is siker
+            logger.info(f"♻️ Esemény már létezik a Calendar-ban: {event_id}")
+
+        await mark_booking_synced(salon_name, event_id, chat_id)
+
+    @staticmethod
+    def _is_duplicate_error(error_msg: str) -> bool:
+        """Duplikált event ID (409) hiba felismerése"""
+        error_lower = error_msg.lower()
+        return "409" in error_msg or "already exists" in error_lower or "duplicate" in error_lower
+
+    async def _notify_failure(self, salon_name: str, booking: Dict):
+        """Felhasználó értesítése, ha a foglalás véglegesen nem került a naptárba"""
+        application = self.salons.get(salon_name, {}).get('application')
+        if application is None:
+            return
+
+        start_at = booking['start_at']
+        formatted_time = start_at.strftime("%Y.%m.%d. %H:%M") if hasattr(start_at, 'strftime') else str(start_at)
+        message = (
+            "⚠️ <b>FOGLALÁS NEM VÉGLEGESÍTHETŐ</b>\n\n"
+            f"💇 <b>Szolgáltatás:</b> {booking['service']}\n"
+            f"📅 <b>Időpont:</b> {formatted_time}\n"
+            f"🏪 <b>Szalon:</b> {salon_name}\n\n"
+            "Technikai hiba miatt nem sikerült rögzíteni a naptárban. "
+            "Kérlek, foglalj újra a <code>/idopont</code> paranccsal."
+        )
+        from backend.notifications.telegram_queue import get_notification_queue
+        get_notification_queue(application).enqueue(booking['chat_id'], message, parse_mode='HTML')
+
+    def stop(self):
+        """Feldolgozó leállítása"""
+        self.is_running = False
+        self.notify()
+        logger.info("⏹️ Outbox worker leállítva")
+
+# Globális outbox worker példány
+booking_outbox_worker = BookingOutboxWorker()
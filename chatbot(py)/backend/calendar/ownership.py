@@ -0,0 +1,174 @@
+# backend/calendar/ownership.py
+import asyncio
+import hashlib
+import logging
+import math
+import os
+import socket
+import time
+import uuid
+from typing import Callable, Dict, List, Optional, Set, Any
+
+logger = logging.getLogger(__name__)
+
+class ShardOwnership:
+    """Lease alapú szalon-tulajdonlás több bot processz között (közös MySQL-en).
+
+    Minden szalon monitorát pontosan egy processz futtatja. A processzek
+    életjelet küldenek; a tulajdonolt szalonok száma az élő processzek közötti
+    méltányos részre korlátozódik, így egy kiesett processz szalonjait a
+    lease lejárta után a többiek veszik át.
+    """
+
+    def __init__(self, lease_ttl: int = 30, renew_interval: float = 10.0, owner_id: str = None):
+        self.lease_ttl = lease_ttl
+        self.renew_interval = renew_interval
+        self.owner_id = owner_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.is_running = False
+
+        self._callbacks: Dict[str, Dict[str, List[Callable]]] = {}  # salon -> {'acquired': [...], 'lost': [...]}
+        self.owned: Set[str] = set()
+        self.live_processes = 1
+        self.fair_share = 0
+        self._lease_deadline = 0.0  # eddig érvényesek biztosan a lease-eink (monotonic)
+        self._stop_event: Optional[asyncio.Event] = None
+
+    def register_salon(self, salon_name: str, on_acquired: Callable = None, on_lost: Callable = None):
+        """Szalon felvétele; a callbackek tulajdonszerzéskor / -vesztéskor hívódnak"""
+        callbacks = self._callbacks.setdefault(salon_name, {'acquired': [], 'lost': []})
+        if on_acquired:
+            callbacks['acquired'].append(on_acquired)
+        if on_lost:
+            callbacks['lost'].append(on_lost)
+
+    def _preference(self, salon_name: str) -> str:
+        """Rendezvous hash - processzenként eltérő szalon-sorrend, kevesebb ütközés"""
+        return hashlib.sha1(f"{self.owner_id}|{salon_name}".encode("utf-8")).hexdigest()
+
+    async def run(self):
+        """Lease megújító ciklus"""
+        self.is_running = True
+        self._stop_event = asyncio.Event()
+        logger.info(f"👑 Shard tulajdonlás indul: {self.owner_id} ({len(self._callbacks)} szalon)")
+
+        while self.is_running:
+            self.expire_overdue()
+            try:
+                # A megújítás sem nyúlhat a lease lejárta utánra (lassú / beragadt DB);
+                # lease_ttl-nél hosszabb ciklus eredménye amúgy is érvénytelen
+                timeout = self._lease_deadline - time.monotonic() if self.owned else self.lease_ttl
+                await asyncio.wait_for(self._cycle(), timeout)
+            except asyncio.TimeoutError:
+                logger.error("❌ Lease megújítás nem fejeződött be a lease lejárta előtt")
+            except Exception as e:
+                logger.error(f"❌ Lease megújítási hiba: {e}")
+            # DB nélkül nem tudhatjuk, hogy a lease-ek még a mieink-e
+            self.expire_overdue()
+
+            wait = self.renew_interval
+            if self.owned:
+                wait = min(wait, max(0.0, self._lease_deadline - time.monotonic()))
+            try:
+                await asyncio.wait_for(self._stop_event.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+
+        await self._release_all()
+
+    async def _cycle(self):
+        from backend.database.lease_operations import heartbeat_process, acquire_leases, release_leases
+
+        started = time.monotonic()
+        self.live_processes = max(1, await heartbeat_process(self.owner_id, self.lease_ttl))
+        salons = list(self._callbacks)
+        self.fair_share = math.ceil(len(salons) / self.live_processes)
+
+        # 1. Meglévők megújítása, többlet elengedése (a preferencia szerint utolsókat)
+        keep = sorted(self.owned, key=self._preference)[:self.fair_share]
+        surplus = [s for s in self.owned if s not in keep]
+        if surplus:
+            await release_leases(self.owner_id, surplus)
+        owned = await acquire_leases(self.owner_id, keep, self.lease_ttl)
+
+        # 2. Új szalonok megszerzése a méltányos részig
+        candidates = sorted((s for s in salons if s not in owned), key=self._preference)
+        for salon_name in candidates:
+            if len(owned) >= self.fair_share:
+                break
+            owned |= await acquire_leases(self.owner_id, [salon_name], self.lease_ttl)
+
+        deadline = started + self.lease_ttl
+        if time.monotonic() >= deadline:
+            # A ciklus tovább tartott a lease-nél: ami megjött, az már lejárt
+            owned = set()
+        self._lease_deadline = deadline
+        self._set_owned(owned)
+
+    def expire_overdue(self) -> bool:
+        """Lejárt lease-ek helyi eldobása (monitor / outbox azonnal leáll) - True, ha volt ilyen"""
+        if not self.owned or time.monotonic() < self._lease_deadline:
+            return False
+        logger.warning(f"⌛ Lease lejárt megújítás nélkül - {len(self.owned)} szalon helyi leállítása")
+        self._set_owned(set())
+        return True
+
+    def holds_lease(self, salon_name: str) -> bool:
+        """Futhat-e most ciklus a szalonra ebben a processzben (nem lease-kezelt szalonra mindig igen)"""
+        if salon_name not in self._callbacks:
+            return True
+        self.expire_overdue()
+        return salon_name in self.owned
+
+    def _set_owned(self, owned: Set[str]):
+        """Tulajdon változások alkalmazása a callbackeken keresztül"""
+        lost = self.owned - owned
+        acquired = owned - self.owned
+        self.owned = set(owned)
+
+        for salon_name in lost:
+            logger.info(f"🔻 Szalon monitor átadva: {salon_name}")
+            self._fire(salon_name, 'lost')
+        for salon_name in acquired:
+            logger.info(f"👑 Szalon monitor átvéve: {salon_name} ({self.owner_id})")
+            self._fire(salon_name, 'acquired')
+
+    def _fire(self, salon_name: str, kind: str):
+        for callback in self._callbacks.get(salon_name, {}).get(kind, []):
+            try:
+                callback(salon_name)
+            except Exception as e:
+                logger.error(f"❌ Tulajdonlás callback hiba ({salon_name}, {kind}): {e}")
+
+    async def _release_all(self):
+        from backend.database.lease_operations import release_leases, remove_process
+
+        owned = list(self.owned)
+        self._set_owned(set())
+        try:
+            await release_leases(self.owner_id, owned)
+            await remove_process(self.owner_id)
+        except Exception as e:
+            logger.error(f"❌ Lease elengedési hiba: {e}")
+
+    def get_ownership(self) -> Dict[str, Any]:
+        """Ennek a processznek a tulajdonlási állapota"""
+        return {
+            'owner_id': self.owner_id,
+            'owned': sorted(self.owned),
+            'salons': len(self._callbacks),
+            'live_processes': self.live_processes,
+            'fair_share': self.fair_share,
+        }
+
+    def stop(self):
+        """Leállítás - a futó ciklus elengedi a lease-eket"""
+        self.is_running = False
+        if self._stop_event is not None:
+            self._stop_event.set()
+        logger.info("⏹️ Shard tulajdonlás leállítva")
+
+# Globális példány
+shard_ownership = ShardOwnership(
+    lease_ttl=int(os.getenv("MONITOR_LEASE_TTL", "30")),
+    renew_interval=float(os.getenv("MONITOR_LEASE_RENEW_INTERVAL", "10")),
+)
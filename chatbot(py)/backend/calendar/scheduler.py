@@ -0,0 +1,226 @@
+# backend/calendar/scheduler.py
+import asyncio
+import datetime
+import heapq
+import logging
+import os
+import random
+import time
+from typing import Dict, Optional, Any
+
+from .monitor import CalendarMonitor, calendar_monitor
+
+logger = logging.getLogger(__name__)
+
+class _SalonSchedule:
+    """Egy szalon ütemezési állapota"""
+
+    def __init__(self, application, salon_name: str, calendar_id: str, interval: float):
+        self.application = application
+        self.salon_name = salon_name
+        self.calendar_id = calendar_id
+        self.interval = interval
+        self.generation = 0          # stop/start után a régi heap bejegyzések érvénytelenek
+        self.active = False
+        self.change_rate = 0.0       # változások/ciklus, exponenciálisan simított átlag
+        self.consecutive_errors = 0
+        self.last_run: Optional[float] = None
+        self.runs = 0
+
+class MonitorScheduler:
+    """Központi Calendar monitor ütemező - prioritási sor a következő esedékesség szerint.
+
+    Szalononként adaptív intervallum (változási ráta + napszak), globális
+    párhuzamossági korlát a Calendar hívásokra és jitter a szinkron löketek ellen.
+    """
+
+    def __init__(self, monitor: CalendarMonitor = None, min_interval: float = 10.0,
+                 max_interval: float = 300.0, initial_interval: float = 30.0,
+                 max_concurrency: int = 4, jitter: float = 0.1,
+                 quiet_hours: tuple = (20, 7), quiet_interval: float = 600.0,
+                 error_backoff_max: float = 900.0):
+        self.monitor = monitor or calendar_monitor
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.initial_interval = initial_interval
+        self.max_concurrency = max_concurrency
+        self.jitter = jitter
+        self.quiet_hours = quiet_hours
+        self.quiet_interval = quiet_interval
+        self.error_backoff_max = error_backoff_max
+
+        self.is_running = False
+        self.salons: Dict[str, _SalonSchedule] = {}
+        self._heap = []  # (due, seq, salon_name, generation)
+        self._seq = 0
+        self._in_flight = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks = set()
+
+    def add_salon(self, application, salon_name: str, calendar_id: str, start: bool = True):
+        """Szalon felvétele az ütemezőbe"""
+        if salon_name not in self.salons:
+            self.salons[salon_name] = _SalonSchedule(application, salon_name, calendar_id, self.initial_interval)
+        else:
+            self.salons[salon_name].application = application
+            self.salons[salon_name].calendar_id = calendar_id
+        if start:
+            self.start_salon(salon_name)
+
+    def start_salon(self, salon_name: str):
+        """Szalon monitorozásának (újra)indítása"""
+        state = self.salons.get(salon_name)
+        if state is None:
+            logger.warning(f"⚠️ Ismeretlen szalon az ütemezőben: {salon_name}")
+            return
+        if state.active:
+            return
+        state.active = True
+        state.generation += 1
+        state.interval = self.initial_interval
+        # Az első futást szétszórjuk, hogy induláskor ne egyszerre fusson minden szalon
+        self._push(state, random.uniform(0, min(self.initial_interval, self.min_interval)))
+        logger.info(f"▶️ Monitor ütemezve: {salon_name}")
+
+    def stop_salon(self, salon_name: str):
+        """Szalon monitorozásának leállítása (a futó ciklus még befejeződik)"""
+        state = self.salons.get(salon_name)
+        if state is None or not state.active:
+            return
+        state.active = False
+        state.generation += 1
+        logger.info(f"⏸️ Monitor leállítva: {salon_name}")
+
+    def _push(self, state: _SalonSchedule, delay: float):
+        self._seq += 1
+        heapq.heappush(self._heap, (time.monotonic() + delay, self._seq, state.salon_name, state.generation))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def run(self):
+        """Ütemező fő ciklusa"""
+        self.is_running = True
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._wakeup = asyncio.Event()
+        logger.info(f"🗓️ Monitor ütemező elindítva ({len(self.salons)} szalon, max {self.max_concurrency} párhuzamos)")
+
+        while self.is_running:
+            self._wakeup.clear()
+
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+
+            due, _, salon_name, generation = self._heap[0]
+            delay = due - time.monotonic()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._heap)
+            state = self.salons.get(salon_name)
+            if state is None or not state.active or state.generation != generation:
+                continue  # leállított / újraindított szalon elavult bejegyzése
+
+            await self._semaphore.acquire()
+            task = asyncio.create_task(self._run_cycle(state, generation))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_cycle(self, state: _SalonSchedule, generation: int):
+        """Egy szalon egy ellenőrzési ciklusa a globális korláton belül"""
+        from .ownership import shard_ownership
+
+        self._in_flight += 1
+        changes, failed = 0, False
+        try:
+            if not shard_ownership.holds_lease(state.salon_name):
+                return  # a lease lejárt: a 'lost' callback már leállította a szalont
+            changes = await self.monitor.check_salon_once(state.application, state.salon_name, state.calendar_id)
+        except Exception as e:
+            failed = True
+            logger.error(f"❌ Hiba a monitorban ({state.salon_name}): {e}")
+        finally:
+            self._in_flight -= 1
+            self._semaphore.release()
+
+        state.runs += 1
+        state.last_run = time.time()
+        next_delay = self._next_interval(state, changes, failed)
+
+        if self.is_running and state.active and state.generation == generation:
+            self._push(state, next_delay)
+
+    def _next_interval(self, state: _SalonSchedule, changes: int, failed: bool) -> float:
+        """Következő intervallum: változáskor gyorsít, csendben lassít, hibánál visszalép"""
+        if failed:
+            state.consecutive_errors += 1
+            backoff = self.initial_interval * (2 ** state.consecutive_errors)
+            return self._apply_jitter(min(self.error_backoff_max, backoff))
+
+        state.consecutive_errors = 0
+        state.change_rate = 0.7 * state.change_rate + 0.3 * changes
+
+        if changes:
+            state.interval = max(self.min_interval, state.interval / 2)
+        elif state.change_rate < 0.05:
+            state.interval = min(self.max_interval, state.interval * 1.5)
+
+        interval = state.interval
+        if self._is_quiet_hour(datetime.datetime.now().hour):
+            interval = max(interval, self.quiet_interval)
+
+        return self._apply_jitter(interval)
+
+    def _is_quiet_hour(self, hour: int) -> bool:
+        start, end = self.quiet_hours
+        if start <= end:
+            return start <= hour < end
+        return hour >= start or hour < end
+
+    def _apply_jitter(self, interval: float) -> float:
+        if not self.jitter:
+            return interval
+        return interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Ütemező állapota (metrikák)"""
+        now = time.monotonic()
+        next_due = {}
+        for due, _, salon_name, generation in self._heap:
+            state = self.salons.get(salon_name)
+            if state and state.active and state.generation == generation:
+                next_due[salon_name] = round(max(0.0, due - now), 1)
+        return {
+            'in_flight': self._in_flight,
+            'queued': len(next_due),
+            'salons': {
+                name: {
+                    'active': state.active,
+                    'interval': round(state.interval, 1),
+                    'change_rate': round(state.change_rate, 3),
+                    'consecutive_errors': state.consecutive_errors,
+                    'runs': state.runs,
+                    'next_due_in': next_due.get(name),
+                }
+                for name, state in self.salons.items()
+            }
+        }
+
+    def stop(self):
+        """Ütemező leállítása"""
+        self.is_running = False
+        if self._wakeup is not None:
+            self._wakeup.set()
+        logger.info("⏹️ Monitor ütemező leállítva")
+
+# Globális ütemező példány
+monitor_scheduler = MonitorScheduler(
+    min_interval=float(os.getenv("MONITOR_MIN_INTERVAL", "10")),
+    max_interval=float(os.getenv("MONITOR_MAX_INTERVAL", "300")),
+    max_concurrency=int(os.getenv("MONITOR_MAX_CONCURRENCY", "4")),
+)
@@ -8,6 +8,8 @@ from .user_operations import (
 from .salon_operations import (
     get_opening_hours,
     get_available_slots,
+    get_available_slots_for_service,
+    get_busy_slots,
     get_services,
     get_service_duration
 )
@@ -17,6 +19,13 @@ from .event_operations import (
     update_event_status,
     get_all_users
 )
+from .outbox_operations import (
+    make_booking_event_id,
+    enqueue_booking,
+    fetch_pending_bookings,
+    fetch_pending_busy_slots,
+    SlotTaken
+)
 from .table_operations import initialize_salon_database
 
 __all__ = [
@@ -26,11 +35,18 @@ __all__ = [
     'update_user_info',
     'get_opening_hours',
     'get_available_slots',
+    'get_available_slots_for_service',
+    'get_busy_slots',
     'get_services',
     'get_service_duration',
     'insert_event',
     'fetch_events_for_user',
     'update_event_status',
     'get_all_users',
+    'make_booking_event_id',
+    'enqueue_booking',
+    'fetch_pending_bookings',
+    'fetch_pending_busy_slots',
+    'SlotTaken',
     'initialize_salon_database'
 ]
\ No newline at end of file
@@ -1,13 +1,14 @@
 # backend/database/event_operations.py
 import asyncio
 import logging
-from typing import List, Dict
+from typing import List, Dict, Tuple, Optional
 from mysql.connector import Error
 from .mysql_module import get_db_connection
 from .table_operations import (
     _ensure_user_events_table_exists,
     _assert_numeric_chat_id
 )
+from .reminder_operations import REMINDER_CANCELLED, REMINDER_PENDING, REMINDER_SENT, REMINDER_SKIPPED
 
 logger = logging.getLogger(__name__)
 
@@ -297,4 +298,61 @@ async def update_event_time(salon_name: str, event_id: str, event_date: str,
         logger.info(f"✅ Esemény idő frissítve: {event_id}")
         
     except Exception as e:
-        logger.error(f"❌ Hiba az esemény idő frissítésénél: {e}")
\ No newline at end of file
+        logger.error(f"❌ Hiba az esemény idő frissítésénél: {e}")
+
+async def update_event_times_batch(salon_name: str, updates: List[Tuple[int, str, str, str, Optional[str]]]) -> int:
+    """Több esemény időpontjának frissítése EGY kapcsolattal és EGY tranzakcióban
+
+    updates: (chat_id, event_id, event_date, start_time, end_time) sorok
+    """
+    if not updates:
+        return 0
+
+    try:
+        by_chat: Dict[int, List[Tuple]] = {}
+        reminder_rows = []
+        for chat_id, event_id, event_date, start_time, end_time in updates:
+            _assert_numeric_chat_id(chat_id)
+            by_chat.setdefault(chat_id, []).append((event_date, start_time, end_time, event_id))
+            reminder_rows.append((event_date, start_time, event_date, start_time, event_id))
+
+        def db_task():
+            conn = get_db_connection(salon_name)
+            cur = conn.cursor()
+            try:
+                conn.start_transaction()
+                for chat_id, rows in by_chat.items():
+                    cur.executemany(f"""
+                        UPDATE `{chat_id}` 
+                        SET event_date = %s, start_time = %s, end_time = %s 
+                        WHERE event_id = %s
+                    """, rows)
+                # Emlékeztetők áthelyezése - az új időpontra csak a még jövőbeli esedékességűek
+                # mennek ki újra (mint a build_reminder_rows-nál), a többi kimarad.
+                # MySQL a SET-et balról jobbra értékeli: a státusz már az új due_at-ot látja.
+                cur.executemany(f"""
+                    UPDATE reminders
+                    SET start_at = TIMESTAMP(%s, %s),
+                        due_at = TIMESTAMP(%s, %s) - INTERVAL offset_minutes MINUTE,
+                        status = CASE
+                            WHEN due_at > NOW() THEN '{REMINDER_PENDING}'
+                            WHEN status = '{REMINDER_SENT}' THEN '{REMINDER_SENT}'
+                            ELSE '{REMINDER_SKIPPED}'
+                        END
+                    WHERE event_id = %s AND status <> '{REMINDER_CANCELLED}'
+                """, reminder_rows)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cur.close()
+                conn.close()
+
+        await asyncio.to_thread(db_task)
+        logger.info(f"✅ {len(updates)} esemény idő frissítve egy tranzakcióban ({salon_name})")
+        return len(updates)
+
+    except Exception as e:
+        logger.error(f"❌ Hiba az esemény idők kötegelt frissítésénél: {e}")
+        return 0
@@ -0,0 +1,134 @@
+# backend/database/lease_operations.py
+import asyncio
+import logging
+from typing import Dict, List, Set, Tuple
+from mysql.connector import Error
+from .mysql_module import get_db_connection
+from .table_operations import _ensure_monitor_lease_tables_exist
+
+logger = logging.getLogger(__name__)
+
+async def heartbeat_process(owner_id: str, ttl_seconds: int) -> int:
+    """Process életjel frissítése - visszaadja az élő processzek számát"""
+    try:
+        def db_task():
+            conn = get_db_connection()
+            _ensure_monitor_lease_tables_exist(conn)
+            cur = conn.cursor()
+            cur.execute("""
+                INSERT INTO monitor_processes (owner_id, last_seen)
+                VALUES (%s, NOW(3))
+                ON DUPLICATE KEY UPDATE last_seen = NOW(3)
+            """, (owner_id,))
+            cur.execute("""
+                SELECT COUNT(*) FROM monitor_processes
+                WHERE last_seen > NOW(3) - INTERVAL %s SECOND
+            """, (ttl_seconds,))
+            live = cur.fetchone()[0]
+            # Régóta halott processzek takarítása
+            cur.execute("""
+                DELETE FROM monitor_processes
+                WHERE last_seen < NOW(3) - INTERVAL %s SECOND
+            """, (ttl_seconds * 10,))
+            conn.commit()
+            cur.close()
+            conn.close()
+            return live
+
+        return await asyncio.to_thread(db_task)
+    except Error as e:
+        logger.error(f"⚠️ DB hiba (heartbeat_process): {e}")
+        raise
+
+async def acquire_leases(owner_id: str, salon_names: List[str], ttl_seconds: int) -> Set[str]:
+    """Lease-ek megszerzése / megújítása - visszaadja a ténylegesen birtokolt szalonokat.
+
+    Egy lease akkor szerezhető meg, ha senkié, lejárt, vagy már a miénk.
+    """
+    if not salon_names:
+        return set()
+
+    try:
+        def db_task():
+            conn = get_db_connection()
+            cur = conn.cursor()
+            owned = set()
+            for salon_name in salon_names:
+                # Az értékadások balról jobbra futnak: az expires_at feltétele
+                # már a frissített owner_id-t látja
+                cur.execute("""
+                    INSERT INTO monitor_leases (salon_name, owner_id, expires_at)
+                    VALUES (%s, %s, NOW(3) + INTERVAL %s SECOND)
+                    ON DUPLICATE KEY UPDATE
+                        owner_id = IF(owner_id = VALUES(owner_id) OR expires_at < NOW(3),
+                                      VALUES(owner_id), owner_id),
+                        expires_at = IF(owner_id = VALUES(owner_id), VALUES(expires_at), expires_at)
+                """, (salon_name, owner_id, ttl_seconds))
+                conn.commit()
+                cur.execute("SELECT owner_id FROM monitor_leases WHERE salon_name = %s", (salon_name,))
+                row = cur.fetchone()
+                if row and row[0] == owner_id:
+                    owned.add(salon_name)
+            cur.close()
+            conn.close()
+            return owned
+
+        return await asyncio.to_thread(db_task)
+    except Error as e:
+        logger.error(f"⚠️ DB hiba (acquire_leases): {e}")
+        raise
+
+async def release_leases(owner_id: str, salon_names: List[str]):
+    """Saját lease-ek elengedése (leállításkor vagy átadáskor)"""
+    if not salon_names:
+        return
+
+    try:
+        def db_task():
+            conn = get_db_connection()
+            cur = conn.cursor()
+            cur.executemany(
+                "DELETE FROM monitor_leases WHERE salon_name = %s AND owner_id = %s",
+                [(salon_name, owner_id) for salon_name in salon_names]
+            )
+            conn.commit()
+            cur.close()
+            conn.close()
+
+        await asyncio.to_thread(db_task)
+        logger.info(f"🔓 Lease-ek elengedve: {', '.join(salon_names)}")
+    except Error as e:
+        logger.error(f"⚠️ DB hiba (release_leases): {e}")
+
+async def remove_process(owner_id: str):
+    """Process kijelentkezése (tiszta leállításkor)"""
+    try:
+        def db_task():
+            conn = get_db_connection()
+            cur = conn.cursor()
+            cur.execute("DELETE FROM monitor_processes WHERE owner_id = %s", (owner_id,))
+            conn.commit()
+            cur.close()
+            conn.close()
+
+        await asyncio.to_thread(db_task)
+    except Error as e:
+        logger.error(f"⚠️ DB hiba (remove_process): {e}")
+
+async def get_lease_owners() -> Dict[str, Tuple[str, object]]:
+    """Aktuális tulajdonosok: salon_name -> (owner_id, expires_at)"""
+    try:
+        def db_task():
+            conn = get_db_connection()
+            _ensure_monitor_lease_tables_exist(conn)
+            cur = conn.cursor()
+            cur.execute("SELECT salon_name, owner_id, expires_at FROM monitor_leases WHERE expires_at >= NOW(3)")
+            rows = cur.fetchall()
+            cur.close()
+            conn.close()
+            return {salon_name: (owner_id, expires_at) for salon_name, owner_id, expires_at in rows}
+
+        return await asyncio.to_thread(db_task)
+    except Error as e:
+        logger.error(f"⚠️ DB hiba (get_lease_owners): {e}")
+        return {}
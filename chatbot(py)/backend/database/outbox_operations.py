@@ -0,0 +1,281 @@
+# backend/database/outbox_operations.py
+import asyncio
+import datetime
+import hashlib
+import logging
+from typing import List, Dict, Tuple
+from mysql.connector import Error
+from .mysql_module import get_db_connection
+from .table_operations import (
+    _ensure_booking_outbox_table_exists,
+    _ensure_user_events_table_exists,
+    _ensure_reminders_table_exists,
+    _assert_numeric_chat_id
+)
+from .reminder_operations import build_reminder_rows, insert_reminder_rows
+
+logger = logging.getLogger(__name__)
+
+# User esemény státuszok (a `{chat_id}` táblákban)
+EVENT_STATUS_ACTIVE = 0        # Calendar-ban is létezik, a monitor figyeli
+EVENT_STATUS_PENDING_SYNC = 1  # Lokálisan rögzítve, Calendar szinkronra vár
+EVENT_STATUS_DELETED = 3       # Calendar-ból törölve
+EVENT_STATUS_SYNC_FAILED = 4   # Calendar szinkron véglegesen sikertelen
+
+# Outbox státuszok
+OUTBOX_PENDING = 'pending'
+OUTBOX_DONE = 'done'
+OUTBOX_FAILED = 'failed'
+
+_LOCK_DEADLOCK = 1213     # ER_LOCK_DEADLOCK - párhuzamos foglalások résazár ütközése
+_CONFLICT_RETRIES = 3
+
+class SlotTaken(Exception):
+    """A kért időpont egy másik (még szinkronra váró) foglalással ütközik"""
+
+def make_booking_event_id(salon_name: str, chat_id: int, request_id, start_dt: datetime.datetime, service: str) -> str:
+    """Determinisztikus Calendar event ID egy foglaláshoz.
+
+    Ugyanaz a kérés (pl. ugyanaz a Telegram üzenet) mindig ugyanazt az ID-t adja,
+    így az újrapróbálkozások nem hoznak létre duplikált eseményt. A hex karakterek
+    a Google által elfogadott base32hex ábécé részhalmazai.
+    """
+    raw = f"{salon_name}|{chat_id}|{request_id}|{start_dt.isoformat()}|{service}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+async def enqueue_booking(salon_name: str, chat_id: int, event_id: str, service: str, summary: str,
+                          start_dt: datetime.datetime, duration_minutes: int) -> bool:
+    """Foglalás rögzítése outboxba + user táblába + emlékeztetők EGY tranzakcióban.
+
+    Ütköző, még szinkronra váró foglalás esetén SlotTaken kivételt dob (semmi nem íródik).
+    """
+    try:
+        _assert_numeric_chat_id(chat_id)
+        end_dt = start_dt + datetime.timedelta(minutes=duration_minutes)
+        reminder_rows = build_reminder_rows(event_id, chat_id, service, start_dt)
+
+        def _insert_booking(conn):
+            conn.start_transaction()
+            cur = conn.cursor()
+            # Átfedő, még Calendar-ba nem került foglalások zárolása: két párhuzamos
+            # megerősítés közül csak az egyik kaphatja meg az időpontot
+            cur.execute("""
+                SELECT event_id FROM booking_outbox
+                WHERE status = %s AND event_id <> %s
+                  AND start_at < %s
+                  AND start_at + INTERVAL duration_minutes MINUTE > %s
+                FOR UPDATE
+            """, (OUTBOX_PENDING, event_id, end_dt, start_dt))
+            conflicts = cur.fetchall()
+            if conflicts:
+                cur.close()
+                raise SlotTaken(f"{start_dt:%Y-%m-%d %H:%M} ütközik: {conflicts[0][0]}")
+            cur.execute("""
+                INSERT INTO booking_outbox
+                    (event_id, chat_id, service, summary, start_at, duration_minutes, status)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE event_id = event_id
+            """, (event_id, chat_id, service, summary, start_dt, duration_minutes, OUTBOX_PENDING))
+            cur.execute(f"""
+                INSERT INTO `{chat_id}` (event_id, status, service, event_date, start_time, end_time)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE event_id = event_id
+            """, (event_id, EVENT_STATUS_PENDING_SYNC, service,
+                  start_dt.strftime('%Y-%m-%d'), start_dt.strftime('%H:%M'), end_dt.strftime('%H:%M')))
+            insert_reminder_rows(cur, reminder_rows)
+            conn.commit()
+            cur.close()
+
+        def db_task():
+            conn = get_db_connection(salon_name)
+            try:
+                # DDL implicit commitot okoz, ezért a tranzakció előtt fut
+                _ensure_booking_outbox_table_exists(conn)
+                _ensure_user_events_table_exists(conn, chat_id)
+                _ensure_reminders_table_exists(conn)
+
+                for attempt in range(1, _CONFLICT_RETRIES + 1):
+                    try:
+                        _insert_booking(conn)
+                        return
+                    except Error as e:
+                        conn.rollback()
+                        if e.errno != _LOCK_DEADLOCK or attempt == _CONFLICT_RETRIES:
+                            raise
+                        logger.info(f"🔁 Foglalási zár ütközés, újrapróbálás ({attempt}): {event_id}")
+                    except Exception:
+                        conn.rollback()
+                        raise
+            finally:
+                conn.close()
+
+        await asyncio.to_thread(db_task)
+        logger.info(f"📥 Foglalás outboxba rögzítve: {event_id} ({salon_name})")
+        return True
+
+    except SlotTaken as e:
+        logger.info(f"⛔ Időpont időközben foglalt: {e}")
+        raise
+    except Error as e:
+        logger.error(f"⚠️ DB hiba (enqueue_booking): {e}")
+        return False
+    except Exception as e:
+        logger.error(f"⚠️ Egyéb hiba (enqueue_booking): {e}")
+        return False
+
+async def fetch_pending_busy_slots(salon_name: str, date: datetime.date) -> List[Tuple[datetime.time, datetime.time]]:
+    """Adott nap még szinkronra váró foglalásai (start, end) - a Calendar freebusy ezeket még nem látja.
+
+    Az outbox `pending` sorai pontosan a `{chat_id}` táblák 1-es státuszú sorai
+    (egy tranzakcióban íródnak és váltanak státuszt).
+    """
+    try:
+        def db_task():
+            conn = get_db_connection(salon_name)
+            try:
+                _ensure_booking_outbox_table_exists(conn)
+                cur = conn.cursor()
+                day_start = datetime.datetime.combine(date, datetime.time.min)
+                cur.execute("""
+                    SELECT start_at, duration_minutes
+                    FROM booking_outbox
+                    WHERE status = %s AND start_at >= %s AND start_at < %s
+                """, (OUTBOX_PENDING, day_start, day_start + datetime.timedelta(days=1)))
+                rows = cur.fetchall()
+                cur.close()
+            finally:
+                conn.close()
+            busy = []
+            for start_at, duration in rows:
+                end_at = start_at + datetime.timedelta(minutes=duration)
+                busy.append((start_at.time(), end_at.time() if end_at.date() == date else datetime.time.max))
+            return busy
+
+        return await asyncio.to_thread(db_task)
+    except Error as e:
+        logger.error(f"⚠️ DB hiba (fetch_pending_busy_slots): {e}")
+        return []
+
+async def fetch_pending_bookings(salon_name: str, limit: int = 20) -> List[Dict]:
+    """Esedékes, Calendar-ba még fel nem töltött foglalások lekérése"""
+    try:
+        def db_task():
+            conn = get_db_connection(salon_name)
+            _ensure_booking_outbox_table_exists(conn)
+            cur = conn.cursor()
+            cur.execute("""
+                SELECT event_id, chat_id, service, summary, start_at, duration_minutes, attempts
+                FROM booking_outbox
+                WHERE status = %s AND next_attempt_at <= NOW()
+                ORDER BY next_attempt_at
+                LIMIT %s
+            """, (OUTBOX_PENDING, limit))
+            rows = cur.fetchall()
+            cur.close()
+            conn.close()
+            return [
+                {
+                    'event_id': row[0],
+                    'chat_id': row[1],
+                    'service': row[2],
+                    'summary': row[3],
+                    'start_at': row[4],
+                    'duration_minutes': row[5],
+                    'attempts': row[6]
+                }
+                for row in rows
+            ]
+
+        return await asyncio.to_thread(db_task)
+    except Error as e:
+        logger.error(f"⚠️ DB hiba (fetch_pending_bookings): {e}")
+        return []
+
+async def mark_booking_synced(salon_name: str, event_id: str, chat_id: int):
+    """Sikeres Calendar szinkron visszaírása (outbox + user tábla)"""
+    try:
+        _assert_numeric_chat_id(chat_id)
+
+        def db_task():
+            conn = get_db_connection(salon_name)
+            try:
+                conn.start_transaction()
+                cur = conn.cursor()
+                cur.execute("""
+                    UPDATE booking_outbox SET status = %s, last_error = NULL
+                    WHERE event_id = %s
+                """, (OUTBOX_DONE, event_id))
+                cur.execute(f"""
+                    UPDATE `{chat_id}` SET status = %s
+                    WHERE event_id = %s AND status = %s
+                """, (EVENT_STATUS_ACTIVE, event_id, EVENT_STATUS_PENDING_SYNC))
+                conn.commit()
+                cur.close()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                conn.close()
+
+        await asyncio.to_thread(db_task)
+        logger.info(f"✅ Outbox szinkronizálva: {event_id}")
+    except Error as e:
+        logger.error(f"⚠️ DB hiba (mark_booking_synced): {e}")
+
+async def mark_booking_retry(salon_name: str, event_id: str, attempts: int, delay_seconds: int, error: str):
+    """Sikertelen próbálkozás rögzítése, következő próbálkozás ütemezése"""
+    try:
+        def db_task():
+            conn = get_db_connection(salon_name)
+            cur = conn.cursor()
+            cur.execute("""
+                UPDATE booking_outbox
+                SET attempts = %s,
+                    next_attempt_at = NOW() + INTERVAL %s SECOND,
+                    last_error = %s
+                WHERE event_id = %s
+            """, (attempts, delay_seconds, error[:500], event_id))
+            conn.commit()
+            cur.close()
+            conn.close()
+
+        await asyncio.to_thread(db_task)
+        logger.info(f"🔁 Outbox újrapróbálás {delay_seconds}s múlva: {event_id} ({attempts}. kísérlet)")
+    except Error as e:
+        logger.error(f"⚠️ DB hiba (mark_booking_retry): {e}")
+
+async def mark_booking_failed(salon_name: str, event_id: str, chat_id: int, attempts: int, error: str):
+    """Végleges hiba visszaírása (outbox + user tábla)"""
+    try:
+        _assert_numeric_chat_id(chat_id)
+
+        def db_task():
+            conn = get_db_connection(salon_name)
+            try:
+                conn.start_transaction()
+                cur = conn.cursor()
+                cur.execute("""
+                    UPDATE booking_outbox SET status = %s, attempts = %s, last_error = %s
+                    WHERE event_id = %s
+                """, (OUTBOX_FAILED, attempts, error[:500], event_id))
+                cur.execute(f"""
+                    UPDATE `{chat_id}` SET status = %s
+                    WHERE event_id = %s AND status = %s
+                """, (EVENT_STATUS_SYNC_FAILED, event_id, EVENT_STATUS_PENDING_SYNC))
+                # Nem létrejött foglaláshoz nem megy emlékeztető
+                cur.execute("""
+                    UPDATE reminders SET status = 'cancelled'
+                    WHERE event_id = %s AND status = 'pending'
+                """, (event_id,))
+                conn.commit()
+                cur.close()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                conn.close()
+
+        await asyncio.to_thread(db_task)
+        logger.warning(f"❌ Outbox véglegesen sikertelen: {event_id} - {error}")
+    except Error as e:
+        logger.error(f"⚠️ DB hiba (mark_booking_failed): {e}")
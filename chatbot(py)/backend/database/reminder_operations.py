@@ -0,0 +1,129 @@
+# backend/database/reminder_operations.py
+import asyncio
+import datetime
+import logging
+from typing import List, Dict, Tuple
+from mysql.connector import Error
+from .mysql_module import get_db_connection
+from .table_operations import _ensure_reminders_table_exists
+
+logger = logging.getLogger(__name__)
+
+# Emlékeztető fajták: ennyi perccel a kezdés előtt esedékesek
+REMINDER_OFFSETS = {
+    'day_before': 24 * 60,
+    'two_hours': 2 * 60,
+}
+
+# Emlékeztető státuszok
+REMINDER_PENDING = 'pending'
+REMINDER_SENT = 'sent'
+REMINDER_CANCELLED = 'cancelled'
+REMINDER_EXPIRED = 'expired'
+REMINDER_SKIPPED = 'skipped'   # áthelyezéskor már elmúlt esedékesség - nem megy ki
+
+def build_reminder_rows(event_id: str, chat_id: int, service: str,
+                        start_dt: datetime.datetime, now: datetime.datetime = None) -> List[Tuple]:
+    """Egy foglalás emlékeztető sorai - a már elmúlt esedékességűeket kihagyja"""
+    now = now or datetime.datetime.now()
+    rows = []
+    for kind, offset_minutes in REMINDER_OFFSETS.items():
+        due_at = start_dt - datetime.timedelta(minutes=offset_minutes)
+        if due_at > now:
+            rows.append((event_id, kind, chat_id, service, start_dt, offset_minutes, due_at))
+    return rows
+
+def insert_reminder_rows(cur, rows: List[Tuple]):
+    """Emlékeztetők beszúrása egy nyitott tranzakción belül (pl. enqueue_booking)"""
+    if not rows:
+        return
+    cur.executemany("""
+        INSERT INTO reminders (event_id, kind, chat_id, service, start_at, offset_minutes, due_at, status)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, 'pending')
+        ON DUPLICATE KEY UPDATE event_id = event_id
+    """, rows)
+
+async def fetch_upcoming_reminders(salon_name: str, horizon_seconds: int) -> List[Dict]:
+    """A horizonton belül esedékes, még el nem küldött emlékeztetők (indexelt lekérés)"""
+    try:
+        def db_task():
+            conn = get_db_connection(salon_name)
+            _ensure_reminders_table_exists(conn)
+            cur = conn.cursor()
+            # Már elkezdődött foglalások emlékeztetői soha nem mennek ki
+            cur.execute("""
+                UPDATE reminders SET status = %s
+                WHERE status = %s AND start_at <= NOW()
+            """, (REMINDER_EXPIRED, REMINDER_PENDING))
+            cur.execute("""
+                SELECT event_id, kind, chat_id, service, start_at, offset_minutes, due_at
+                FROM reminders
+                WHERE status = %s AND due_at <= NOW() + INTERVAL %s SECOND
+                ORDER BY due_at
+            """, (REMINDER_PENDING, horizon_seconds))
+            rows = cur.fetchall()
+            conn.commit()
+            cur.close()
+            conn.close()
+            return [
+                {
+                    'event_id': row[0],
+                    'kind': row[1],
+                    'chat_id': row[2],
+                    'service': row[3],
+                    'start_at': row[4],
+                    'offset_minutes': row[5],
+                    'due_at': row[6]
+                }
+                for row in rows
+            ]
+
+        return await asyncio.to_thread(db_task)
+    except Error as e:
+        logger.error(f"⚠️ DB hiba (fetch_upcoming_reminders): {e}")
+        return []
+
+async def claim_reminder(salon_name: str, event_id: str, kind: str, due_at: datetime.datetime) -> bool:
+    """Emlékeztető lefoglalása küldésre - csak egyszer, és csak ha még aktuális.
+
+    A feltétel kiszűri a közben törölt / áthelyezett foglalásokat, illetve a
+    túl régen esedékessé vált emlékeztetőket (pl. hosszabb leállás után).
+    """
+    try:
+        def db_task():
+            conn = get_db_connection(salon_name)
+            cur = conn.cursor()
+            cur.execute("""
+                UPDATE reminders SET status = %s, sent_at = NOW()
+                WHERE event_id = %s AND kind = %s AND status = %s AND due_at = %s
+                  AND start_at > NOW()
+                  AND NOW() < due_at + INTERVAL (offset_minutes DIV 2) MINUTE
+            """, (REMINDER_SENT, event_id, kind, REMINDER_PENDING, due_at))
+            claimed = cur.rowcount == 1
+            conn.commit()
+            cur.close()
+            conn.close()
+            return claimed
+
+        return await asyncio.to_thread(db_task)
+    except Error as e:
+        logger.error(f"⚠️ DB hiba (claim_reminder): {e}")
+        return False
+
+async def cancel_reminders(salon_name: str, event_id: str):
+    """Egy foglalás függő emlékeztetőinek visszavonása"""
+    try:
+        def db_task():
+            conn = get_db_connection(salon_name)
+            cur = conn.cursor()
+            cur.execute("""
+                UPDATE reminders SET status = %s
+                WHERE event_id = %s AND status = %s
+            """, (REMINDER_CANCELLED, event_id, REMINDER_PENDING))
+            conn.commit()
+            cur.close()
+            conn.close()
+
+        await asyncio.to_thread(db_task)
+    except Error as e:
+        logger.error(f"⚠️ DB hiba (cancel_reminders): {e}")
@@ -8,7 +8,9 @@ from .table_operations import (
     _ensure_opening_hours_table_exists,
     _ensure_services_table_exists
 )
+from .outbox_operations import fetch_pending_busy_slots
 from ..shared.time_utils import add_minutes_to_time, times_overlap
+from ..shared.async_utils import gather_or_cancel
 
 logger = logging.getLogger(__name__)
 
@@ -33,105 +35,139 @@ async def get_opening_hours(salon_name: str):
         logger.error(f"⚠️ DB hiba (get_opening_hours): {e}")
         return []
 
-async def get_available_slots(salon_name: str, date: datetime.date, service_duration: int = 60, calendar_id: str = None):
-    """Szabad időpontok lekérése"""
+def _fetch_opening_for_day(salon_name: str, date: datetime.date):
+    """Adott nap nyitvatartása (open_time, close_time) vagy None, ha zárva"""
+    conn = get_db_connection(salon_name)
     try:
-        def db_task():
-            conn = get_db_connection(salon_name)
-            _ensure_opening_hours_table_exists(conn)
-            
-            python_weekday = date.weekday()
-            db_weekday = python_weekday + 1
-            
-            cur = conn.cursor()
-            cur.execute("""
-                SELECT open_time, close_time, is_closed 
-                FROM opening_hours 
-                WHERE day_of_week = %s
-            """, (db_weekday,))
-            
-            opening = cur.fetchone()
-            if not opening or opening[2]:
-                return []
-            
-            open_time = opening[0]
-            close_time = opening[1]
-            
-            if isinstance(open_time, datetime.timedelta):
-                open_time = (datetime.datetime.min + open_time).time()
-            if isinstance(close_time, datetime.timedelta):
-                close_time = (datetime.datetime.min + close_time).time()
-            
-            all_slots = []
-            current_hour = open_time.hour
-            current_minute = open_time.minute
-            
-            close_hour = close_time.hour
-            close_minute = close_time.minute
-            
-            while True:
-                end_minute = current_minute + service_duration
-                end_hour = current_hour + (end_minute // 60)
-                end_minute = end_minute % 60
-                
-                if end_hour > close_hour or (end_hour == close_hour and end_minute > close_minute):
-                    break
-                
-                time_obj = datetime.time(current_hour, current_minute)
-                all_slots.append(time_obj)
-                
-                current_minute += 30
-                if current_minute >= 60:
-                    current_hour += 1
-                    current_minute = current_minute % 60
-                
-                if current_hour > close_hour or (current_hour == close_hour and current_minute > close_minute):
-                    break
-            
-            cur.close()
-            conn.close()
-            return all_slots
-            
-        all_slots = await asyncio.to_thread(db_task)
+        _ensure_opening_hours_table_exists(conn)
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT open_time, close_time, is_closed 
+            FROM opening_hours 
+            WHERE day_of_week = %s
+        """, (date.weekday() + 1,))
+        opening = cur.fetchone()
+        cur.close()
+    finally:
+        conn.close()
+    
+    if not opening or opening[2]:
+        return None
+    
+    open_time, close_time = opening[0], opening[1]
+    if isinstance(open_time, datetime.timedelta):
+        open_time = (datetime.datetime.min + open_time).time()
+    if isinstance(close_time, datetime.timedelta):
+        close_time = (datetime.datetime.min + close_time).time()
+    return open_time, close_time
+
+def _generate_slots(open_time: datetime.time, close_time: datetime.time, service_duration: int):
+    """Félóránkénti kezdési időpontok, amelyekbe a szolgáltatás még belefér"""
+    all_slots = []
+    current_hour = open_time.hour
+    current_minute = open_time.minute
+    
+    close_hour = close_time.hour
+    close_minute = close_time.minute
+    
+    while True:
+        end_minute = current_minute + service_duration
+        end_hour = current_hour + (end_minute // 60)
+        end_minute = end_minute % 60
         
-        if not calendar_id:
-            logger.info(f"🔍 Nincs calendar_id, minden időpont elérhető: {len(all_slots)} db")
-            return all_slots
+        if end_hour > close_hour or (end_hour == close_hour and end_minute > close_minute):
+            break
         
-        try:
-            from ..calendar.google_calendar import get_busy_slots
-            busy_slots = await asyncio.to_thread(get_busy_slots, calendar_id, date)
-            
-            logger.info(f"🔍 Foglalt időpontok: {len(busy_slots)} db")
-            logger.info(f"🔍 Összes lehetséges időpont: {len(all_slots)} db")
-            
-            available_slots = []
-            for slot in all_slots:
-                slot_start = slot
-                slot_end = add_minutes_to_time(slot, service_duration)
-                
-                is_available = True
-                for busy_start, busy_end in busy_slots:
-                    if times_overlap(slot_start, slot_end, busy_start, busy_end):
-                        is_available = False
-                        logger.info(f"❌ Időpont foglalt: {slot_start} - {slot_end} ütközik {busy_start} - {busy_end}")
-                        break
-                
-                if is_available:
-                    available_slots.append(slot)
-                    logger.info(f"✅ Időpont szabad: {slot_start}")
-            
-            logger.info(f"🔍 Szabad időpontok: {len(available_slots)} db")
-            return available_slots
-            
-        except Exception as e:
-            logger.error(f"⚠️ Google Calendar hiba, minden időpontot visszaadunk: {e}")
-            return all_slots
+        all_slots.append(datetime.time(current_hour, current_minute))
+        
+        current_minute += 30
+        if current_minute >= 60:
+            current_hour += 1
+            current_minute = current_minute % 60
+        
+        if current_hour > close_hour or (current_hour == close_hour and current_minute > close_minute):
+            break
+    
+    return all_slots
+
+def _remove_busy_slots(all_slots, busy_slots, service_duration: int):
+    """Foglalt intervallumokkal ütköző időpontok kiszűrése"""
+    available_slots = []
+    for slot in all_slots:
+        slot_end = add_minutes_to_time(slot, service_duration)
+        if not any(times_overlap(slot, slot_end, busy_start, busy_end) for busy_start, busy_end in busy_slots):
+            available_slots.append(slot)
+    return available_slots
+
+async def _fetch_calendar_busy_slots(calendar_id: str, date: datetime.date):
+    """Foglalt intervallumok a Calendar-ból - hiba esetén None (nincs Calendar adat)"""
+    if not calendar_id:
+        return None
+    try:
+        from ..calendar.google_calendar import get_busy_slots
+        return await asyncio.to_thread(get_busy_slots, calendar_id, date)
+    except Exception as e:
+        logger.error(f"⚠️ Google Calendar hiba, csak a lokális foglalásokat szűrjük: {e}")
+        return None
+
+async def _fetch_busy_slots(salon_name: str, calendar_id: str, date: datetime.date):
+    """Calendar foglaltság + a lokálisan már visszaigazolt, de még szinkronra váró foglalások.
+
+    Az outbox worker csak késve hozza létre a Calendar eseményt; addig a
+    freebusy nem látja, ezért a pending sorokat is foglaltnak vesszük.
+    None: egyáltalán nincs foglaltsági adat (minden időpont szabad).
+    """
+    calendar_busy, pending_busy = await gather_or_cancel(
+        _fetch_calendar_busy_slots(calendar_id, date),
+        fetch_pending_busy_slots(salon_name, date)
+    )
+    if calendar_busy is None and not pending_busy:
+        return None
+    return (calendar_busy or []) + pending_busy
+
+async def get_busy_slots(salon_name: str, date: datetime.date, calendar_id: str = None):
+    """Foglalt intervallumok egy napra (Calendar + szinkronra váró foglalások) - None, ha nincs adat"""
+    return await _fetch_busy_slots(salon_name, calendar_id, date)
+
+def _build_available_slots(opening, busy_slots, service_duration: int):
+    if opening is None:
+        return []
+    all_slots = _generate_slots(opening[0], opening[1], service_duration)
+    if busy_slots is None:
+        logger.info(f"🔍 Nincs foglaltsági adat, minden időpont elérhető: {len(all_slots)} db")
+        return all_slots
+    
+    available_slots = _remove_busy_slots(all_slots, busy_slots, service_duration)
+    logger.info(f"🔍 Szabad időpontok: {len(available_slots)}/{len(all_slots)} db ({len(busy_slots)} foglalt)")
+    return available_slots
+
+async def get_available_slots(salon_name: str, date: datetime.date, service_duration: int = 60, calendar_id: str = None):
+    """Szabad időpontok lekérése - nyitvatartás és Calendar foglaltság párhuzamosan"""
+    try:
+        opening, busy_slots = await gather_or_cancel(
+            asyncio.to_thread(_fetch_opening_for_day, salon_name, date),
+            _fetch_busy_slots(salon_name, calendar_id, date)
+        )
+        return _build_available_slots(opening, busy_slots, service_duration)
             
     except Error as e:
         logger.error(f"⚠️ DB hiba (get_available_slots): {e}")
         return []
 
+async def get_available_slots_for_service(salon_name: str, date: datetime.date, service_name: str, calendar_id: str = None):
+    """Szabad időpontok egy szolgáltatásra - időtartam, nyitvatartás és foglaltság egyszerre"""
+    try:
+        service_duration, opening, busy_slots = await gather_or_cancel(
+            get_service_duration(salon_name, service_name),
+            asyncio.to_thread(_fetch_opening_for_day, salon_name, date),
+            _fetch_busy_slots(salon_name, calendar_id, date)
+        )
+        return _build_available_slots(opening, busy_slots, service_duration)
+            
+    except Error as e:
+        logger.error(f"⚠️ DB hiba (get_available_slots_for_service): {e}")
+        return []
+
 async def get_services(salon_name: str):
     """Szolgáltatások lekérése (service, time)"""
     try:
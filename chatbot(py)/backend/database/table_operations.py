@@ -75,6 +75,66 @@ def _ensure_user_events_table_exists(conn, chat_id: int):
     """)
     cur.close()
 
+def _ensure_booking_outbox_table_exists(conn):
+    """Foglalási outbox tábla létrehozása (Calendar szinkronhoz)"""
+    cur = conn.cursor()
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS booking_outbox (
+            event_id VARCHAR(255) PRIMARY KEY,
+            chat_id BIGINT NOT NULL,
+            service VARCHAR(100) NOT NULL,
+            summary VARCHAR(255) NOT NULL,
+            start_at DATETIME NOT NULL,
+            duration_minutes INT NOT NULL DEFAULT 60,
+            status VARCHAR(16) NOT NULL DEFAULT 'pending',
+            attempts INT NOT NULL DEFAULT 0,
+            next_attempt_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            last_error VARCHAR(500),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            INDEX idx_booking_outbox_due (status, next_attempt_at),
+            INDEX idx_booking_outbox_start (status, start_at)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """)
+    cur.close()
+
+def _ensure_reminders_table_exists(conn):
+    """Emlékeztetők tábla létrehozása (foglalásonként több időzítő)"""
+    cur = conn.cursor()
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS reminders (
+            event_id VARCHAR(255) NOT NULL,
+            kind VARCHAR(32) NOT NULL,
+            chat_id BIGINT NOT NULL,
+            service VARCHAR(100) NOT NULL,
+            start_at DATETIME NOT NULL,
+            offset_minutes INT NOT NULL,
+            due_at DATETIME NOT NULL,
+            status VARCHAR(16) NOT NULL DEFAULT 'pending',
+            sent_at DATETIME,
+            PRIMARY KEY (event_id, kind),
+            INDEX idx_reminders_due (status, due_at)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """)
+    cur.close()
+
+def _ensure_monitor_lease_tables_exist(conn):
+    """Monitor lease + process heartbeat táblák (globális DB, több példányos futáshoz)"""
+    cur = conn.cursor()
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS monitor_leases (
+            salon_name VARCHAR(255) PRIMARY KEY,
+            owner_id VARCHAR(255) NOT NULL,
+            expires_at DATETIME(3) NOT NULL
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS monitor_processes (
+            owner_id VARCHAR(255) PRIMARY KEY,
+            last_seen DATETIME(3) NOT NULL
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """)
+    cur.close()
+
 def _assert_numeric_chat_id(chat_id: int | str):
     """Chat ID biztonsági ellenőrzés"""
     if not re.fullmatch(r"\d+", str(chat_id)):
@@ -88,6 +148,8 @@ async def initialize_salon_database(salon_name: str):
             _ensure_salon_users_table_exists(conn)
             _ensure_opening_hours_table_exists(conn)
             _ensure_services_table_exists(conn)
+            _ensure_booking_outbox_table_exists(conn)
+            _ensure_reminders_table_exists(conn)
             conn.close()
             
         await asyncio.to_thread(db_task)
@@ -0,0 +1,239 @@
+# backend/notifications/reminders.py
+import asyncio
+import datetime
+import heapq
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Tuple, Any
+
+logger = logging.getLogger(__name__)
+
+class _Reminder:
+    """Egy memóriában ütemezett emlékeztető"""
+
+    __slots__ = ('salon_name', 'event_id', 'kind', 'chat_id', 'service', 'start_at', 'offset_minutes', 'due_at')
+
+    def __init__(self, salon_name: str, event_id: str, kind: str, chat_id: int, service: str,
+                 start_at: datetime.datetime, offset_minutes: int, due_at: datetime.datetime):
+        self.salon_name = salon_name
+        self.event_id = event_id
+        self.kind = kind
+        self.chat_id = chat_id
+        self.service = service
+        self.start_at = start_at
+        self.offset_minutes = offset_minutes
+        self.due_at = due_at
+
+class ReminderScheduler:
+    """Időpont emlékeztetők - min-heap a következő esedékesség szerint, polling nélkül.
+
+    A `reminders` tábla az igazság forrása (túléli az újraindítást); memóriában
+    csak a horizonton belül esedékes időzítők vannak. Foglaláskor, áthelyezéskor
+    és törléskor a heap inkrementálisan frissül, a ciklus pedig csak a
+    legközelebbi esedékességkor (vagy a horizont újratöltésekor) ébred.
+    """
+
+    def __init__(self, horizon_seconds: int = 6 * 3600, refill_interval: float = None):
+        self.horizon_seconds = horizon_seconds
+        self.refill_interval = refill_interval or horizon_seconds / 2
+        self.is_running = False
+
+        self.salons: Dict[str, Any] = {}  # salon_name -> application
+        self._heap: List[Tuple[datetime.datetime, int, Tuple[str, str, str]]] = []
+        self._scheduled: Dict[Tuple[str, str, str], _Reminder] = {}  # (salon, event_id, kind) -> élő bejegyzés
+        self._seq = 0
+        self._next_refill = 0.0
+        self._wakeup: Optional[asyncio.Event] = None
+        self.stats = {'loaded': 0, 'sent': 0, 'skipped': 0, 'cancelled': 0, 'rescheduled': 0}
+
+    def register_salon(self, salon_name: str, application):
+        """Szalon regisztrálása - a következő ébredéskor betöltődnek az emlékeztetői"""
+        self.salons[salon_name] = application
+        self._next_refill = 0.0
+        self._wake()
+        logger.info(f"⏰ Emlékeztető ütemező szalon regisztrálva: {salon_name}")
+
+    def unregister_salon(self, salon_name: str):
+        """Szalon kivétele (pl. ha egy másik processz vette át)"""
+        if self.salons.pop(salon_name, None) is None:
+            return
+        for key in [k for k in self._scheduled if k[0] == salon_name]:
+            del self._scheduled[key]
+        logger.info(f"⏰ Emlékeztető ütemező szalon kivéve: {salon_name}")
+
+    def _wake(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _horizon_end(self) -> datetime.datetime:
+        return datetime.datetime.now() + datetime.timedelta(seconds=self.horizon_seconds)
+
+    def _schedule(self, reminder: _Reminder) -> bool:
+        """Bejegyzés felvétele a heapbe, ha a horizonton belül esedékes"""
+        key = (reminder.salon_name, reminder.event_id, reminder.kind)
+        if reminder.due_at > self._horizon_end():
+            # Később a horizont újratöltése hozza be
+            self._scheduled.pop(key, None)
+            return False
+        current = self._scheduled.get(key)
+        if current is not None and current.due_at == reminder.due_at:
+            return False
+        self._scheduled[key] = reminder
+        self._seq += 1
+        heapq.heappush(self._heap, (reminder.due_at, self._seq, key))
+        self._wake()
+        return True
+
+    def add_booking(self, salon_name: str, event_id: str, chat_id: int, service: str,
+                    start_dt: datetime.datetime):
+        """Új foglalás emlékeztetői (a DB sorokat az enqueue_booking már rögzítette)"""
+        if salon_name not in self.salons:
+            return
+        from backend.database.reminder_operations import build_reminder_rows
+
+        for row in build_reminder_rows(event_id, chat_id, service, start_dt):
+            self._schedule(_Reminder(salon_name, *row))
+
+    def reschedule(self, salon_name: str, event_id: str, start_dt: datetime.datetime):
+        """Áthelyezett foglalás (a DB sorokat az update_event_times_batch már frissítette)"""
+        pushed = 0
+        now = datetime.datetime.now()
+        for key in [k for k in self._scheduled if k[0] == salon_name and k[1] == event_id]:
+            reminder = self._scheduled.pop(key)
+            due_at = start_dt - datetime.timedelta(minutes=reminder.offset_minutes)
+            if due_at <= now:
+                # Az új időpontra már elmúlt esedékesség (a DB-ben 'skipped') - nem küldjük azonnal
+                continue
+            moved = _Reminder(
+                salon_name, event_id, reminder.kind, reminder.chat_id, reminder.service, start_dt,
+                reminder.offset_minutes, due_at
+            )
+            pushed += self._schedule(moved)
+        if pushed:
+            self.stats['rescheduled'] += 1
+        # A horizonon kívülről behozott időpontot a memória nem ismeri - újratöltjük
+        self._next_refill = 0.0
+        self._wake()
+
+    def discard(self, salon_name: str, event_id: str):
+        """Foglalás emlékeztetőinek eldobása a memóriából (a heap bejegyzések lustán törlődnek)"""
+        for key in [k for k in self._scheduled if k[0] == salon_name and k[1] == event_id]:
+            del self._scheduled[key]
+
+    async def cancel(self, salon_name: str, event_id: str):
+        """Törölt foglalás emlékeztetőinek visszavonása (DB + memória)"""
+        from backend.database.reminder_operations import cancel_reminders
+
+        self.discard(salon_name, event_id)
+        await cancel_reminders(salon_name, event_id)
+        self.stats['cancelled'] += 1
+
+    async def start(self):
+        """Ütemező ciklus - csak esedékességkor vagy horizont újratöltéskor ébred"""
+        self.is_running = True
+        self._wakeup = asyncio.Event()
+        logger.info(f"⏰ Emlékeztető ütemező elindítva ({len(self.salons)} szalon)")
+
+        while self.is_running:
+            self._wakeup.clear()
+
+            if time.monotonic() >= self._next_refill:
+                await self._refill()
+
+            now = datetime.datetime.now()
+            while self._heap and self._heap[0][0] <= now:
+                due_at, _, key = heapq.heappop(self._heap)
+                reminder = self._scheduled.get(key)
+                if reminder is None or reminder.due_at != due_at:
+                    continue  # visszavont vagy áthelyezett elavult bejegyzés
+                del self._scheduled[key]
+                await self._fire(reminder)
+
+            timeout = max(0.0, self._next_refill - time.monotonic())
+            if self._heap:
+                due_in = (self._heap[0][0] - datetime.datetime.now()).total_seconds()
+                timeout = min(timeout, max(0.0, due_in))
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _refill(self):
+        """A horizonton belül esedékes emlékeztetők betöltése a DB-ből"""
+        from backend.database.reminder_operations import fetch_upcoming_reminders
+
+        self._next_refill = time.monotonic() + self.refill_interval
+        for salon_name in list(self.salons):
+            rows = await fetch_upcoming_reminders(salon_name, self.horizon_seconds)
+            loaded = 0
+            for row in rows:
+                if self._schedule(_Reminder(salon_name, **row)):
+                    loaded += 1
+            self.stats['loaded'] += loaded
+            if loaded:
+                logger.info(f"⏰ {loaded} emlékeztető betöltve ({salon_name})")
+
+        # A heapben maradt elavult bejegyzések takarítása, ha elszaporodtak
+        if len(self._heap) > 2 * len(self._scheduled) + 64:
+            self._heap = [entry for entry in self._heap
+                          if self._scheduled.get(entry[2]) is not None
+                          and self._scheduled[entry[2]].due_at == entry[0]]
+            heapq.heapify(self._heap)
+
+    async def _fire(self, reminder: _Reminder):
+        """Emlékeztető küldése - a DB claim garantálja, hogy csak egyszer menjen ki"""
+        from backend.database.reminder_operations import claim_reminder
+
+        application = self.salons.get(reminder.salon_name)
+        if application is None:
+            return
+        if not await claim_reminder(reminder.salon_name, reminder.event_id, reminder.kind, reminder.due_at):
+            self.stats['skipped'] += 1
+            return
+
+        from backend.notifications.telegram_queue import get_notification_queue
+        get_notification_queue(application).enqueue(reminder.chat_id, self._format_message(reminder), parse_mode='HTML')
+        self.stats['sent'] += 1
+        logger.info(f"⏰ Emlékeztető sorba állítva: {reminder.chat_id} ({reminder.kind}, {reminder.event_id})")
+
+    @staticmethod
+    def _format_message(reminder: _Reminder) -> str:
+        """Emlékeztető szöveg a tényleges kezdési időből (áthelyezés után is helyes)"""
+        start_at = reminder.start_at
+        days = (start_at.date() - datetime.date.today()).days
+        if days == 0:
+            when = f"ma {start_at.strftime('%H:%M')}-kor"
+        elif days == 1:
+            when = f"holnap {start_at.strftime('%H:%M')}-kor"
+        else:
+            when = start_at.strftime("%Y.%m.%d. %H:%M")
+
+        return (
+            "⏰ <b>EMLÉKEZTETŐ</b>\n\n"
+            f"Időpontod van {when}.\n"
+            f"💇 <b>Szolgáltatás:</b> {reminder.service}\n"
+            f"🏪 <b>Szalon:</b> {reminder.salon_name}\n\n"
+            "Várunk szeretettel! 😊"
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Ütemező metrikák"""
+        next_due = min((r.due_at for r in self._scheduled.values()), default=None)
+        return {
+            'scheduled': len(self._scheduled),
+            'heap_size': len(self._heap),
+            'next_due': next_due.isoformat() if next_due else None,
+            **self.stats,
+        }
+
+    def stop(self):
+        """Ütemező leállítása"""
+        self.is_running = False
+        self._wake()
+        logger.info("⏹️ Emlékeztető ütemező leállítva")
+
+# Globális emlékeztető ütemező példány
+reminder_scheduler = ReminderScheduler(
+    horizon_seconds=int(os.getenv("REMINDER_HORIZON_SECONDS", str(6 * 3600))),
+)
@@ -0,0 +1,250 @@
+# backend/notifications/telegram_queue.py
+import asyncio
+import collections
+import datetime
+import logging
+import time
+from typing import Dict, List, Optional, Tuple, Any
+
+logger = logging.getLogger(__name__)
+
+# Telegram korlátok: ~30 üzenet/mp globálisan, ~1 üzenet/mp egy chatbe
+DEFAULT_GLOBAL_RATE = 25.0
+DEFAULT_PER_CHAT_RATE = 1.0
+TELEGRAM_MAX_MESSAGE_LENGTH = 4096
+
+class TokenBucket:
+    """Egyszerű token bucket (rate token/mp, capacity maximális löket)"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Hány másodperc múlva lesz 1 token"""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+    def is_full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+class _PendingNotice:
+    """Egy chatnek szóló, még el nem küldött (összevont) értesítés"""
+
+    __slots__ = ('chat_id', 'parse_mode', 'texts', 'enqueued_at', 'not_before', 'attempts')
+
+    def __init__(self, chat_id: int, parse_mode: Optional[str], enqueued_at: float, not_before: float):
+        self.chat_id = chat_id
+        self.parse_mode = parse_mode
+        self.texts: List[str] = []
+        self.enqueued_at = enqueued_at
+        self.not_before = not_before
+        self.attempts = 0
+
+class TelegramNotificationQueue:
+    """Botonkénti kimenő üzenetsor - rate limit, RetryAfter, újrapróbálás, összevonás"""
+
+    def __init__(self, bot, global_rate: float = DEFAULT_GLOBAL_RATE,
+                 per_chat_rate: float = DEFAULT_PER_CHAT_RATE, coalesce_delay: float = 0.3,
+                 max_attempts: int = 5, retry_base_delay: float = 2.0):
+        self.bot = bot
+        self.global_bucket = TokenBucket(global_rate, max(1.0, global_rate))
+        self.per_chat_rate = per_chat_rate
+        self.coalesce_delay = coalesce_delay
+        self.max_attempts = max_attempts
+        self.retry_base_delay = retry_base_delay
+
+        self._chat_buckets: Dict[int, TokenBucket] = {}
+        self._pending: Dict[Tuple[int, Optional[str]], _PendingNotice] = {}
+        self._order: collections.deque = collections.deque()  # kulcsok érkezési sorrendben
+        self._paused_until = 0.0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+
+        self.stats = {
+            'enqueued': 0,
+            'sent': 0,
+            'coalesced': 0,
+            'failed': 0,
+            'retries': 0,
+            'retry_after': 0,
+        }
+        self._latencies: collections.deque = collections.deque(maxlen=500)
+
+    def enqueue(self, chat_id: int, text: str, parse_mode: Optional[str] = 'HTML'):
+        """Üzenet sorba állítása (nem blokkol; azonos chat üzenetei összevonódnak)"""
+        now = time.monotonic()
+        key = (chat_id, parse_mode)
+        notice = self._pending.get(key)
+
+        if notice is None:
+            notice = _PendingNotice(chat_id, parse_mode, now, now + self.coalesce_delay)
+            self._pending[key] = notice
+            self._order.append(key)
+        else:
+            self.stats['coalesced'] += 1
+
+        notice.texts.append(text)
+        self.stats['enqueued'] += 1
+        self._ensure_worker()
+
+    def _ensure_worker(self):
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+        self._wakeup.set()
+
+    @property
+    def queue_depth(self) -> int:
+        """Várakozó üzenetek száma (összevonás előtt)"""
+        return sum(len(notice.texts) for notice in self._pending.values())
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(self.per_chat_rate, 1.0)
+            self._chat_buckets[chat_id] = bucket
+        return bucket
+
+    def _next_ready(self, now: float) -> Tuple[Optional[Tuple], float]:
+        """Első küldhető kulcs, vagy a legrövidebb várakozási idő"""
+        min_wait = float('inf')
+        for key in self._order:
+            notice = self._pending[key]
+            wait = max(notice.not_before - now, self._chat_bucket(notice.chat_id).wait_time(now))
+            if wait <= 0:
+                return key, 0.0
+            min_wait = min(min_wait, wait)
+        return None, min_wait
+
+    async def _run(self):
+        """Küldő ciklus - addig fut, amíg van várakozó üzenet"""
+        while self._order:
+            self._wakeup.clear()
+            now = time.monotonic()
+
+            pause = max(self._paused_until - now, self.global_bucket.wait_time(now))
+            if pause > 0:
+                await asyncio.sleep(pause)
+                continue
+
+            key, wait = self._next_ready(now)
+            if key is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            self._order.remove(key)
+            notice = self._pending.pop(key)
+            self.global_bucket.consume(now)
+            self._chat_bucket(notice.chat_id).consume(now)
+            await self._send(key, notice)
+
+        self._prune_chat_buckets()
+        if self.stats['sent']:
+            logger.info(f"📨 Értesítési sor kiürült - {self.get_stats()}")
+
+    async def _send(self, key: Tuple, notice: _PendingNotice):
+        """Egy (összevont) értesítés elküldése, hiba esetén visszarakása a sorba"""
+        try:
+            for chunk in self._split_text("\n\n".join(notice.texts)):
+                await self.bot.send_message(chat_id=notice.chat_id, text=chunk, parse_mode=notice.parse_mode)
+            self.stats['sent'] += 1
+            self._latencies.append(time.monotonic() - notice.enqueued_at)
+            logger.info(f"✅ Értesítés elküldve: {notice.chat_id} ({len(notice.texts)} üzenet összevonva)")
+
+        except Exception as e:
+            retry_after = self._retry_after_seconds(e)
+            now = time.monotonic()
+
+            if retry_after is not None:
+                # Flood limit: a teljes botot szüneteltetjük, az üzenet nem számít hibás próbálkozásnak
+                self.stats['retry_after'] += 1
+                self._paused_until = now + retry_after
+                logger.warning(f"⏳ Telegram RetryAfter {retry_after}s (chat: {notice.chat_id})")
+            else:
+                notice.attempts += 1
+                if notice.attempts >= self.max_attempts:
+                    self.stats['failed'] += 1
+                    logger.error(f"❌ Értesítés véglegesen sikertelen {notice.chat_id}: {e}")
+                    return
+                self.stats['retries'] += 1
+                notice.not_before = now + self.retry_base_delay * (2 ** (notice.attempts - 1))
+                logger.warning(f"🔁 Értesítés újrapróbálás ({notice.attempts}. hiba) {notice.chat_id}: {e}")
+
+            self._requeue(key, notice)
+
+    def _requeue(self, key: Tuple, notice: _PendingNotice):
+        """Sikertelen értesítés visszarakása - közben érkezett üzenetekkel összevonva"""
+        newer = self._pending.get(key)
+        if newer is not None:
+            notice.texts.extend(newer.texts)
+            self._order.remove(key)
+        self._pending[key] = notice
+        self._order.appendleft(key)
+
+    @staticmethod
+    def _retry_after_seconds(error: Exception) -> Optional[float]:
+        """telegram.error.RetryAfter felismerése (import nélkül)"""
+        retry_after = getattr(error, 'retry_after', None)
+        if retry_after is None:
+            return None
+        if isinstance(retry_after, datetime.timedelta):
+            return retry_after.total_seconds()
+        return float(retry_after)
+
+    @staticmethod
+    def _split_text(text: str) -> List[str]:
+        """Telegram üzenethossz-korlát szerinti darabolás (bekezdéshatáron, ha lehet)"""
+        if len(text) <= TELEGRAM_MAX_MESSAGE_LENGTH:
+            return [text]
+        chunks = []
+        while len(text) > TELEGRAM_MAX_MESSAGE_LENGTH:
+            cut = text.rfind("\n\n", 0, TELEGRAM_MAX_MESSAGE_LENGTH)
+            if cut <= 0:
+                cut = TELEGRAM_MAX_MESSAGE_LENGTH
+            chunks.append(text[:cut])
+            text = text[cut:].lstrip("\n")
+        if text:
+            chunks.append(text)
+        return chunks
+
+    def _prune_chat_buckets(self):
+        now = time.monotonic()
+        for chat_id in [c for c, bucket in self._chat_buckets.items() if bucket.is_full(now)]:
+            del self._chat_buckets[chat_id]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Sor metrikák: mélység, küldési késleltetés, számlálók"""
+        latencies = sorted(self._latencies)
+        return {
+            'queue_depth': self.queue_depth,
+            'pending_chats': len(self._pending),
+            'latency_avg': round(sum(latencies) / len(latencies), 3) if latencies else None,
+            'latency_p95': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3) if latencies else None,
+            **self.stats,
+        }
+
+def get_notification_queue(application) -> TelegramNotificationQueue:
+    """Az Application (bot) saját értesítési sora - első híváskor létrehozva"""
+    queue = application.bot_data.get('notification_queue')
+    if queue is None:
+        queue = TelegramNotificationQueue(application.bot)
+        application.bot_data['notification_queue'] = queue
+    return queue
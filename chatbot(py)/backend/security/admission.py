@@ -0,0 +1,186 @@
+# backend/security/admission.py
+import asyncio
+import contextlib
+import logging
+import os
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Terhelési szintek növekvő sorrendben
+NORMAL = 'normal'
+DEGRADED = 'degraded'    # csak szabályalapú kinyerés / válasz
+SHED = 'shed'            # "sokan írnak, próbáld újra" válasz
+LEVELS = (NORMAL, DEGRADED, SHED)
+
+DEFAULT_LIMITS = {'llm': 4, 'calendar': 4, 'db': 8}
+
+class AdmissionRejected(Exception):
+    """Nem kapott helyet a drága szakasz (túl sokáig várt volna)"""
+
+
+class LoopLagMonitor:
+    """Event loop késés mérése: ennyivel később ébred egy rendszeres sleep a vártnál"""
+
+    def __init__(self, interval: float = 0.25, alpha: float = 0.3):
+        self.interval = interval
+        self.alpha = alpha
+        self.lag = 0.0       # EWMA (mp)
+        self.lag_max = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> asyncio.Task:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return self._task
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.sample(max(0.0, loop.time() - expected))
+
+    def sample(self, lag: float):
+        self.lag = self.alpha * lag + (1 - self.alpha) * self.lag
+        self.lag_max = max(self.lag_max, lag)
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+
+class _Slot:
+    """Egy (szalon, erőforrás) korlátja és várakozói"""
+
+    __slots__ = ('semaphore', 'limit', 'waiting', 'active')
+
+    def __init__(self, limit: int):
+        self.semaphore = asyncio.Semaphore(limit)
+        self.limit = limit
+        self.waiting = 0
+        self.active = 0
+
+
+class AdmissionController:
+    """Szalononkénti befogadás-szabályozás a drága szakaszokra (LLM, Calendar, DB).
+
+    Minden szalon erőforrásonként korlátos számú párhuzamos hívást kap, így
+    egy lassú függőség nem tölti meg a loopot és nem húzza le a többi szalont.
+    A szint (NORMAL → DEGRADED → SHED) az event loop késéséből és a szalon
+    várakozási sorából számolódik, visszaléptetés csak a küszöb felénél.
+    """
+
+    def __init__(self, limits: Dict[str, int] = None, degrade_lag: float = 0.2, shed_lag: float = 1.0,
+                 degrade_queue: float = 1.0, shed_queue: float = 4.0, max_wait: float = 10.0,
+                 lag_monitor: LoopLagMonitor = None):
+        self.limits = {**DEFAULT_LIMITS, **(limits or {})}
+        self.degrade_lag = degrade_lag
+        self.shed_lag = shed_lag
+        self.degrade_queue = degrade_queue   # várakozók / limit arány
+        self.shed_queue = shed_queue
+        self.max_wait = max_wait
+        self.lag_monitor = lag_monitor or LoopLagMonitor()
+        self._slots: Dict[Tuple[str, str], _Slot] = {}
+        self._levels: Dict[str, str] = {}
+        self.stats = {'admitted': 0, 'rejected': 0, 'degraded_messages': 0, 'shed_messages': 0, 'transitions': {}}
+
+    def _slot(self, salon_name: str, resource: str) -> _Slot:
+        key = (salon_name, resource)
+        slot = self._slots.get(key)
+        if slot is None:
+            slot = _Slot(self.limits.get(resource, 4))
+            self._slots[key] = slot
+        return slot
+
+    @contextlib.asynccontextmanager
+    async def slot(self, salon_name: str, resource: str, timeout: float = None):
+        """Hely kérése egy drága szakaszra - AdmissionRejected, ha túl sokáig kellene várni"""
+        slot = self._slot(salon_name, resource)
+        slot.waiting += 1
+        try:
+            await asyncio.wait_for(slot.semaphore.acquire(), timeout or self.max_wait)
+        except asyncio.TimeoutError:
+            self.stats['rejected'] += 1
+            raise AdmissionRejected(f"{salon_name}/{resource}")
+        finally:
+            slot.waiting -= 1
+
+        slot.active += 1
+        self.stats['admitted'] += 1
+        try:
+            yield
+        finally:
+            slot.active -= 1
+            slot.semaphore.release()
+
+    def _queue_pressure(self, salon_name: str) -> float:
+        """Legnagyobb várakozó / limit arány a szalon erőforrásai közül"""
+        pressure = 0.0
+        for (name, _), slot in self._slots.items():
+            if name == salon_name:
+                pressure = max(pressure, slot.waiting / slot.limit)
+        return pressure
+
+    def _target_level(self, lag: float, pressure: float, current: str) -> str:
+        # Hiszterézis: egy elért szintről csak a küszöb felénél lépünk vissza
+        shed_factor = 0.5 if current == SHED else 1.0
+        degrade_factor = 0.5 if current != NORMAL else 1.0
+        if lag >= self.shed_lag * shed_factor or pressure >= self.shed_queue * shed_factor:
+            return SHED
+        if lag >= self.degrade_lag * degrade_factor or pressure >= self.degrade_queue * degrade_factor:
+            return DEGRADED
+        return NORMAL
+
+    def level(self, salon_name: str) -> str:
+        """Aktuális terhelési szint - az átmeneteket naplózza és számolja"""
+        current = self._levels.get(salon_name, NORMAL)
+        lag = self.lag_monitor.lag
+        pressure = self._queue_pressure(salon_name)
+        level = self._target_level(lag, pressure, current)
+        if level != current:
+            self._levels[salon_name] = level
+            transition = f"{current}->{level}"
+            self.stats['transitions'][transition] = self.stats['transitions'].get(transition, 0) + 1
+            log = logger.warning if LEVELS.index(level) > LEVELS.index(current) else logger.info
+            log(f"🚦 Terhelési szint ({salon_name}): {current} → {level} "
+                f"(loop késés {lag * 1000:.0f}ms, sor {pressure:.1f})")
+        if level == DEGRADED:
+            self.stats['degraded_messages'] += 1
+        elif level == SHED:
+            self.stats['shed_messages'] += 1
+        return level
+
+    def start(self) -> asyncio.Task:
+        """Loop késés mérés indítása"""
+        return self.lag_monitor.start()
+
+    def stop(self):
+        self.lag_monitor.stop()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Szintek, loop késés, szalon/erőforrás foglaltság"""
+        return {
+            'loop_lag_ms': round(self.lag_monitor.lag * 1000, 1),
+            'loop_lag_max_ms': round(self.lag_monitor.lag_max * 1000, 1),
+            'levels': dict(self._levels),
+            'slots': {
+                f"{salon_name}/{resource}": {'active': slot.active, 'waiting': slot.waiting, 'limit': slot.limit}
+                for (salon_name, resource), slot in self._slots.items()
+            },
+            **self.stats,
+        }
+
+
+# Globális admission controller példány
+admission_controller = AdmissionController(
+    limits={
+        'llm': int(os.getenv("ADMISSION_LLM_CONCURRENCY", "4")),
+        'calendar': int(os.getenv("ADMISSION_CALENDAR_CONCURRENCY", "4")),
+        'db': int(os.getenv("ADMISSION_DB_CONCURRENCY", "8")),
+    },
+    degrade_lag=float(os.getenv("LOOP_LAG_DEGRADE_MS", "200")) / 1000,
+    shed_lag=float(os.getenv("LOOP_LAG_SHED_MS", "1000")) / 1000,
+    max_wait=float(os.getenv("ADMISSION_MAX_WAIT_SECONDS", "10"))
+)
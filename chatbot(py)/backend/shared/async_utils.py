@@ -0,0 +1,24 @@
+# backend/shared/async_utils.py
+import asyncio
+import logging
+from typing import Any, Awaitable, List
+
+logger = logging.getLogger(__name__)
+
+async def gather_or_cancel(*aws: Awaitable) -> List[Any]:
+    """Párhuzamos futtatás strukturáltan: az első hibánál a többi task megszakad.
+
+    Az asyncio.gather-rel szemben hiba (vagy a hívó megszakítása) után nem
+    maradnak árva taskok; az eredmények a bemenet sorrendjében jönnek vissza.
+    """
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        failed = next((task for task in tasks if task.done() and not task.cancelled() and task.exception()), None)
+        if failed is not None:
+            raise failed.exception()
+        return [task.result() for task in tasks]
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
@@ -0,0 +1,288 @@
+# backend/webhook/telegram_webhook.py
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import time
+from typing import Any, Dict, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = 'x-telegram-bot-api-secret-token'
+DEFAULT_MAX_BODY_BYTES = 1024 * 1024
+DEFAULT_MAX_PENDING = 1000
+
+
+class RequestTimeout(Exception):
+    """A kérés (fejlécek + törzs) nem érkezett meg a határidőn belül"""
+
+_REASONS = {
+    200: 'OK', 400: 'Bad Request', 403: 'Forbidden', 404: 'Not Found',
+    405: 'Method Not Allowed', 408: 'Request Timeout', 411: 'Length Required', 413: 'Payload Too Large',
+    503: 'Service Unavailable',
+}
+
+def derive_secret_token(bot_token: str, shared_secret: str = None) -> str:
+    """Webhook secret token a bot tokenjéből (Telegram: 1-256 karakter, A-Z a-z 0-9 _ -)"""
+    key = (shared_secret or 'salon-webhook').encode()
+    return hmac.new(key, bot_token.encode(), hashlib.sha256).hexdigest()
+
+
+class WebhookRoute:
+    """Egy bot útvonala: path -> Application, saját secret tokennel"""
+
+    __slots__ = ('salon_name', 'application', 'path', 'secret_token', 'stats')
+
+    def __init__(self, salon_name: str, application, path: str, secret_token: str):
+        self.salon_name = salon_name
+        self.application = application
+        self.path = path
+        self.secret_token = secret_token
+        self.stats = {'accepted': 0, 'rejected': 0, 'shed': 0}
+
+    def pending(self) -> int:
+        """A bot feldolgozásra váró update-jei (sor + párhuzamos processzor hátraléka)"""
+        processor = getattr(self.application, 'update_processor', None)
+        return self.application.update_queue.qsize() + getattr(processor, 'pending', 0)
+
+
+class TelegramWebhookServer:
+    """Egyetlen HTTP szerver az összes szalon botjához.
+
+    Útvonalanként egy Application; a kérés csak helyes secret tokennel kerül
+    a bot update_queue-jába. Ha egy bot sora megtelt, 503-at adunk vissza,
+    így a Telegram később újraküldi az update-et (backpressure).
+    """
+
+    def __init__(self, host: str = '0.0.0.0', port: int = 8443, base_url: str = None,
+                 path_prefix: str = 'telegram', max_pending: int = DEFAULT_MAX_PENDING,
+                 max_body_bytes: int = DEFAULT_MAX_BODY_BYTES, idle_timeout: float = 75.0,
+                 request_timeout: float = 10.0):
+        self.host = host
+        self.port = port
+        self.base_url = (base_url or '').rstrip('/')
+        self.path_prefix = path_prefix.strip('/')
+        self.max_pending = max_pending
+        self.max_body_bytes = max_body_bytes
+        self.idle_timeout = idle_timeout          # keep-alive: a következő kérés első soráig
+        self.request_timeout = request_timeout    # a megkezdett kérés fejlécei + törzse összesen
+        self._routes: Dict[str, WebhookRoute] = {}
+        self._by_salon: Dict[str, WebhookRoute] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: Set[asyncio.StreamWriter] = set()
+        self.stats = {'requests': 0, 'not_found': 0, 'bad_request': 0, 'timeouts': 0, 'latency_max': 0.0}
+
+    def add_route(self, salon_name: str, application, secret_token: str) -> WebhookRoute:
+        """Bot felvétele - új szalon = új útvonal"""
+        route = WebhookRoute(salon_name, application, f"/{self.path_prefix}/{salon_name}", secret_token)
+        self._routes[route.path] = route
+        self._by_salon[salon_name] = route
+        logger.info(f"🔗 Webhook útvonal: {route.path} → {salon_name}")
+        return route
+
+    def remove_route(self, salon_name: str):
+        route = self._by_salon.pop(salon_name, None)
+        if route:
+            self._routes.pop(route.path, None)
+
+    def webhook_url(self, salon_name: str) -> str:
+        return f"{self.base_url}{self._by_salon[salon_name].path}"
+
+    async def start(self):
+        """HTTP szerver indítása"""
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        logger.info(f"🌐 Webhook szerver fut: {self.host}:{self.port} ({len(self._routes)} bot)")
+
+    async def register_webhooks(self, max_connections: int = 40):
+        """setWebhook minden botra (a polling helyett)"""
+        for route in list(self._routes.values()):
+            try:
+                await route.application.bot.set_webhook(
+                    url=self.webhook_url(route.salon_name),
+                    secret_token=route.secret_token,
+                    max_connections=max_connections
+                )
+                logger.info(f"✅ Webhook beállítva: {route.salon_name}")
+            except Exception as e:
+                logger.error(f"❌ Webhook beállítási hiba ({route.salon_name}): {e}")
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            # Tétlen keep-alive kapcsolatok lezárása, hogy a kezelőik kilépjenek
+            for writer in list(self._connections):
+                writer.close()
+            await asyncio.sleep(0)
+            await self._server.wait_closed()
+            self._server = None
+            logger.info("⏹️ Webhook szerver leállítva")
+
+    async def inject_update(self, salon_name: str, payload: Any, secret_token: str = None) -> int:
+        """Lokális update befecskendezés (teszteléshez) - ugyanaz az útvonal, mint a HTTP kérésé.
+
+        Alapértelmezésben a route saját secret tokenjét küldi, mintha a Telegram hívna.
+        """
+        route = self._by_salon.get(salon_name)
+        path = route.path if route else f"/{self.path_prefix}/{salon_name}"
+        if secret_token is None and route:
+            secret_token = route.secret_token
+        headers = {SECRET_HEADER: secret_token} if secret_token else {}
+        body = payload if isinstance(payload, (bytes, bytearray)) else json.dumps(payload).encode()
+        return await self.handle_request('POST', path, headers, bytes(body))
+
+    async def handle_request(self, method: str, target: str, headers: Dict[str, str], body: bytes) -> int:
+        """Egy webhook kérés feldolgozása - HTTP státuszkóddal tér vissza"""
+        started = time.monotonic()
+        self.stats['requests'] += 1
+
+        route = self._routes.get(target.split('?', 1)[0])
+        if route is None:
+            self.stats['not_found'] += 1
+            return 404
+        if method != 'POST':
+            return 405
+
+        if not hmac.compare_digest(headers.get(SECRET_HEADER, '').encode(), route.secret_token.encode()):
+            route.stats['rejected'] += 1
+            logger.warning(f"🚨 Hibás webhook secret token: {route.salon_name}")
+            return 403
+
+        # Backpressure: teli sor esetén a Telegram később újrapróbálja
+        if route.pending() >= self.max_pending:
+            route.stats['shed'] += 1
+            return 503
+
+        try:
+            data = json.loads(body)
+        except ValueError:
+            self.stats['bad_request'] += 1
+            return 400
+
+        await self._dispatch(route, data)
+        route.stats['accepted'] += 1
+        self.stats['latency_max'] = max(self.stats['latency_max'], time.monotonic() - started)
+        return 200
+
+    async def _dispatch(self, route: WebhookRoute, data: Dict):
+        from telegram import Update
+        update = Update.de_json(data, route.application.bot)
+        await route.application.update_queue.put(update)
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[Tuple[str, str, str, Dict[str, str], float]]:
+        """Kérés sor + fejlécek + a törzs határideje (None, ha a kapcsolat lezárult)
+
+        A kérés sor után a fejléceknek és a törzsnek együtt `request_timeout`
+        alatt kell megérkezniük (slowloris ellen); lejáratkor RequestTimeout.
+        """
+        request_line = await asyncio.wait_for(reader.readline(), timeout=self.idle_timeout)
+        if not request_line:
+            return None
+        deadline = time.monotonic() + self.request_timeout
+        method, target, version = request_line.decode('latin-1').split()
+        try:
+            headers = await asyncio.wait_for(self._read_headers(reader), timeout=self.request_timeout)
+        except asyncio.TimeoutError:
+            raise RequestTimeout("fejlécek")
+        return method, target, version, headers, deadline
+
+    @staticmethod
+    async def _read_headers(reader: asyncio.StreamReader) -> Dict[str, str]:
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        return headers
+
+    async def _read_body(self, reader: asyncio.StreamReader, length: int, deadline: float) -> bytes:
+        if not length:
+            return b''
+        try:
+            return await asyncio.wait_for(reader.readexactly(length), timeout=max(0.0, deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            raise RequestTimeout("törzs")
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Keep-alive HTTP/1.1 kapcsolat kiszolgálása"""
+        self._connections.add(writer)
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except RequestTimeout:
+                    await self._request_timed_out(writer)
+                    break
+                except (asyncio.TimeoutError, ConnectionError, asyncio.IncompleteReadError):
+                    break
+                except ValueError:
+                    await self._respond(writer, 400, keep_alive=False)
+                    break
+                if request is None:
+                    break
+
+                method, target, version, headers, deadline = request
+                if 'chunked' in headers.get('transfer-encoding', '').lower():
+                    await self._respond(writer, 411, keep_alive=False)
+                    break
+                try:
+                    length = int(headers.get('content-length') or 0)
+                except ValueError:
+                    await self._respond(writer, 400, keep_alive=False)
+                    break
+                if length > self.max_body_bytes:
+                    await self._respond(writer, 413, keep_alive=False)
+                    break
+
+                try:
+                    body = await self._read_body(reader, length, deadline)
+                except RequestTimeout:
+                    await self._request_timed_out(writer)
+                    break
+                try:
+                    status = await self.handle_request(method, target, headers, body)
+                except Exception as e:
+                    logger.error(f"❌ Webhook feldolgozási hiba: {e}")
+                    status = 503
+
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                await self._respond(writer, status, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+
+    async def _request_timed_out(self, writer: asyncio.StreamWriter):
+        self.stats['timeouts'] += 1
+        await self._respond(writer, 408, keep_alive=False)
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: int, keep_alive: bool = True):
+        extra = "Retry-After: 1\r\n" if status == 503 else ""
+        writer.write(
+            f"HTTP/1.1 {status} {_REASONS.get(status, 'Error')}\r\n"
+            f"Content-Length: 0\r\n{extra}"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1')
+        )
+        await writer.drain()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Szerver és útvonal metrikák"""
+        return {
+            'connections': len(self._connections),
+            **self.stats,
+            'routes': {
+                route.salon_name: {'pending': route.pending(), **route.stats}
+                for route in self._routes.values()
+            },
+        }
@@ -22,6 +22,13 @@ sys.path.insert(0, os.path.dirname(backend_dir))  # backend szülő mappa
 
 print(f"🔍 Python path: {sys.path}")
 
+# .env betöltése (backend opciók, pl. CALENDAR_BACKEND)
+try:
+    from dotenv import load_dotenv
+    load_dotenv(os.path.join(current_dir, ".env"))
+except ImportError:
+    print("⚠️ python-dotenv nem elérhető, .env kihagyva")
+
 # Konfig betöltése
 config_path = os.path.join(current_dir, "config.json")
 try:
@@ -32,6 +39,15 @@ except FileNotFoundError:
     print("❌ config.json nem található")
     CONFIG = {}
 
+# Több processzes futtatás: "lease" esetén a szalonok monitorait lease alapján osztják el
+MONITOR_OWNERSHIP = os.getenv("MONITOR_OWNERSHIP", "none").lower()
+
+# Egy boton belül párhuzamosan feldolgozott update-ek (chaten belül a sorrend megmarad)
+TELEGRAM_CONCURRENT_UPDATES = int(os.getenv("TELEGRAM_CONCURRENT_UPDATES", "32"))
+
+# Update-ek fogadása: "polling" (botonként long-poll) vagy "webhook" (egy HTTP szerver minden botnak)
+TELEGRAM_MODE = os.getenv("TELEGRAM_MODE", "polling").lower()
+
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     level=logging.INFO
@@ -53,12 +69,8 @@ def setup_handlers(application, salon_name: str):
         application.add_handler(CommandHandler("nyitvatartas", opening_hours_command))
         application.add_handler(CommandHandler("help", help_command))
         
-        # Üzenet handler - SALON SPECIFIKUS
-        async def salon_specific_message_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
-            context.bot_data['salon_name'] = salon_name
-            await handle_intelligent_message(update, context)
-        
-        application.add_handler(MessageHandler(filters.TEXT & (~filters.COMMAND), salon_specific_message_handler))
+        # Üzenet handler - a szalont a bothoz csatolt SalonContext adja
+        application.add_handler(MessageHandler(filters.TEXT & (~filters.COMMAND), handle_intelligent_message))
         
         logger.info(f"✅ Handler-ek regisztrálva: {salon_name}")
         
@@ -81,6 +93,8 @@ async def setup_telegram_bots() -> Dict[str, Any]:
         from telegram.ext import ApplicationBuilder, ContextTypes
         from telegram import Update
         from telegram.ext import filters
+        from modules.salon.context import build_salon_context
+        from modules.handlers.update_processor import ChatOrderedUpdateProcessor
         
         applications = {}
         
@@ -94,14 +108,22 @@ async def setup_telegram_bots() -> Dict[str, Any]:
             try:
                 print(f"🤖 Bot indítása: {salon_name}")
                 
-                # Bot létrehozása
-                app = ApplicationBuilder().token(cfg["token"]).build()
+                # Bot létrehozása - párhuzamos update feldolgozás, chatenként sorrendben
+                app = (
+                    ApplicationBuilder()
+                    .token(cfg["token"])
+                    .concurrent_updates(ChatOrderedUpdateProcessor(TELEGRAM_CONCURRENT_UPDATES, salon_name))
+                    .build()
+                )
                 
                 # Bot adatokba mentjük a konfigot és szalon nevet
                 app.bot_data['CONFIG'] = CONFIG
                 app.bot_data['salon_name'] = salon_name
                 app.bot_data['salon_config'] = cfg
                 
+                # Előre összeállított szalon kontextus - a handlerek ezt olvassák
+                build_salon_context(salon_name, cfg, app)
+                
                 # Handler-ek beállítása
                 setup_handlers(app, salon_name)
                 
@@ -121,12 +143,13 @@ async def setup_telegram_bots() -> Dict[str, Any]:
 async def setup_ai_services(config: dict):
     """AI szolgáltatások inicializálása"""
     try:
-        gemini_api_key = config.get("gemini_api_key")
+        from modules.ai.llm_provider import create_llm_provider
+        provider = create_llm_provider(config.get("gemini_api_key"))
         
-        if gemini_api_key:
+        if provider:
             from modules.ai.hybrid_extractor import HybridInfoExtractor
-            info_extractor = HybridInfoExtractor(gemini_api_key)
-            logger.info("✅ Hybrid AI extractor initialized")
+            info_extractor = HybridInfoExtractor(provider=provider)
+            logger.info(f"✅ Hybrid AI extractor initialized ({provider.name})")
         else:
             from modules.ai.info_extractor import info_extractor
             logger.info("✅ Rule-based extractor initialized (no AI key)")
@@ -139,33 +162,117 @@ async def setup_ai_services(config: dict):
         return info_extractor
 
 async def start_calendar_monitors(applications: Dict[str, Any]):
-    """Calendar monitorok indítása MINDEN szalonhoz - JAVÍTOTT"""
+    """Calendar monitorok indítása MINDEN szalonhoz - központi ütemezővel"""
     try:
-        from backend.calendar.monitor import calendar_monitor
-        
-        monitor_tasks = []
+        from backend.calendar.scheduler import monitor_scheduler
         
         for salon_name, application in applications.items():
             calendar_id = CONFIG.get(salon_name, {}).get("calendar_id")
             if calendar_id:
                 try:
-                    # ⚠️ JAVÍTÁS: Application átadása, nem application.bot
-                    monitor_task = asyncio.create_task(
-                        calendar_monitor.start_monitoring(application, salon_name, calendar_id)
+                    # Lease módban a tulajdonlás indítja el a szalon monitorát
+                    monitor_scheduler.add_salon(
+                        application, salon_name, calendar_id,
+                        start=MONITOR_OWNERSHIP != "lease"
                     )
-                    monitor_tasks.append(monitor_task)
-                    logger.info(f"🔍 Calendar monitor elindítva: {salon_name}")
+                    logger.info(f"🔍 Calendar monitor ütemezve: {salon_name}")
                     
                 except Exception as e:
                     logger.error(f"❌ Calendar monitor indítási hiba {salon_name}: {e}")
         
-        logger.info(f"✅ {len(monitor_tasks)} calendar monitor elindítva")
-        return monitor_tasks
+        if not monitor_scheduler.salons:
+            return []
+        
+        # Egyetlen ütemező task az összes szalonhoz
+        scheduler_task = asyncio.create_task(monitor_scheduler.run())
+        logger.info(f"✅ {len(monitor_scheduler.salons)} calendar monitor elindítva")
+        return [scheduler_task]
         
     except ImportError as e:
         logger.warning(f"⚠️ Calendar monitor nem elérhető: {e}")
         return []
 
+async def start_booking_outbox_worker(applications: Dict[str, Any]):
+    """Foglalási outbox worker indítása (Calendar szinkron a háttérben)"""
+    try:
+        from backend.calendar.outbox_worker import booking_outbox_worker
+        
+        for salon_name, application in applications.items():
+            calendar_id = CONFIG.get(salon_name, {}).get("calendar_id")
+            if calendar_id and MONITOR_OWNERSHIP != "lease":
+                booking_outbox_worker.register_salon(salon_name, calendar_id, application)
+        
+        if not booking_outbox_worker.salons and MONITOR_OWNERSHIP != "lease":
+            return None
+        
+        worker_task = asyncio.create_task(booking_outbox_worker.start())
+        logger.info("✅ Outbox worker elindítva")
+        return worker_task
+        
+    except ImportError as e:
+        logger.warning(f"⚠️ Outbox worker nem elérhető: {e}")
+        return None
+
+async def start_reminder_scheduler(applications: Dict[str, Any]):
+    """Időpont emlékeztető ütemező indítása"""
+    try:
+        from backend.notifications.reminders import reminder_scheduler
+        
+        for salon_name, application in applications.items():
+            if CONFIG.get(salon_name, {}).get("calendar_id") and MONITOR_OWNERSHIP != "lease":
+                reminder_scheduler.register_salon(salon_name, application)
+        
+        reminder_task = asyncio.create_task(reminder_scheduler.start())
+        logger.info("✅ Emlékeztető ütemező elindítva")
+        return reminder_task
+        
+    except ImportError as e:
+        logger.warning(f"⚠️ Emlékeztető ütemező nem elérhető: {e}")
+        return None
+
+async def start_monitor_ownership(applications: Dict[str, Any]):
+    """Lease alapú szalon-tulajdonlás indítása (MONITOR_OWNERSHIP=lease)"""
+    if MONITOR_OWNERSHIP != "lease":
+        return None
+    
+    try:
+        from backend.calendar.ownership import shard_ownership
+        from backend.calendar.scheduler import monitor_scheduler
+        from backend.calendar.outbox_worker import booking_outbox_worker
+        from backend.notifications.reminders import reminder_scheduler
+        
+        for salon_name, application in applications.items():
+            calendar_id = CONFIG.get(salon_name, {}).get("calendar_id")
+            if not calendar_id:
+                continue
+            
+            def register_outbox(name, calendar_id=calendar_id, application=application):
+                booking_outbox_worker.register_salon(name, calendar_id, application)
+            
+            shard_ownership.register_salon(
+                salon_name,
+                on_acquired=monitor_scheduler.start_salon,
+                on_lost=monitor_scheduler.stop_salon
+            )
+            shard_ownership.register_salon(
+                salon_name,
+                on_acquired=register_outbox,
+                on_lost=booking_outbox_worker.unregister_salon
+            )
+            shard_ownership.register_salon(
+                salon_name,
+                on_acquired=lambda name, application=application: reminder_scheduler.register_salon(name, application),
+                on_lost=reminder_scheduler.unregister_salon
+            )
+        
+        ownership_task = asyncio.create_task(shard_ownership.run())
+        logger.info(f"✅ Szalon-tulajdonlás elindítva: {shard_ownership.owner_id}")
+        return ownership_task
+        
+    except ImportError as e:
+        logger.warning(f"⚠️ Szalon-tulajdonlás nem elérhető: {e}")
+        return None
+
 async def start_all_bots(applications: Dict[str, Any]):
     """Összes bot indítása"""
     start_tasks = []
@@ -191,6 +298,38 @@ async def start_single_bot(application, salon_name: str):
     except Exception as e:
         logger.error(f"❌ Bot indítási hiba ({salon_name}): {e}")
 
+async def start_webhook_server(applications: Dict[str, Any]):
+    """Webhook mód: egyetlen HTTP szerver, útvonalanként egy bot (nincs long-poll)"""
+    try:
+        from backend.webhook.telegram_webhook import TelegramWebhookServer, derive_secret_token
+        
+        base_url = os.getenv("TELEGRAM_WEBHOOK_URL")
+        if not base_url:
+            logger.error("❌ TELEGRAM_WEBHOOK_URL nincs megadva, polling módra váltunk")
+            return None
+        
+        webhook_server = TelegramWebhookServer(
+            host=os.getenv("TELEGRAM_WEBHOOK_LISTEN", "0.0.0.0"),
+            port=int(os.getenv("TELEGRAM_WEBHOOK_PORT", "8443")),
+            base_url=base_url,
+            max_pending=int(os.getenv("TELEGRAM_WEBHOOK_MAX_PENDING", "1000")),
+            request_timeout=float(os.getenv("TELEGRAM_WEBHOOK_REQUEST_TIMEOUT", "10"))
+        )
+        shared_secret = os.getenv("TELEGRAM_WEBHOOK_SECRET")
+        
+        for salon_name, app in applications.items():
+            await app.initialize()
+            await app.start()
+            webhook_server.add_route(salon_name, app, derive_secret_token(app.bot.token, shared_secret))
+        
+        await webhook_server.start()
+        await webhook_server.register_webhooks()
+        return webhook_server
+        
+    except Exception as e:
+        logger.error(f"❌ Webhook szerver indítási hiba: {e}")
+        return None
+
 async def main():
     """Fő alkalmazás - TÖBBSZÁLAS BOTOKKAL"""
     logger.info("🚀 Többszálas bot indítása...")
@@ -220,11 +359,31 @@ async def main():
         # 4. Calendar monitorok indítása
         monitor_tasks = await start_calendar_monitors(applications)
         
-        # 5. ÖSSZES BOT INDÍTÁSA párhuzamosan
+        # 4/b. Foglalási outbox worker indítása
+        outbox_task = await start_booking_outbox_worker(applications)
+        
+        # 4/c. Időpont emlékeztetők
+        reminder_task = await start_reminder_scheduler(applications)
+        
+        # 4/d. Több processz esetén: szalonok elosztása lease-ekkel
+        ownership_task = await start_monitor_ownership(applications)
+        
+        # 4/e. Terhelés-figyelés: event loop késés → befogadás-szabályozás / load shedding
+        from backend.security.admission import admission_controller
+        admission_controller.start()
+        
+        # 5. ÖSSZES BOT INDÍTÁSA - webhook módban egy közös szerver, egyébként botonként polling
+        webhook_server = None
+        if TELEGRAM_MODE == "webhook":
+            webhook_server = await start_webhook_server(applications)
+        
         bot_tasks = []
-        for salon_name, app in applications.items():
-            bot_task = asyncio.create_task(start_single_bot(app, salon_name))
-            bot_tasks.append(bot_task)
+        if webhook_server:
+            bot_tasks.append(asyncio.create_task(webhook_server.serve_forever()))
+        else:
+            for salon_name, app in applications.items():
+                bot_task = asyncio.create_task(start_single_bot(app, salon_name))
+                bot_tasks.append(bot_task)
         
         logger.info(f"✅ {len(bot_tasks)} bot és {len(monitor_tasks)} monitor elindítva")
         
@@ -235,13 +394,40 @@ async def main():
         except KeyboardInterrupt:
             logger.info("⏹️ Botok leállítva...")
         finally:
+            # Lease-ek elengedése, hogy más processz azonnal átvehesse
+            if ownership_task:
+                from backend.calendar.ownership import shard_ownership
+                shard_ownership.stop()
+                await asyncio.wait([ownership_task], timeout=5)
+            
             # Calendar monitor leállítása
             try:
-                from backend.calendar.monitor import calendar_monitor
-                calendar_monitor.stop_monitoring()
+                from backend.calendar.scheduler import monitor_scheduler
+                monitor_scheduler.stop()
             except Exception as e:
                 logger.warning(f"⚠️ Calendar monitor leállítási hiba: {e}")
             
+            # Outbox worker leállítása
+            if outbox_task:
+                from backend.calendar.outbox_worker import booking_outbox_worker
+                booking_outbox_worker.stop()
+            
+            # Emlékeztető ütemező leállítása
+            if reminder_task:
+                from backend.notifications.reminders import reminder_scheduler
+                reminder_scheduler.stop()
+            
+            # Terhelés-figyelés leállítása
+            admission_controller.stop()
+            
+            # LLM szálkészlet leállítása
+            from modules.ai.llm_executor import llm_executor
+            llm_executor.shutdown()
+            
+            # Webhook szerver leállítása (a Telegram a ki nem kézbesített update-eket megtartja)
+            if webhook_server:
+                await webhook_server.stop()
+            
             # Botok leállítása
             for salon_name, app in applications.items():
                 try:
@@ -0,0 +1,154 @@
+# chatbot/modules/ai/combined_response.py
+import datetime
+import json
+import logging
+import re
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+WEEKDAY_NAMES = ['hétfő', 'kedd', 'szerda', 'csütörtök', 'péntek', 'szombat', 'vasárnap']
+_TIME_PERIODS = ('délelőtt', 'délután')
+_MAX_REPLY_LENGTH = 1000
+
+# Egyetlen válasz: kinyert mezők + szolgáltatás-szándék + a felhasználónak szánt szöveg
+COMBINED_SCHEMA = {
+    'type': 'OBJECT',
+    'properties': {
+        'service': {'type': 'STRING', 'nullable': True},
+        'date': {'type': 'STRING', 'nullable': True},
+        'time': {'type': 'STRING', 'nullable': True},
+        'time_period': {'type': 'STRING', 'nullable': True, 'enum': list(_TIME_PERIODS)},
+        'name': {'type': 'STRING', 'nullable': True},
+        'phone': {'type': 'STRING', 'nullable': True},
+        'confidence': {'type': 'NUMBER'},
+        'services_intent': {'type': 'BOOLEAN'},
+        'reply': {'type': 'STRING'},
+    },
+    'required': ['confidence', 'services_intent', 'reply'],
+}
+
+_FENCE_RE = re.compile(r'^```(?:json)?\s*|\s*```$')
+
+
+class CombinedResponseError(ValueError):
+    """A kombinált LLM válasz nem felel meg a sémának"""
+
+
+def build_combined_prompt(text: str, services: List[str], known_info: Dict,
+                          available_slots: List[str], history: List[str] = None,
+                          today: datetime.date = None, fields: Tuple[str, ...] = None) -> str:
+    """Prompt a kombinált híváshoz: kinyerés, szándék és válasz egyben.
+
+    `fields` megadásakor csak ezeket a mezőket kérjük kinyerni (üres: csak
+    szándék és válasz, a többi adat már ismert).
+    """
+    today = today or datetime.date.today()
+    services_list = "\n".join(f"- {service}" for service in services) or "- (nincs megadva)"
+    known = {key: (value.isoformat() if hasattr(value, 'isoformat') else value)
+             for key, value in known_info.items() if value and key != 'confidence'}
+    slots_text = ", ".join(available_slots) if available_slots else "nincs adat"
+    history_text = "\n    ".join(history or []) or "Nincs"
+    if fields is None:
+        extract_text = "a felhasználó ÜZENETÉBŐL kinyert adatokat (csak amit ténylegesen megadott, ne találj ki semmit)"
+    elif fields:
+        extract_text = (f"a felhasználó ÜZENETÉBŐL kinyert adatokat, csak ezeket: {', '.join(fields)} "
+                        f"(a többi mező null; csak amit ténylegesen megadott, ne találj ki semmit)")
+    else:
+        extract_text = "adatot nem kell kinyerni (minden adatmező null), az ismert adatok lent vannak"
+
+    return f"""
+    Te egy barátságos szalon időpontfoglaló asszisztens vagy. Egyetlen JSON válaszban add vissza:
+    1. {extract_text},
+    2. hogy a szolgáltatások listájára kíváncsi-e (services_intent),
+    3. a választ (reply), amit a felhasználónak küldünk.
+
+    SZABÁLYOK:
+    - Dátum: YYYY-MM-DD, a relatív dátumokat (holnap, jövő kedden) a mai dátumhoz képest számold
+    - Idő: HH:MM; time_period: "délelőtt" (9:00-12:00) vagy "délután" (13:00-18:00), ha pontos idő nincs
+    - service csak az elérhető szolgáltatások egyike lehet
+    - reply: barátságos, max 2-3 mondat, emojikkal; kérdezz rá a még hiányzó adatra
+      (szolgáltatás, dátum, időszak/idő, név, telefonszám - ebben a sorrendben)
+    - Ha dátum van, de idő és időszak nincs, kérdezd meg, délelőtt vagy délután jönne
+    - Időpontot csak a szabad időpontok közül ajánlj, és csak a kért időszakból
+    - Ha a felhasználó új dátumot ad meg, a szabad időpontok még nem ismertek: ne sorolj fel időpontot
+
+    MAI DÁTUM: {today.isoformat()} ({WEEKDAY_NAMES[today.weekday()]})
+    ELÉRHETŐ SZOLGÁLTATÁSOK:
+    {services_list}
+    EDDIG ISMERT ADATOK: {json.dumps(known, ensure_ascii=False)}
+    SZABAD IDŐPONTOK (az ismert dátumra): {slots_text}
+    EDDIGI BESZÉLGETÉS:
+    {history_text}
+
+    FELHASZNÁLÓ ÜZENETE: "{text}"
+    """
+
+
+def _optional_str(data: Dict, field: str) -> Optional[str]:
+    value = data.get(field)
+    if value is None:
+        return None
+    if not isinstance(value, str):
+        raise CombinedResponseError(f"{field}: szöveg helyett {type(value).__name__}")
+    value = value.strip()
+    return value if value and value.lower() != 'null' else None
+
+
+def parse_combined_response(raw: str, services: List[str] = None) -> Dict:
+    """Szigorú feldolgozás - minden eltérésre CombinedResponseError.
+
+    Visszatérés: {'extracted': {...}, 'services_intent': bool, 'reply': str}
+    """
+    try:
+        data = json.loads(_FENCE_RE.sub('', raw.strip()))
+    except (ValueError, AttributeError) as e:
+        raise CombinedResponseError(f"nem JSON: {e}")
+    if not isinstance(data, dict):
+        raise CombinedResponseError("a válasz nem JSON objektum")
+
+    services_intent = data.get('services_intent')
+    if not isinstance(services_intent, bool):
+        raise CombinedResponseError("services_intent hiányzik vagy nem bool")
+
+    reply = _optional_str(data, 'reply')
+    if not reply:
+        raise CombinedResponseError("üres reply")
+    if len(reply) > _MAX_REPLY_LENGTH:
+        raise CombinedResponseError("túl hosszú reply")
+
+    confidence = data.get('confidence')
+    if isinstance(confidence, bool) or not isinstance(confidence, (int, float)):
+        raise CombinedResponseError("confidence nem szám")
+
+    extracted = {
+        'service': _optional_str(data, 'service'),
+        'date': None,
+        'time': None,
+        'name': _optional_str(data, 'name'),
+        'phone': _optional_str(data, 'phone'),
+        'confidence': min(1.0, max(0.0, float(confidence))),
+    }
+
+    if services and extracted['service']:
+        # Csak katalógusbeli szolgáltatás (kis/nagybetűtől függetlenül)
+        by_lower = {service.lower(): service for service in services}
+        extracted['service'] = by_lower.get(extracted['service'].lower())
+
+    try:
+        date_text = _optional_str(data, 'date')
+        if date_text:
+            extracted['date'] = datetime.datetime.strptime(date_text, '%Y-%m-%d').date()
+        time_text = _optional_str(data, 'time')
+        if time_text:
+            extracted['time'] = datetime.datetime.strptime(time_text, '%H:%M').time()
+    except ValueError as e:
+        raise CombinedResponseError(f"hibás dátum / idő: {e}")
+
+    time_period = _optional_str(data, 'time_period')
+    if time_period:
+        if time_period not in _TIME_PERIODS:
+            raise CombinedResponseError(f"ismeretlen time_period: {time_period}")
+        extracted['time_period'] = time_period
+
+    return {'extracted': extracted, 'services_intent': services_intent, 'reply': reply}
@@ -0,0 +1,99 @@
+# chatbot/modules/ai/extraction_cache.py
+import datetime
+import hashlib
+import logging
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Abszolút dátumra utaló minták (ezeknél a dátum nem a mai naphoz képest értendő):
+# évszám, hónap.nap záró ponttal vagy napraggal (10.20., 10.20-án), hónapnév.
+# A 14.30 / 14:30 jellegű időpont és a telefonszám-töredék (06-20-...) nem dátum.
+_ABSOLUTE_DATE_RE = re.compile(
+    r'(?<!\d)20\d{2}[.\-/]\s?\d{1,2}|'
+    r'(?P<month_day>(?<![\d.:])(?:0?[1-9]|1[0-2])[./]\s?(?:0?[1-9]|[12]\d|3[01])(?:\.(?!\d)|-(?:j?[áé]n|[aei])\b))|'
+    r'január|február|március|április|május|június|július|augusztus|szeptember|október|november|december|'
+    r'jan\.|feb\.|márc\.|ápr\.|jún\.|júl\.|aug\.|szept\.|okt\.|nov\.|dec\.'
+)
+# A mai naphoz kötött szavak mellett a hónap.nap. alak is inkább időpont ("holnap 10.30.")
+_RELATIVE_DAY_RE = re.compile(r'\b(?:ma|mai|holnap\w*|holnapután\w*)\b')
+# Hét napjai: a relatív eltolás a mai nap hét napjától függ
+_WEEKDAY_RE = re.compile(r'hétf|hetf|kedd|szerd|csütört|csutort|péntek|pentek|szombat|vasárnap|vasarnap')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_text(text: str) -> str:
+    """Kulcs normalizálás: kisbetű, összevont szóközök, záró írásjelek nélkül"""
+    return _WHITESPACE_RE.sub(' ', text.lower()).strip(' .!?,;')
+
+
+def is_absolute_date_text(text: str) -> bool:
+    """A szövegben szereplő dátum naptári (nem a mai naphoz képest értendő)"""
+    lowered = text.lower()
+    match = _ABSOLUTE_DATE_RE.search(lowered)
+    if match is None:
+        return False
+    return not (match.group('month_day') and _RELATIVE_DAY_RE.search(lowered))
+
+
+def services_fingerprint(services: List[str]) -> str:
+    """A szalon szolgáltatás-katalógusának rövid hash-e"""
+    return hashlib.sha1('\n'.join(sorted(services)).encode('utf-8')).hexdigest()[:12]
+
+
+class ExtractionCache:
+    """AI kinyerési eredmények cache-e (normalizált szöveg + katalógus hash szerint).
+
+    A relatív dátumok ("holnap", "jövő kedden") eltolásként tárolódnak és
+    kiolvasáskor a mai naphoz képest oldódnak fel; hét napjára utaló szövegnél
+    a kulcs a mai nap hét napját is tartalmazza.
+    """
+
+    def __init__(self, max_entries: int = 2000, ttl_seconds: float = 86400.0,
+                 today=datetime.date.today):
+        self._cache = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self._today = today
+
+    def _key(self, text: str, services: List[str], fields: Tuple[str, ...] = None) -> Tuple:
+        normalized = normalize_text(text)
+        weekday = self._today().weekday() if _WEEKDAY_RE.search(normalized) else None
+        return normalized, services_fingerprint(services), weekday, fields
+
+    def get(self, text: str, services: List[str], fields: Tuple[str, ...] = None) -> Optional[Dict]:
+        """Találat esetén friss dict, a dátum a mai naphoz igazítva (szűkített kérésnél a mezőlista is kulcs)"""
+        entry = self._cache.get(self._key(text, services, fields))
+        if entry is None:
+            return None
+        data, date_offset, absolute_date = entry
+        result = dict(data)
+        if absolute_date is not None:
+            result['date'] = absolute_date
+        elif date_offset is not None:
+            result['date'] = self._today() + datetime.timedelta(days=date_offset)
+        return result
+
+    def set(self, text: str, services: List[str], result: Dict, fields: Tuple[str, ...] = None):
+        data = dict(result)
+        extracted_date = data.pop('date', None)
+        date_offset = absolute_date = None
+        if isinstance(extracted_date, datetime.date):
+            if is_absolute_date_text(text):
+                absolute_date = extracted_date
+            else:
+                date_offset = (extracted_date - self._today()).days
+        data['date'] = None
+        self._cache.set(self._key(text, services, fields), (data, date_offset, absolute_date))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return self._cache.get_stats()
+
+
+# Globális kinyerési cache példány
+extraction_cache = ExtractionCache(
+    max_entries=int(os.getenv("EXTRACTION_CACHE_SIZE", "2000")),
+    ttl_seconds=float(os.getenv("EXTRACTION_CACHE_TTL_SECONDS", "86400"))
+)
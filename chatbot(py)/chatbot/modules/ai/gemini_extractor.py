@@ -1,29 +1,76 @@
 # chatbot/modules/ai/gemini_extractor.py
 import logging
 import json
-import google.generativeai as genai
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Tuple
 import datetime
 import re
-import asyncio
+
+from .extraction_cache import extraction_cache
+from .combined_response import COMBINED_SCHEMA, WEEKDAY_NAMES, build_combined_prompt, parse_combined_response
+from .llm_executor import llm_executor
+from .llm_provider import GeminiProvider, LLMProvider
 
 logger = logging.getLogger(__name__)
 
+# Kinyerhető mezők és elvárt formátumuk a promptban
+_FIELD_FORMATS = {
+    'service': 'szolgáltatás neve vagy null',
+    'date': 'YYYY-MM-DD vagy null',
+    'time': 'HH:MM vagy null',
+    'time_period': 'délelőtt / délután vagy null',
+    'name': 'teljes név vagy null',
+    'phone': 'telefonszám vagy null',
+}
+_DEFAULT_FIELDS = ('service', 'date', 'time', 'name', 'phone')
+
 class GeminiInfoExtractor:
     """AI-alapú információ kinyerő Gemini használatával"""
     
-    def __init__(self, api_key: str):
-        self.api_key = api_key
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-2.0-flash')
+    def __init__(self, api_key: str = None, provider: LLMProvider = None):
+        self.provider = provider or GeminiProvider(api_key)
+        
+    async def extract_with_ai(self, text: str, salon_name: str, available_services: List[str],
+                              fields: Tuple[str, ...] = None) -> Dict:
+        """AI-alapú információ kinyerés - ismételt megfogalmazásokra a cache-ből.
+        
+        `fields` megadásakor csak ezeket a mezőket kérjük (rövidebb prompt, a
+        szolgáltatás lista csak akkor kerül bele, ha a szolgáltatás is kell).
+        """
+        cached = extraction_cache.get(text, available_services, fields)
+        if cached is not None:
+            logger.debug(f"♻️ AI kinyerés cache találat: {text}")
+            return cached
         
-    async def extract_with_ai(self, text: str, salon_name: str, available_services: List[str]) -> Dict:
-        """AI-alapú információ kinyerés"""
         try:
-            # Szolgáltatások listája a prompt-hoz
-            services_list = "\n".join([f"- {service}" for service in available_services])
+            prompt = self._build_extraction_prompt(text, available_services, fields or _DEFAULT_FIELDS)
+            response = await self._call_gemini(prompt)
+            result = self._parse_ai_response(response, text)
             
-            prompt = f"""
+            # Csak a ténylegesen kinyert eredmény kerül cache-be (a hibás / üres válasz nem)
+            if any(result.get(field) for field in _FIELD_FORMATS):
+                extraction_cache.set(text, available_services, result, fields)
+            return result
+            
+        except Exception as e:
+            logger.error(f"❌ AI extraction error: {e}")
+            return self._get_fallback_response()
+    
+    @staticmethod
+    def _build_extraction_prompt(text: str, available_services: List[str], fields: Tuple[str, ...]) -> str:
+        """Kinyerési prompt - csak a kért mezőkkel"""
+        today = datetime.date.today()
+        
+        # Szolgáltatások listája a prompt-hoz (csak ha a szolgáltatást is keressük)
+        services_block = ""
+        if 'service' in fields:
+            services_list = "\n".join([f"- {service}" for service in available_services])
+            services_block = f"""
+            ELÉRHETŐ SZOLGÁLTATÁSOK:
+            {services_list}
+            """
+        json_fields = ",\n".join(f'                "{field}": "{_FIELD_FORMATS[field]}"' for field in fields)
+        
+        return f"""
             Te egy szalon időpontfoglaló AI asszisztens vagy. Elemezd a felhasználó üzenetét és add vissza JSON formátumban a kinyert információkat.
 
             SZABÁLYOK:
@@ -33,40 +80,43 @@ class GeminiInfoExtractor:
             - Használj egyszerű nyelvezetet
             - Dátum formátum: YYYY-MM-DD
             - Idő formátum: HH:MM
+            - A relatív dátumokat (holnap, jövő kedden) a mai dátumhoz képest számold
 
-            ELÉRHETŐ SZOLGÁLTATÁSOK:
-            {services_list}
-
+            MAI DÁTUM: {today.isoformat()} ({WEEKDAY_NAMES[today.weekday()]})
+            {services_block}
             FELHASZNÁLÓ ÜZENETE: "{text}"
 
             VÁLASZ JSON FORMÁTUMBAN:
             {{
-                "service": "szolgáltatás neve vagy null",
-                "date": "YYYY-MM-DD vagy null", 
-                "time": "HH:MM vagy null",
-                "name": "teljes név vagy null",
-                "phone": "telefonszám vagy null",
+{json_fields},
                 "confidence": 0.0-1.0
             }}
             """
-            
-            response = await self._call_gemini(prompt)
-            return self._parse_ai_response(response, text)
-            
-        except Exception as e:
-            logger.error(f"❌ AI extraction error: {e}")
-            return self._get_fallback_response()
+    
+    async def extract_combined(self, text: str, available_services: List[str], known_info: Dict,
+                               available_slots: List[str], history: List[str] = None,
+                               fields: Tuple[str, ...] = None) -> Dict:
+        """Kinyerés + szolgáltatás szándék + válasz egy sémához kötött hívásban.
+        
+        `fields`: a kinyerendő mezők (üres: csak szándék és válasz). Hibás vagy
+        sémától eltérő válaszra kivételt dob (CombinedResponseError).
+        """
+        prompt = build_combined_prompt(text, available_services, known_info, available_slots, history,
+                                       fields=fields)
+        response = await self._call_gemini_json(prompt, COMBINED_SCHEMA)
+        return parse_combined_response(response, available_services)
+    
+    async def _call_gemini_json(self, prompt: str, schema: Dict) -> str:
+        """LLM hívás JSON sémához kötött válasszal"""
+        return await llm_executor.call(lambda: self.provider.generate(prompt, schema))
     
     async def _call_gemini(self, prompt: str) -> str:
-        """Gemini API hívás"""
+        """LLM hívás (a beállított szolgáltatón)"""
         try:
-            # Aszinkron hívás
-            response = await asyncio.get_event_loop().run_in_executor(
-                None, lambda: self.model.generate_content(prompt)
-            )
-            return response.text
+            # Saját LLM poolon, határidővel (lassú kérésnél hedge)
+            return await llm_executor.call(lambda: self.provider.generate(prompt))
         except Exception as e:
-            logger.error(f"❌ Gemini API error: {e}")
+            logger.error(f"❌ LLM API error: {e}")
             raise
     
     def _parse_ai_response(self, ai_response: str, original_text: str) -> Dict:
@@ -82,6 +132,8 @@ class GeminiInfoExtractor:
                     data['date'] = datetime.datetime.strptime(data['date'], '%Y-%m-%d').date()
                 if data.get('time'):
                     data['time'] = datetime.datetime.strptime(data['time'], '%H:%M').time()
+                if data.get('time_period') not in (None, 'délelőtt', 'délután'):
+                    data['time_period'] = None
                 
                 logger.info(f"✅ AI extracted: {data}")
                 return data
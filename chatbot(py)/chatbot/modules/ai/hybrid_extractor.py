@@ -1,39 +1,90 @@
 # chatbot/modules/ai/hybrid_extractor.py
+import contextlib
 import logging
-from typing import Dict, Optional
+from typing import AsyncContextManager, Callable, Dict, Mapping, Tuple
 from .info_extractor import SmartInfoExtractor
 from .gemini_extractor import GeminiInfoExtractor
+from .extraction_cache import extraction_cache
+from .llm_executor import llm_executor
+from .llm_provider import LLMProvider
+from modules.conversation.session import missing_mask, mask_to_fields
 from typing import List 
 import json
+import re
 
 logger = logging.getLogger(__name__)
 
+_DEFAULT_FIELDS = ('service', 'date', 'time', 'name', 'phone')
+_AI_FIELDS = _DEFAULT_FIELDS + ('time_period',)
+
 class HybridInfoExtractor:
     """Hibrid információ kinyerő - AI + rule-based"""
     
-    def __init__(self, gemini_api_key: str):
+    def __init__(self, gemini_api_key: str = None, provider: LLMProvider = None):
         self.rule_based = SmartInfoExtractor()
-        self.ai_based = GeminiInfoExtractor(gemini_api_key)
+        self.ai_based = GeminiInfoExtractor(gemini_api_key, provider)
         self.confidence_threshold = 0.7
+        self.combined_stats = {'calls': 0, 'reply_only': 0, 'fallbacks': 0}
+        self.stats = {'extractions': 0, 'ai_calls': 0, 'skipped_complete': 0}
+    
+    def fields_for_ai(self, rule_result: Dict, known_info: Mapping = None) -> Tuple[str, ...]:
+        """Az AI-tól kérendő mezők: a még hiányzók és a bizonytalanok.
+        
+        A session-ben már meglévő és a szabályalapúan biztosan kinyert mezőket
+        nem kérjük újra; üres, ha egyik sem maradt - ilyenkor nincs AI hívás.
+        """
+        field_confidence = rule_result.get('field_confidence', {})
+        merged = dict(known_info or {})
+        merged.update({field: rule_result[field] for field in field_confidence
+                       if field_confidence[field] >= self.confidence_threshold})
+        missing = mask_to_fields(missing_mask(merged))
+        uncertain = [field for field, confidence in field_confidence.items()
+                     if confidence < self.confidence_threshold]
+        fields = tuple(field for field in _AI_FIELDS if field in missing or field in uncertain)
+        if not fields:
+            self.stats['skipped_complete'] += 1
+        return fields
     
-    async def extract_all(self, text: str, salon_name: str) -> Dict:
-        """Hibrid információ kinyerés"""
+    async def extract_all(self, text: str, salon_name: str, known_info: Mapping = None,
+                          ai_slot: Callable[[], AsyncContextManager] = None) -> Dict:
+        """Hibrid információ kinyerés - AI csak a még hiányzó / bizonytalan mezőkre
+        
+        known_info: a session-ben már ismert adatok; ai_slot: az AI hívás köré
+        (pl. admission slot), hogy a szabályalapú út ne foglaljon LLM helyet.
+        """
+        self.stats['extractions'] += 1
+        
         # 1. Rule-based extraction (gyors)
         rule_based_result = await self.rule_based.extract_all(text, salon_name)
         
-        # Ha a confidence magas, használjuk
-        if rule_based_result['confidence'] >= self.confidence_threshold:
+        fields = self.fields_for_ai(rule_based_result, known_info)
+        if not fields:
             logger.info("✅ Rule-based extraction successful")
             return rule_based_result
+        return await self._extract_fields_with_ai(text, salon_name, rule_based_result, fields, ai_slot)
+    
+    async def _extract_fields_with_ai(self, text: str, salon_name: str, rule_based_result: Dict,
+                                      fields: Tuple[str, ...], ai_slot: Callable[[], AsyncContextManager] = None,
+                                      count_call: bool = True) -> Dict:
+        """A kért mezők AI kinyerése, a szabályalapú eredménnyel kombinálva.
+        
+        count_call=False: az üzenet AI hívását már számoltuk (a kombinált hívás pótlása).
+        """
+        # Lassú / hibás szolgáltató: nyitott megszakítónál nincs AI hívás
+        if llm_executor.breaker.is_open():
+            return rule_based_result
         
-        # 2. AI-based extraction (lassú, de okos)
+        # 2. AI-based extraction (lassú, de okos) - szűkített prompttal
         try:
-            available_services = await self._get_available_services(salon_name)
-            ai_result = await self.ai_based.extract_with_ai(text, salon_name, available_services)
+            available_services = await self._get_available_services(salon_name) if 'service' in fields else []
+            if count_call:
+                self.stats['ai_calls'] += 1
+            async with (ai_slot() if ai_slot else contextlib.nullcontext()):
+                ai_result = await self.ai_based.extract_with_ai(text, salon_name, available_services, fields)
             
             # AI eredmény kombinálása rule-based eredménnyel
-            combined_result = self._combine_results(rule_based_result, ai_result)
-            logger.info(f"✅ Hybrid extraction: {combined_result}")
+            combined_result = self._combine_results(rule_based_result, ai_result, fields)
+            logger.info(f"✅ Hybrid extraction ({', '.join(fields)}): {combined_result}")
             return combined_result
             
         except Exception as e:
@@ -50,53 +101,128 @@ class HybridInfoExtractor:
             logger.error(f"❌ Services fetch error: {e}")
             return []
     
-    def _combine_results(self, rule_result: Dict, ai_result: Dict) -> Dict:
-        """Eredmények kombinálása"""
+    def _combine_results(self, rule_result: Dict, ai_result: Dict, fields: Tuple[str, ...] = _AI_FIELDS) -> Dict:
+        """Eredmények kombinálása mezőnként - a bizonyosabb forrás nyer"""
         combined = {}
+        rule_confidence = rule_result.get('field_confidence', {})
+        ai_confidence = ai_result.get('confidence') or 0.0
+        field_confidence = {}
         
-        for field in ['service', 'date', 'time', 'name', 'phone']:
-            # Preferáljuk az AI eredményt, ha magasabb confidence-je van
-            if ai_result.get(field) and ai_result.get('confidence', 0) > rule_result.get('confidence', 0):
+        for field in _AI_FIELDS:
+            rule_value = rule_result.get(field)
+            confidence = rule_confidence.get(field, 0.0) if rule_value else 0.0
+            # Az AI-t csak a kért mezőkről kérdeztük
+            if field in fields and ai_result.get(field) and ai_confidence > confidence:
                 combined[field] = ai_result[field]
+                field_confidence[field] = ai_confidence
             else:
-                combined[field] = rule_result.get(field)
+                combined[field] = rule_value
+                if rule_value:
+                    field_confidence[field] = confidence
         
-        # Confidence számítás
-        filled_fields = sum(1 for v in combined.values() if v is not None)
+        # Confidence számítás (a foglaláshoz kellő 5 mező)
+        filled_fields = sum(1 for field in _DEFAULT_FIELDS if combined[field] is not None)
         combined['confidence'] = filled_fields / 5.0
+        combined['field_confidence'] = field_confidence
         
         return combined
     
-# modules/ai/hybrid_extractor.py
-async def extract_services_intent(self, text: str, salon_name: str) -> Dict:
-    """AI-alapú szolgáltatás szándék felismerés"""
-    try:
-        prompt = f"""
-        Elemezd a felhasználó üzenetét és állapítsd meg, hogy szolgáltatásokra kíváncsi!
-        
-        FELHASZNÁLÓ: "{text}"
-        
-        Kérdések amikre IGEN a válasz:
-        - "Mik a szolgáltatásaid?"
-        - "Mit csináltok?" 
-        - "Milyen frizurákat vágtok?"
-        - "Festeni is tudtok?"
-        - "Milyen hajkezelések vannak?"
-        - "Milyen szolgáltatások érhetők el?"
-        - "Mit lehet nálatok csináltatni?"
-        
-        Válaszolj JSON formátumban:
-        {{
-            "services_intent": true/false,
-            "confidence": 0.0-1.0
-        }}
+    def get_stats(self) -> Dict:
+        """AI hívási arány és a kombinált hívás számlálói"""
+        extractions = self.stats['extractions']
+        return {
+            **self.stats,
+            'ai_call_ratio': round(self.stats['ai_calls'] / extractions, 3) if extractions else 0.0,
+            'combined': dict(self.combined_stats),
+        }
+    
+    async def extract_services_intent(self, text: str, salon_name: str) -> Dict:
+        """AI-alapú szolgáltatás szándék felismerés"""
+        try:
+            prompt = f"""
+            Elemezd a felhasználó üzenetét és állapítsd meg, hogy szolgáltatásokra kíváncsi!
+        
+            FELHASZNÁLÓ: "{text}"
+        
+            Kérdések amikre IGEN a válasz:
+            - "Mik a szolgáltatásaid?"
+            - "Mit csináltok?" 
+            - "Milyen frizurákat vágtok?"
+            - "Festeni is tudtok?"
+            - "Milyen hajkezelések vannak?"
+            - "Milyen szolgáltatások érhetők el?"
+            - "Mit lehet nálatok csináltatni?"
+        
+            Válaszolj JSON formátumban:
+            {{
+                "services_intent": true/false,
+                "confidence": 0.0-1.0
+            }}
+            """
+            
+            response = await self.ai_based._call_gemini(prompt)
+            json_match = re.search(r'\{.*\}', response, re.DOTALL)
+            result = json.loads(json_match.group()) if json_match else {}
+            
+            return {
+                "services_intent": result.get("services_intent") is True,
+                "confidence": float(result.get("confidence") or 0.0)
+            }
+            
+        except Exception as e:
+            logger.error(f"❌ AI services intent error: {e}")
+            return {"services_intent": False, "confidence": 0.0}
+    
+    async def extract_combined(self, text: str, salon_name: str, known_info: Dict,
+                               available_slots: List[str], history: List[str] = None,
+                               ai_slot: Callable[[], AsyncContextManager] = None) -> Dict:
+        """Egyetlen LLM hívás: kinyerés + szolgáltatás szándék + válasz.
+        
+        Előbb a szabályalapú kinyerés fut; az LLM-től csak a még hiányzó /
+        bizonytalan mezőket kérjük (a cache-ben meglévőket sem), ha egy sem
+        maradt, a hívás csak a szándékot és a választ adja. Ha a hívás vagy a
+        szigorú feldolgozás elbukik, a mezők a külön kinyerő hívással jönnek, és
+        'reply' / 'services_intent' None: a hívó a külön hívásos útvonalra vált.
         """
+        self.stats['extractions'] += 1
+        rule_based_result = await self.rule_based.extract_all(text, salon_name)
+        available_services = await self._get_available_services(salon_name)
         
-        response = await self.gemini_client.generate_content_async(prompt)
-        result = json.loads(response.text)
+        extracted = rule_based_result
+        fields = self.fields_for_ai(rule_based_result, known_info)
+        if fields:
+            # A cache csak kontextus nélküli kinyerést tárol, ezért csak olvassuk
+            cached = extraction_cache.get(text, available_services if 'service' in fields else [], fields)
+            if cached is not None:
+                logger.debug(f"♻️ AI kinyerés cache találat, a kombinált hívás csak választ kér: {text}")
+                extracted = self._combine_results(rule_based_result, cached, fields)
+                fields = ()
         
-        return result
+        # A már ismert (session + most kinyert) adatokat a válaszhoz megkapja a prompt
+        prompt_info = dict(known_info)
+        prompt_info.update({field: extracted[field] for field in _AI_FIELDS
+                            if extracted.get(field) and field not in fields})
         
-    except Exception as e:
-        logger.error(f"❌ AI services intent error: {e}")
-        return {"services_intent": False, "confidence": 0.0}
\ No newline at end of file
+        self.combined_stats['calls'] += 1
+        if fields:
+            self.stats['ai_calls'] += 1
+        else:
+            self.combined_stats['reply_only'] += 1
+        try:
+            async with (ai_slot() if ai_slot else contextlib.nullcontext()):
+                result = await self.ai_based.extract_combined(
+                    text, available_services, prompt_info, available_slots, history, fields
+                )
+        except Exception as e:
+            self.combined_stats['fallbacks'] += 1
+            logger.warning(f"⚠️ Kombinált AI hívás sikertelen, külön hívásokra váltunk: {e}")
+            if fields:
+                # Ugyanannak az üzenetnek a kinyerése folytatódik (nem új kinyerés)
+                extracted = await self._extract_fields_with_ai(text, salon_name, rule_based_result, fields,
+                                                               ai_slot, count_call=False)
+            return {'extracted': extracted, 'services_intent': None, 'reply': None}
+        
+        result['extracted'] = self._combine_results(extracted, result['extracted'], fields)
+        logger.info(f"✅ Kombinált AI kinyerés ({', '.join(fields) or 'csak válasz'}): {result['extracted']} "
+                    f"(services_intent={result['services_intent']})")
+        return result
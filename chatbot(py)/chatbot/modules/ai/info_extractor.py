@@ -2,16 +2,25 @@
 import datetime
 import re
 import logging
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Tuple
 import asyncio
 
+from .service_index import ServiceIndex
+
 logger = logging.getLogger(__name__)
 
+# Szabályalapú mezőbizonyosság: egyértelmű minta -> magas, gyenge heurisztika -> alacsony
+_CLOCK_TIME_RE = re.compile(r'\d{1,2}[:\.]\d{2}|\d{1,2}\s*óra')
+_EXPLICIT_DATE_RE = re.compile(r'holnap|\d{1,2}[\.\-]\d{1,2}|hétf|hetf|kedd|szerd|csütört|csutort|péntek|pentek|szombat|vasárnap|vasarnap')
+_TODAY_RE = re.compile(r'\bma\b')
+_NAME_INTRO_RE = re.compile(r'név|neve|nevem', re.IGNORECASE)
+
 class SmartInfoExtractor:
     """Okos információ kinyerő - ADATBÁZISBÓL SZERVEZETT SZOLGÁLTATÁSOKKAL"""
     
     def __init__(self):
         self.services_cache = {}  # Cache: {salon_name: {keyword: service_name}}
+        self.service_index: Dict[str, ServiceIndex] = {}  # elírás-tűrő keresés a nevekre
         self.cache_timestamp = {}
     
     async def _refresh_services_cache(self, salon_name: str):
@@ -30,6 +39,7 @@ class SmartInfoExtractor:
                     services_map[keyword] = service_name
             
             self.services_cache[salon_name] = services_map
+            self.service_index[salon_name] = ServiceIndex([service_name for service_name, _ in services_data])
             self.cache_timestamp[salon_name] = datetime.datetime.now()
             
             logger.info(f"✅ Services cache frissítve: {salon_name} - {len(services_map)} kulcsszó")
@@ -38,6 +48,7 @@ class SmartInfoExtractor:
             logger.error(f"❌ Hiba a services cache frissítésénél ({salon_name}): {e}")
             # Fallback alapértelmezett szolgáltatások
             self.services_cache[salon_name] = self._get_fallback_services()
+            self.service_index[salon_name] = ServiceIndex(sorted(set(self.services_cache[salon_name].values())))
     
     def _generate_keywords(self, service_name: str) -> List[str]:
         """Kulcsszavak generálása a szolgáltatás nevéből"""
@@ -93,6 +104,11 @@ class SmartInfoExtractor:
     
     async def extract_service(self, text: str, salon_name: str) -> str:
         """Szolgáltatás kinyerése a szövegből - ADATBÁZISBÓL"""
+        service_name, _ = await self.match_service(text, salon_name)
+        return service_name
+    
+    async def match_service(self, text: str, salon_name: str) -> Tuple[Optional[str], float]:
+        """Szolgáltatás és bizonyosság: kulcsszó egyezés, majd elírás-tűrő index"""
         try:
             # Cache ellenőrzése és frissítése (1 órás cache)
             if (salon_name not in self.services_cache or 
@@ -106,15 +122,22 @@ class SmartInfoExtractor:
             for keyword, service_name in services_map.items():
                 if keyword in text_lower:
                     logger.info(f"✅ Szolgáltatás megtalálva: '{keyword}' -> '{service_name}'")
-                    return service_name
+                    return service_name, 0.9
+            
+            # Elírás / ékezet nélküli alak (pl. "hajvagasra", "melirozas") - LLM nélkül
+            index = self.service_index.get(salon_name)
+            match = index.match(text) if index else None
+            if match:
+                logger.info(f"✅ Szolgáltatás (fuzzy): '{text}' -> '{match[0]}' ({match[1]})")
+                return match
             
             # Ha nincs egyezés, alapértelmezett
             logger.info(f"🔍 Nincs szolgáltatás egyezés, alapértelmezett használata")
-            return None
+            return None, 0.0
             
         except Exception as e:
             logger.error(f"❌ Hiba a szolgáltatás kinyerésénél: {e}")
-            return None
+            return None, 0.0
 
     @staticmethod
     def extract_date(text: str) -> Optional[datetime.date]:
@@ -278,21 +301,45 @@ class SmartInfoExtractor:
         
         return None
 
+    @staticmethod
+    def field_confidence(text: str, result: Dict, service_score: float = 0.9) -> Dict[str, float]:
+        """Mezőnkénti bizonyosság a kinyert értékekre (csak a megtalált mezők)"""
+        text_lower = text.lower()
+        confidence = {}
+        if result.get('service'):
+            confidence['service'] = service_score  # kulcsszó egyezés, vagy a fuzzy index pontszáma
+        if result.get('date'):
+            # A puszta "ma" részszóként is illeszkedik (pl. "szama")
+            explicit = _EXPLICIT_DATE_RE.search(text_lower) or _TODAY_RE.search(text_lower)
+            confidence['date'] = 0.9 if explicit else 0.3
+        if result.get('time'):
+            # Puszta szám lehet nap, darabszám vagy telefonszám része is
+            confidence['time'] = 0.9 if _CLOCK_TIME_RE.search(text_lower) and not result.get('phone') else 0.4
+        if result.get('name'):
+            confidence['name'] = 0.9 if _NAME_INTRO_RE.search(text) else 0.6
+        if result.get('phone'):
+            confidence['phone'] = 0.9
+        if result.get('time_period'):
+            confidence['time_period'] = 0.9
+        return confidence
+
     async def extract_all(self, text: str, salon_name: str) -> Dict:
         """Minden információ kinyerése egy szövegből - STATIC HIVÁSSAL"""
+        service, service_score = await self.match_service(text, salon_name)
         result = {
             'date': self.extract_date(text),
             'time': self.extract_time(text),
-            'service': await self.extract_service(text, salon_name),
+            'service': service,
             'name': self.extract_name(text),
             'phone': self.extract_phone(text),
             'time_period': SmartInfoExtractor.extract_time_period(text),  # ✅ STATIC HIVÁS
             'confidence': 0.0
         }
         
-        # Confidence számítás
-        filled_fields = sum(1 for v in result.values() if v is not None and v != 'time_period')
+        # Confidence számítás (a foglaláshoz kellő 5 mező alapján) + mezőnkénti bizonyosság
+        filled_fields = sum(1 for field in ('service', 'date', 'time', 'name', 'phone') if result[field] is not None)
         result['confidence'] = filled_fields / 5.0
+        result['field_confidence'] = self.field_confidence(text, result, service_score)
         
         logger.info(f"🔍 Összes kinyert információ: {result}")
         return result
@@ -0,0 +1,284 @@
+# chatbot/modules/ai/llm_executor.py
+import asyncio
+import collections
+import concurrent.futures
+import logging
+import os
+import threading
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Megszakító állapotai
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class LLMUnavailable(Exception):
+    """Az LLM szolgáltató most nem hívható (nyitott megszakító)"""
+
+
+class LLMTimeout(LLMUnavailable):
+    """Az LLM hívás nem fért bele a határidőbe"""
+
+
+class LatencyTracker:
+    """Az utolsó N sikeres hívás ideje - kvantilis a hedge késleltetéshez"""
+
+    def __init__(self, window: int = 200):
+        self._samples = collections.deque(maxlen=window)
+
+    def record(self, seconds: float):
+        self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class CircuitBreaker:
+    """Egymás utáni hibák / időtúllépések után nyit; `reset_timeout` múlva egy próbahívást enged"""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.stats = {'opened': 0}
+
+    def is_open(self) -> bool:
+        """Nyitva van-e (a próbaidő lejártáig minden hívás a tartalék útra megy)"""
+        return self.state == OPEN and self._clock() - self._opened_at < self.reset_timeout
+
+    def allow(self) -> bool:
+        """Mehet-e a hívás - félig nyitott állapotban egyszerre csak egy próba"""
+        if self.state == OPEN:
+            if self._clock() - self._opened_at < self.reset_timeout:
+                return False
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN:
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+        return True
+
+    def record_success(self):
+        if self.state != CLOSED:
+            logger.info("✅ LLM megszakító zárva - a szolgáltató újra válaszol")
+        self.state = CLOSED
+        self.failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._probe_in_flight = False
+        if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+            self.state = OPEN
+            self._opened_at = self._clock()
+            self.stats['opened'] += 1
+            logger.warning(f"🔌 LLM megszakító nyitva {self.reset_timeout:.0f} mp-re "
+                           f"({self.failures} egymás utáni hiba) - szabályalapú feldolgozás")
+
+    def release(self):
+        """Megszakított próbahívás - a következő kérés újra próbálhat"""
+        self._probe_in_flight = False
+
+
+class LLMExecutor:
+    """Saját, korlátos szálkészlet a blokkoló LLM hívásokhoz.
+
+    A Gemini hívások így nem versengenek a DB-s `asyncio.to_thread` hívásokkal
+    az alapértelmezett poolért. Minden hívásnak határideje van; ha az első
+    kérés a p95 késésnél tovább tart és van szabad szál, egy második (hedge)
+    kérés indul, és a gyorsabb nyer. Az időtúllépések és hibák a megszakítót
+    nyitják, ilyenkor a hívók a szabályalapú útra váltanak.
+    """
+
+    def __init__(self, max_workers: int = 8, deadline: float = 8.0, hedge: bool = True,
+                 hedge_quantile: float = 0.95, hedge_min_delay: float = 0.5, min_samples: int = 20,
+                 breaker: CircuitBreaker = None, stream_deadline: float = 30.0, chunk_timeout: float = 5.0):
+        self.max_workers = max_workers
+        self.deadline = deadline
+        self.stream_deadline = stream_deadline   # egy streamelt válasz egésze
+        self.chunk_timeout = chunk_timeout       # két stream darab között
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_delay = hedge_min_delay
+        self.min_samples = min_samples
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = LatencyTracker()
+        self._pool: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self._busy = 0               # szálon futó / sorban álló hívások (a megszakítottak is)
+        self._busy_lock = threading.Lock()
+        self.stats = {'calls': 0, 'timeouts': 0, 'errors': 0, 'short_circuited': 0, 'hedged': 0, 'hedge_wins': 0}
+
+    def _submit(self, func: Callable[[], Any]) -> asyncio.Future:
+        if self._pool is None:
+            self._pool = concurrent.futures.ThreadPoolExecutor(self.max_workers, thread_name_prefix='llm')
+        with self._busy_lock:
+            self._busy += 1
+        future = self._pool.submit(func)
+        future.add_done_callback(self._release_worker)
+        return asyncio.wrap_future(future)
+
+    def _release_worker(self, _future):
+        with self._busy_lock:
+            self._busy -= 1
+
+    def hedge_delay(self) -> Optional[float]:
+        """Ennyi után indul a második kérés (None: nincs hedge / kevés minta)"""
+        if not self.hedge or len(self.latency) < self.min_samples:
+            return None
+        return max(self.hedge_min_delay, self.latency.quantile(self.hedge_quantile))
+
+    async def call(self, func: Callable[[], Any], deadline: float = None) -> Any:
+        """Blokkoló LLM hívás a saját poolon, határidővel és opcionális hedge-dzsel"""
+        return await self._guarded(lambda: self._run_hedged(func), deadline)
+
+    async def stream(self, open_func: Callable[[], Awaitable[AsyncIterator[str]]],
+                     chunk_timeout: float = None, deadline: float = None) -> AsyncIterator[str]:
+        """Natív aszinkron streamelt hívás, hedge nélkül.
+
+        A megnyitásra a szokásos határidő, minden további darabra `chunk_timeout`,
+        az egész streamre `deadline` vonatkozik. A megszakító csak a stream végén
+        kap eredményt: sikert a teljes válasz, hibát az időtúllépés / megszakadt stream.
+        """
+        if not self.breaker.allow():
+            self.stats['short_circuited'] += 1
+            raise LLMUnavailable("LLM megszakító nyitva")
+
+        chunk_timeout = chunk_timeout or self.chunk_timeout
+        deadline = deadline or self.stream_deadline
+        self.stats['calls'] += 1
+        started = time.monotonic()
+        ends_at = started + deadline
+        chunks = None
+        try:
+            chunks = await asyncio.wait_for(open_func(), min(self.deadline, deadline))
+            self.latency.record(time.monotonic() - started)
+            iterator = chunks.__aiter__()
+            while True:
+                remaining = ends_at - time.monotonic()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+                try:
+                    chunk = await asyncio.wait_for(iterator.__anext__(), min(chunk_timeout, remaining))
+                except StopAsyncIteration:
+                    break
+                yield chunk
+        except asyncio.TimeoutError:
+            self.stats['timeouts'] += 1
+            self.breaker.record_failure()
+            raise LLMTimeout(f"a stream elakadt ({time.monotonic() - started:.1f} mp)")
+        except (asyncio.CancelledError, GeneratorExit):
+            # A hívó szakította meg - a szolgáltatóról ez nem mond semmit
+            self.breaker.release()
+            raise
+        except Exception:
+            self.stats['errors'] += 1
+            self.breaker.record_failure()
+            raise
+        finally:
+            if chunks is not None and hasattr(chunks, 'aclose'):
+                await chunks.aclose()
+
+        self.breaker.record_success()
+
+    async def _guarded(self, func: Callable[[], Awaitable[Any]], deadline: float = None) -> Any:
+        if not self.breaker.allow():
+            self.stats['short_circuited'] += 1
+            raise LLMUnavailable("LLM megszakító nyitva")
+
+        deadline = deadline or self.deadline
+        self.stats['calls'] += 1
+        started = time.monotonic()
+        try:
+            result = await asyncio.wait_for(func(), deadline)
+        except asyncio.TimeoutError:
+            self.stats['timeouts'] += 1
+            self.breaker.record_failure()
+            raise LLMTimeout(f"nincs válasz {deadline:.1f} mp alatt")
+        except asyncio.CancelledError:
+            self.breaker.release()
+            raise
+        except Exception:
+            self.stats['errors'] += 1
+            self.breaker.record_failure()
+            raise
+
+        self.latency.record(time.monotonic() - started)
+        self.breaker.record_success()
+        return result
+
+    async def _run_hedged(self, func: Callable[[], Any]) -> Any:
+        primary = self._submit(func)
+        delay = self.hedge_delay()
+        if delay is None:
+            return await primary
+
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done or self._busy >= self.max_workers:
+            # Kész, vagy nincs szabad szál a második kérésnek
+            return await primary
+
+        self.stats['hedged'] += 1
+        hedge = self._submit(func)
+        pending = {primary, hedge}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is None:
+                        if future is hedge:
+                            self.stats['hedge_wins'] += 1
+                        return future.result()
+                    error = future.exception()
+            raise error
+        finally:
+            # A vesztes kérés eredménye nem kell (ha még sorban áll, el sem indul)
+            for future in pending:
+                future.cancel()
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Pool foglaltság, késések, megszakító állapot"""
+        p50 = self.latency.quantile(0.5)
+        p95 = self.latency.quantile(0.95)
+        return {
+            'busy': self._busy,
+            'max_workers': self.max_workers,
+            'latency_p50_ms': round(p50 * 1000, 1) if p50 is not None else None,
+            'latency_p95_ms': round(p95 * 1000, 1) if p95 is not None else None,
+            'breaker': self.breaker.state,
+            'breaker_opened': self.breaker.stats['opened'],
+            **self.stats,
+        }
+
+
+# Globális LLM executor példány
+llm_executor = LLMExecutor(
+    max_workers=int(os.getenv("LLM_MAX_WORKERS", "8")),
+    deadline=float(os.getenv("LLM_DEADLINE_SECONDS", "8")),
+    hedge=os.getenv("LLM_HEDGE", "1") not in ("0", "false", "no"),
+    breaker=CircuitBreaker(
+        failure_threshold=int(os.getenv("LLM_BREAKER_FAILURES", "5")),
+        reset_timeout=float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+    ),
+    stream_deadline=float(os.getenv("LLM_STREAM_DEADLINE_SECONDS", "30")),
+    chunk_timeout=float(os.getenv("LLM_STREAM_CHUNK_TIMEOUT_SECONDS", "5"))
+)
@@ -0,0 +1,166 @@
+# chatbot/modules/ai/llm_provider.py
+import abc
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from typing import AsyncIterator, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+_STUB_REPLY = "Melyik napra szeretnéd az időpontot? 📅"
+_JSON_FIELD_RE = re.compile(r'^\s*"(\w+)":', re.MULTILINE)
+
+
+class LLMProvider(abc.ABC):
+    """LLM szolgáltató interfész - a kinyerők és a válasz generátor csak ezt látják.
+
+    `generate` blokkoló (az LLM executor saját szálkészletén fut),
+    `open_stream` natív aszinkron, szövegdarabokat ad vissza.
+    """
+
+    name = 'base'
+
+    @abc.abstractmethod
+    def generate(self, prompt: str, schema: Dict = None) -> str:
+        """Teljes válasz szövegként (schema megadásakor JSON)"""
+
+    @abc.abstractmethod
+    async def open_stream(self, prompt: str) -> AsyncIterator[str]:
+        """Streamelt válasz megnyitása - a visszakapott async iterátor szövegdarabokat ad"""
+
+
+class GeminiProvider(LLMProvider):
+    """Google Gemini (google-generativeai)"""
+
+    name = 'gemini'
+
+    def __init__(self, api_key: str, model_name: str = None):
+        import google.generativeai as genai
+        if model_name is None:
+            from config import MODEL_NAME  # GEMINI_MODEL env
+            model_name = MODEL_NAME
+        self._genai = genai
+        genai.configure(api_key=api_key)
+        self.model_name = model_name
+        self.model = genai.GenerativeModel(model_name)
+
+    def generate(self, prompt: str, schema: Dict = None) -> str:
+        if schema is None:
+            return self.model.generate_content(prompt).text
+        generation_config = self._genai.GenerationConfig(
+            response_mime_type="application/json",
+            response_schema=schema
+        )
+        return self.model.generate_content(prompt, generation_config=generation_config).text
+
+    async def open_stream(self, prompt: str) -> AsyncIterator[str]:
+        response = await self.model.generate_content_async(prompt, stream=True)
+        return self._chunks(response)
+
+    @staticmethod
+    async def _chunks(response) -> AsyncIterator[str]:
+        async for chunk in response:
+            try:
+                text = chunk.text
+            except ValueError:
+                continue  # szűrt / üres darab
+            if text:
+                yield text
+
+
+class StubProviderError(Exception):
+    """A stub szolgáltató szimulált hibája"""
+
+
+class StubProvider(LLMProvider):
+    """Determinisztikus helyi stub terheléses teszthez (hálózat nélkül).
+
+    Állítható késés (+ jitter), hibaarány és seed; a válaszok a prompt
+    típusa szerinti konzerv JSON / szöveg, a `responses` felülírhatja
+    ('combined', 'intent', 'extract', 'reply' kulcsokkal).
+    """
+
+    name = 'stub'
+
+    def __init__(self, latency: float = 0.2, jitter: float = 0.0, error_rate: float = 0.0,
+                 seed: int = None, responses: Dict[str, str] = None, chunk_delay: float = 0.05):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.chunk_delay = chunk_delay
+        self.responses = responses or {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()  # a generate több szálról is hívódik
+        self.stats = {'calls': 0, 'errors': 0}
+
+    def _draw(self):
+        with self._lock:
+            self.stats['calls'] += 1
+            delay = self.latency + self.jitter * self._random.random()
+            failed = self._random.random() < self.error_rate
+            if failed:
+                self.stats['errors'] += 1
+        return delay, failed
+
+    def generate(self, prompt: str, schema: Dict = None) -> str:
+        delay, failed = self._draw()
+        time.sleep(delay)
+        if failed:
+            raise StubProviderError("szimulált LLM hiba")
+        return self._respond(prompt, schema)
+
+    async def open_stream(self, prompt: str) -> AsyncIterator[str]:
+        delay, failed = self._draw()
+        await asyncio.sleep(delay)
+        if failed:
+            raise StubProviderError("szimulált LLM hiba")
+        return self._stream_words(self._respond(prompt))
+
+    async def _stream_words(self, text: str) -> AsyncIterator[str]:
+        for word in re.findall(r'\S+\s*', text):
+            await asyncio.sleep(self.chunk_delay)
+            yield word
+
+    def _respond(self, prompt: str, schema: Dict = None) -> str:
+        if schema is not None:
+            return self.responses.get('combined') or json.dumps({
+                'service': None, 'date': None, 'time': None, 'time_period': None,
+                'name': None, 'phone': None, 'confidence': 0.5,
+                'services_intent': False, 'reply': _STUB_REPLY,
+            }, ensure_ascii=False)
+        if '"services_intent"' in prompt:
+            return self.responses.get('intent') or '{"services_intent": false, "confidence": 0.9}'
+        if 'VÁLASZ JSON FORMÁTUMBAN' in prompt:
+            if 'extract' in self.responses:
+                return self.responses['extract']
+            # A promptban kért mezők, mind null (a szabályalapú eredmény marad)
+            fields = {field: None for field in _JSON_FIELD_RE.findall(prompt) if field != 'confidence'}
+            return json.dumps({**fields, 'confidence': 0.0})
+        return self.responses.get('reply') or _STUB_REPLY
+
+
+def create_llm_provider(api_key: str = None, name: str = None) -> Optional[LLMProvider]:
+    """Szolgáltató az LLM_PROVIDER szerint (gemini | stub) - None, ha nincs használható"""
+    name = (name or os.getenv("LLM_PROVIDER", "gemini")).lower()
+    if name == 'stub':
+        provider = StubProvider(
+            latency=float(os.getenv("LLM_STUB_LATENCY_MS", "200")) / 1000,
+            jitter=float(os.getenv("LLM_STUB_JITTER_MS", "0")) / 1000,
+            error_rate=float(os.getenv("LLM_STUB_ERROR_RATE", "0")),
+            seed=int(os.getenv("LLM_STUB_SEED", "0"))
+        )
+        logger.info(f"🧪 LLM stub szolgáltató (késés {provider.latency * 1000:.0f}ms, hibaarány {provider.error_rate})")
+        return provider
+
+    if name != 'gemini':
+        logger.warning(f"⚠️ Ismeretlen LLM_PROVIDER: {name} - Gemini használata")
+    from config import GEMINI_API_KEY
+    api_key = api_key or GEMINI_API_KEY
+    if not api_key:
+        return None
+    return GeminiProvider(api_key)
@@ -0,0 +1,143 @@
+# chatbot/modules/ai/service_index.py
+import re
+import unicodedata
+from typing import Dict, List, Optional, Set, Tuple
+
+_WORD_RE = re.compile(r'\w+')
+_MIN_TERM_LENGTH = 4
+_MAX_SUFFIX_LENGTH = 5   # magyar ragok: -ra, -re, -t, -ot, -nak, -ért ...
+_RESCORE_CANDIDATES = 3  # ablakonként ennyi legjobb trigram-jelölt kap edit distance pontozást
+
+
+def fold_accents(text: str) -> str:
+    """Kisbetűs, ékezet nélküli alak (hajvágás -> hajvagas, ő -> o)"""
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def _trigrams(term: str) -> Set[str]:
+    padded = f"${term}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _prefix_distances(window: str, term: str, limit: int) -> List[int]:
+    """Levenshtein távolság a `window` minden előtagja és a `term` között, egyetlen DP-vel.
+
+    Az i. elem: távolság(window[:i], term). Ha egy sor minden értéke `limit`
+    fölé nő, a további előtagok sem lehetnek közelebb: ott limit + 1 áll.
+    """
+    previous = list(range(len(term) + 1))
+    distances = [previous[-1]]
+    for i, char in enumerate(window, 1):
+        current = [i]
+        for j, term_char in enumerate(term, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char != term_char)))
+        if min(current) > limit:
+            distances.extend([limit + 1] * (len(window) - i + 1))
+            break
+        distances.append(current[-1])
+        previous = current
+    return distances
+
+
+class ServiceIndex:
+    """Egy szalon szolgáltatásneveinek fuzzy indexe.
+
+    Az ékezet nélküli nevekből és névszavakból karakter-trigram inverz index
+    készül; a jelöltek edit distance alapján kapnak pontot (a szó eleje a
+    szokásos ragok nélkül is összevethető), így a "hajvagasra", "melirozas"
+    jellegű elírásokhoz nem kell LLM.
+    """
+
+    def __init__(self, services: List[str], min_score: float = 0.8, min_overlap: float = 0.4):
+        self.services = list(services)
+        self.min_score = min_score
+        self.min_overlap = min_overlap
+        self._terms: List[Tuple[str, str, float]] = []   # (kifejezés, szolgáltatás, a név lefedett aránya)
+        self._postings: Dict[str, List[int]] = {}
+        self._exact: Dict[str, int] = {}
+        self._term_trigrams: List[int] = []
+        self.max_words = 1
+
+        for service in self.services:
+            folded = fold_accents(service)
+            words = _WORD_RE.findall(folded)
+            if not words:
+                continue
+            self.max_words = max(self.max_words, len(words))
+            full = ''.join(words)
+            self._add_term(full, service, 1.0)
+            if len(words) > 1:
+                for word in words:
+                    if len(word) >= _MIN_TERM_LENGTH:
+                        self._add_term(word, service, len(word) / len(full))
+
+    def _add_term(self, term: str, service: str, coverage: float):
+        if len(term) < _MIN_TERM_LENGTH:
+            return
+        if term in self._exact:
+            return  # több szolgáltatás közös szava: az első (teljes) név nyer
+        term_id = len(self._terms)
+        self._exact[term] = term_id
+        self._terms.append((term, service, coverage))
+        grams = _trigrams(term)
+        self._term_trigrams.append(len(grams))
+        for gram in grams:
+            self._postings.setdefault(gram, []).append(term_id)
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def _similarity(self, window: str, term: str, required: float) -> float:
+        """1 - relatív edit distance; hosszabb szónál a rag levágásával is próbál.
+
+        A `required` alatti eredmény pontos értéke nem érdekes (0.0), ezért a
+        távolság számítása a megfelelő korlátnál leáll.
+        """
+        longest = max(len(window), len(term))
+        limit = int((1.0 - required) * longest)
+        if abs(len(window) - len(term)) > limit + _MAX_SUFFIX_LENGTH + 1:
+            return 0.0
+        distances = _prefix_distances(window, term, limit)
+        best = 1.0 - distances[-1] / longest
+        if len(term) < len(window) <= len(term) + _MAX_SUFFIX_LENGTH + 1:
+            # Rag levágva: a név hosszú (±1) előtag összevetése
+            prefix = min(distances[len(term) - 1:len(term) + 2])
+            best = max(best, 1.0 - prefix / len(term) - 0.02)
+        return best if best >= required else 0.0
+
+    def match(self, text: str) -> Optional[Tuple[str, float]]:
+        """Legjobb szolgáltatás és pontszám (0-1), vagy None, ha nincs elég közeli"""
+        words = _WORD_RE.findall(fold_accents(text))
+        best = (0.0, 0, None)  # (pontszám, kifejezés hossza, szolgáltatás) - egyenlőségnél a hosszabb nyer
+        for size in range(1, self.max_words + 1):
+            for start in range(len(words) - size + 1):
+                window = ''.join(words[start:start + size])
+                if len(window) < _MIN_TERM_LENGTH:
+                    continue
+                for term_id in self._candidates(window):
+                    term, service, coverage = self._terms[term_id]
+                    weight = 0.8 + 0.2 * coverage
+                    score = self._similarity(window, term, self.min_score / weight) * weight
+                    best = max(best, (score, len(term), service), key=lambda item: item[:2])
+        if best[2] is None or best[0] < self.min_score:
+            return None
+        return best[2], round(best[0], 3)
+
+    def _candidates(self, window: str) -> List[int]:
+        """Pontos egyezés, vagy a legjobb trigram átfedésű (Dice) kifejezések"""
+        term_id = self._exact.get(window)
+        if term_id is not None:
+            return [term_id]
+        grams = _trigrams(window)
+        shared: Dict[int, int] = {}
+        for gram in grams:
+            for term_id in self._postings.get(gram, ()):
+                shared[term_id] = shared.get(term_id, 0) + 1
+        scored = []
+        for term_id, count in shared.items():
+            overlap = 2 * count / (len(grams) + self._term_trigrams[term_id])
+            if overlap >= self.min_overlap:
+                scored.append((overlap, term_id))
+        scored.sort(reverse=True)
+        return [term_id for _, term_id in scored[:_RESCORE_CANDIDATES]]
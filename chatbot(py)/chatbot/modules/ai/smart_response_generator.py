@@ -1,18 +1,26 @@
 # chatbot/modules/ai/smart_response_generator.py - JAVÍTOTT IDŐSZAK KEZELÉSSEL
+import contextlib
 import logging
-from typing import List, Optional
-import google.generativeai as genai
-import asyncio
+from typing import AsyncIterator, List, Optional
 from typing import Dict
 
+from .llm_executor import llm_executor
+from .llm_provider import GeminiProvider, LLMProvider
+
 logger = logging.getLogger(__name__)
 
+class StreamInterrupted(Exception):
+    """A stream az első darab után megszakadt - a hívó a tartalék szöveggel zárja a választ"""
+    
+    def __init__(self, fallback: str):
+        super().__init__("a válasz streamje megszakadt")
+        self.fallback = fallback
+
 class SmartResponseGenerator:
     """AI-alapú intelligens válasz generátor"""
     
-    def __init__(self, api_key: str):
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-2.0-flash')
+    def __init__(self, api_key: str = None, provider: LLMProvider = None):
+        self.provider = provider or GeminiProvider(api_key)
     
     async def generate_conversational_response(self, user_message: str, missing_info: List[str], available_slots: List[str], conversation_context: Dict) -> str:
         """AI-alapú beszélgetéses válasz - BŐVÍTVE IDŐSZAK KEZELÉSSEL"""
@@ -21,19 +29,46 @@ class SmartResponseGenerator:
                 user_message, missing_info, available_slots, conversation_context
             )
             
-            response = await asyncio.get_event_loop().run_in_executor(
-                None, lambda: self.model.generate_content(prompt)
-            )
+            response = await llm_executor.call(lambda: self.provider.generate(prompt))
             
-            return response.text.strip()
+            return response.strip()
             
         except Exception as e:
             logger.error(f"❌ AI response generation error: {e}")
             return self._get_fallback_response(missing_info, available_slots)
     
+    async def stream_conversational_response(self, user_message: str, missing_info: List[str], available_slots: List[str], conversation_context: Dict) -> AsyncIterator[str]:
+        """Ugyanaz a válasz darabokban (stream=True) - hiba esetén a fallback szöveg.
+        
+        Ha a hiba már kiküldött darabok után jön, StreamInterrupted-et dob: a
+        félbemaradt szöveg nem lehet végleges válasz.
+        """
+        streamed = False
+        try:
+            prompt = self._build_conversation_prompt(
+                user_message, missing_info, available_slots, conversation_context
+            )
+            
+            # Darabonkénti és teljes határidő; a megszakító a stream végén kap eredményt
+            async with contextlib.aclosing(llm_executor.stream(lambda: self.provider.open_stream(prompt))) as chunks:
+                async for text in chunks:
+                    if text:
+                        streamed = True
+                        yield text
+                    
+        except Exception as e:
+            logger.error(f"❌ AI streaming response error: {e}")
+            if streamed:
+                raise StreamInterrupted(self._get_fallback_response(missing_info, available_slots)) from e
+        
+        if not streamed:
+            yield self._get_fallback_response(missing_info, available_slots)
+    
     def _build_conversation_prompt(self, user_message, missing_info, available_slots, context):
         """Prompt építése a beszélgetés kontextusához - BŐVÍTVE IDŐSZAKKAL"""
         slots_text = ", ".join(available_slots) if available_slots else "nincs elérhető időpont"
+        # Token kereten belüli előzmény (összefoglaló + legutóbbi üzenetek)
+        history_text = "\n        ".join(context.get('previous_responses') or []) or "Nincs"
         
         # ✅ ÚJ: Időszak speciális kezelése
         time_period_hint = ""
@@ -60,7 +95,8 @@ class SmartResponseGenerator:
         SZABAD IDŐPONTOK: {slots_text}
         FELHASZNÁLÓ ÜZENETE: "{user_message}"
 
-        Előző kontextus: {context.get('previous_responses', [])[-2:] if context.get('previous_responses') else 'Nincs'}
+        Eddigi beszélgetés:
+        {history_text}
 
         Válaszolj természetes, barátságos stílusban:
         """
@@ -0,0 +1,186 @@
+import abc
+import datetime
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Any
+
+from utils.ttl_cache import TTLCache
+from .session import Session, SessionKey
+
+logger = logging.getLogger(__name__)
+
+
+class SessionBackend(abc.ABC):
+    """Session tároló interfész - a TTL-t a backend kezeli.
+
+    A megosztott (fájl / hálózati) backendek hívásai blokkolnak: a feldolgozás
+    ezeket a ConversationManager.session_scope-on át, szálon hívja.
+    """
+
+    # Több processz között megosztott-e (ilyenkor a hot cache csak rövid ideig tarthat)
+    shared = False
+
+    @abc.abstractmethod
+    def load(self, key: SessionKey) -> Optional[Session]:
+        """Tárolt, még nem lejárt session (None, ha nincs)"""
+
+    @abc.abstractmethod
+    def save(self, key: SessionKey, session: Session):
+        """Session mentése, a lejárati idő újraindításával"""
+
+    @abc.abstractmethod
+    def delete(self, key: SessionKey):
+        """Session törlése"""
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {}
+
+    def close(self):
+        pass
+
+
+class InMemorySessionBackend(SessionBackend):
+    """Processzen belüli tároló - a session rekordok referenciaként tárolódnak.
+
+    A ConversationManager ezt a cache-t közvetlenül hot cache-ként használja.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.cache = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+
+    def load(self, key: SessionKey) -> Optional[Session]:
+        return self.cache.get(key)
+
+    def save(self, key: SessionKey, session: Session):
+        self.cache.set(key, session)
+
+    def delete(self, key: SessionKey):
+        self.cache.pop(key)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return self.cache.get_stats()
+
+
+class SQLiteSessionBackend(SessionBackend):
+    """Fájl alapú, processzek között megosztott tároló (WAL mód, lejárati idővel)"""
+
+    shared = True
+
+    def __init__(self, path: str, ttl_seconds: float, purge_every: int = 256):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.purge_every = purge_every
+        self._writes = 0
+        self._lock = threading.Lock()
+        self.stats = {'loads': 0, 'load_hits': 0, 'saves': 0, 'deletes': 0, 'purged': 0, 'bytes_written': 0}
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5.0, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions (expires_at)")
+        logger.info(f"💾 SQLite session backend: {path}")
+
+    @staticmethod
+    def _session_id(key: SessionKey) -> str:
+        return f"{key[0]}_{key[1]}"
+
+    def load(self, key: SessionKey) -> Optional[Session]:
+        session_id = self._session_id(key)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM sessions WHERE session_id = ? AND expires_at > ?",
+                (session_id, time.time())
+            ).fetchone()
+        self.stats['loads'] += 1
+        if row is None:
+            return None
+        self.stats['load_hits'] += 1
+        return decode_session(row[0])
+
+    def save(self, key: SessionKey, session: Session):
+        session_id = self._session_id(key)
+        data = encode_session(session)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO sessions (session_id, data, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET data = excluded.data, expires_at = excluded.expires_at",
+                (session_id, data, now + self.ttl_seconds)
+            )
+            self._writes += 1
+            if self._writes >= self.purge_every:
+                self._writes = 0
+                cur = self._conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (now,))
+                self.stats['purged'] += cur.rowcount
+        self.stats['saves'] += 1
+        self.stats['bytes_written'] += len(data)
+
+    def delete(self, key: SessionKey):
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (self._session_id(key),))
+        self.stats['deletes'] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stored = self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        return {'stored': stored, **self.stats}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# Tömör szerializálás: dátum = ordinális szám, idő = másodperc a nap kezdetétől
+def _encode_value(value):
+    if isinstance(value, datetime.datetime):
+        return {'$dt': value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {'$d': value.toordinal()}
+    if isinstance(value, datetime.time):
+        return {'$t': value.hour * 3600 + value.minute * 60 + value.second}
+    raise TypeError(f"Nem szerializálható session érték: {type(value).__name__}")
+
+
+def _decode_object(obj: Dict):
+    if len(obj) == 1:
+        if '$d' in obj:
+            return datetime.date.fromordinal(obj['$d'])
+        if '$t' in obj:
+            seconds = obj['$t']
+            return datetime.time(seconds // 3600, seconds % 3600 // 60, seconds % 60)
+        if '$dt' in obj:
+            return datetime.datetime.fromisoformat(obj['$dt'])
+    return obj
+
+
+def encode_session(session: Session) -> str:
+    """Session -> tömör JSON"""
+    return json.dumps(session.to_dict(), separators=(',', ':'), ensure_ascii=False, default=_encode_value)
+
+
+def decode_session(data: str) -> Session:
+    """Tömör JSON -> session (dátum / idő típusok visszaállítva)"""
+    return Session.from_dict(json.loads(data, object_hook=_decode_object))
+
+
+def create_session_backend(kind: str, ttl_seconds: float, max_entries: int, path: str = None) -> SessionBackend:
+    """Backend kiválasztása (SESSION_BACKEND=memory|sqlite)"""
+    kind = (kind or 'memory').lower()
+    if kind == 'sqlite':
+        return SQLiteSessionBackend(path or 'sessions.db', ttl_seconds)
+    if kind != 'memory':
+        logger.warning(f"⚠️ Ismeretlen session backend: {kind}, memory lesz használva")
+    return InMemorySessionBackend(ttl_seconds, max_entries)
@@ -0,0 +1,106 @@
+import os
+import re
+from typing import Dict, List, Mapping, Optional
+
+# Előzmény token keret a promptokhoz; a legutóbbi ennyi üzenet mindig szó szerint marad
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "300"))
+HISTORY_KEEP_TURNS = int(os.getenv("HISTORY_KEEP_TURNS", "4"))
+
+USER = 'u'
+BOT = 'b'
+_ROLE_LABELS = {USER: 'Ügyfél', BOT: 'Asszisztens'}
+
+_MAX_TURN_CHARS = 400       # egy (pl. szolgáltatás listás) üzenet se vigye el a keretet
+_MAX_OFFERED_SLOTS = 8
+_SUMMARY_FIELDS = ('service', 'date', 'time', 'time_period', 'name', 'phone')
+_SLOT_RE = re.compile(r'\b([01]?\d|2[0-3]):[0-5]\d\b')
+
+
+def estimate_tokens(text: str) -> int:
+    """Durva token becslés (~4 karakter / token)"""
+    return len(text) // 4 + 1
+
+
+class ConversationHistory:
+    """Gördülő beszélgetés előzmény token kerettel.
+
+    A keret túllépésekor a legrégebbi üzenetek egy tömör, strukturált
+    összefoglalóba kerülnek (megerősített mezők, már felajánlott időpontok),
+    így a promptba kerülő előzmény mérete a beszélgetés hosszától független.
+    """
+
+    __slots__ = ('turns', 'summary', 'tokens')
+
+    def __init__(self, turns: List[List[str]] = None, summary: Dict = None):
+        self.turns = turns if turns is not None else []   # [szerep, szöveg] párok
+        self.summary = summary if summary is not None else {}  # 'c': mezők, 'o': időpontok, 'n': összevont üzenetek
+        self.tokens = sum(estimate_tokens(text) for _, text in self.turns)
+
+    def __len__(self) -> int:
+        return len(self.turns) + self.summary.get('n', 0)
+
+    def add(self, role: str, text: str, known_info: Mapping = None,
+            budget: int = None, keep_turns: int = None) -> int:
+        """Üzenet hozzáadása - a keret fölött a régieket összevonja (visszatér: összevont darabszám)"""
+        text = text.strip()
+        if not text:
+            return 0
+        if len(text) > _MAX_TURN_CHARS:
+            text = text[:_MAX_TURN_CHARS - 1] + '…'
+        self.turns.append([role, text])
+        self.tokens += estimate_tokens(text)
+        return self._compress(known_info, budget or HISTORY_TOKEN_BUDGET, keep_turns or HISTORY_KEEP_TURNS)
+
+    def _compress(self, known_info: Optional[Mapping], budget: int, keep_turns: int) -> int:
+        compressed = 0
+        while self.tokens > budget and len(self.turns) > keep_turns:
+            role, text = self.turns.pop(0)
+            self.tokens -= estimate_tokens(text)
+            if role == BOT:
+                offered = self.summary.setdefault('o', [])
+                for match in _SLOT_RE.finditer(text):
+                    slot = match.group(0).zfill(5)
+                    if slot not in offered:
+                        offered.append(slot)
+                del offered[:-_MAX_OFFERED_SLOTS]
+            compressed += 1
+        if compressed:
+            self.summary['n'] = self.summary.get('n', 0) + compressed
+            if known_info:
+                self.summary['c'] = {
+                    field: (known_info[field].isoformat() if hasattr(known_info[field], 'isoformat')
+                            else str(known_info[field]))
+                    for field in _SUMMARY_FIELDS if known_info.get(field)
+                }
+        return compressed
+
+    def summary_text(self) -> Optional[str]:
+        if not self.summary.get('n'):
+            return None
+        parts = [f"korábbi {self.summary['n']} üzenet"]
+        confirmed = self.summary.get('c')
+        if confirmed:
+            parts.append("megerősítve: " + ", ".join(f"{field}={value}" for field, value in confirmed.items()))
+        offered = self.summary.get('o')
+        if offered:
+            parts.append("már felajánlott időpontok: " + ", ".join(offered))
+        return "Összefoglaló (" + "; ".join(parts) + ")"
+
+    def render(self) -> List[str]:
+        """Promptba kerülő sorok: összefoglaló + a legutóbbi üzenetek"""
+        lines = [f"{_ROLE_LABELS.get(role, role)}: {text}" for role, text in self.turns]
+        summary = self.summary_text()
+        return [summary] + lines if summary else lines
+
+    def to_dict(self) -> Dict:
+        data = {'t': self.turns}
+        if self.summary:
+            data['s'] = self.summary
+        return data
+
+    @classmethod
+    def from_dict(cls, data) -> 'ConversationHistory':
+        if isinstance(data, list):
+            # Régi formátum: csak a bot válaszai, szövegként
+            return cls([[BOT, text] for text in data])
+        return cls(data.get('t') or [], data.get('s') or {})
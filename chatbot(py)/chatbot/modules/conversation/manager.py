@@ -1,144 +1,225 @@
-import datetime
-from typing import Dict, List
+import asyncio
+import contextlib
+import os
+import time
+from types import MappingProxyType
+from typing import AsyncIterator, Dict, List, Any, Mapping, Tuple
 import logging
 
+from utils.ttl_cache import TTLCache
+from .backends import SessionBackend, create_session_backend
+from .history import BOT, USER, ConversationHistory
+from .session import Session, SessionKey, missing_mask
+
 logger = logging.getLogger(__name__)
 
+# Session tár korlátai: tétlen session lejárata és maximális darabszám (LRU)
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", "7200"))
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "10000"))
+
+# Session backend: memory (processzen belüli) vagy sqlite (újraindítást túlél, processzek között megosztott)
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory")
+SESSION_DB_PATH = os.getenv(
+    "SESSION_DB_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "sessions.db")
+)
+# Megosztott backend esetén ennyi ideig olvasunk a helyi hot cache-ből (0 = mindig a backendből).
+# A hot cache egy másik processz írását a TTL-ig nem látja (elavult olvasás, elveszett frissítés),
+# ezért csak akkor érdemes bekapcsolni, ha egy chat mindig ugyanarra a processzre fut.
+SESSION_HOT_TTL_SECONDS = float(os.getenv("SESSION_HOT_TTL_SECONDS", "0"))
+
 
 class ConversationManager:
     """Intelligens beszélgetés kezelő"""
     
-    def __init__(self):
-        self.user_sessions = {}
-    
-    def get_session(self, salon_name: str, chat_id: int) -> Dict:
-        """Session lekérése vagy létrehozása"""
-        session_id = f"{salon_name}_{chat_id}"
-        if session_id not in self.user_sessions:
-            self.user_sessions[session_id] = {
-                'extracted_info': {},
-                'missing_info': ['service', 'date', 'time', 'name', 'phone'],
-                'conversation_step': 0,
-                'last_activity': datetime.datetime.now(),
-                'is_greeting_handled': False
-            }
+    def __init__(self, max_sessions: int = SESSION_MAX_ENTRIES, session_ttl: float = SESSION_TTL_SECONDS,
+                 backend: SessionBackend = None, hot_ttl: float = SESSION_HOT_TTL_SECONDS):
+        # A tartós tároló; a session TTL-t ő kezeli
+        self.backend = backend or create_session_backend(
+            SESSION_BACKEND, session_ttl, max_sessions, SESSION_DB_PATH
+        )
+        if self.backend.shared:
+            # Write-through hot cache a közös tároló előtt (0 TTL: kikapcsolva, minden olvasás a backendből)
+            self.hot_reads = hot_ttl > 0
+            self.user_sessions = TTLCache(max_entries=max_sessions, ttl_seconds=max(0.0, min(hot_ttl, session_ttl)))
         else:
-            self.user_sessions[session_id]['last_activity'] = datetime.datetime.now()
-        return self.user_sessions[session_id]
+            # Processzen belüli backendnél a tároló maga a hot cache (nincs dupla bejegyzés)
+            self.hot_reads = True
+            self.user_sessions = self.backend.cache
+        # Feldolgozás alatt álló chatek sessionje és a függő írás ('save' / 'delete')
+        self._pinned: Dict[SessionKey, Session] = {}
+        self._pending_writes: Dict[SessionKey, str] = {}
+    
+    @contextlib.asynccontextmanager
+    async def session_scope(self, salon_name: str, chat_id: int) -> AsyncIterator[None]:
+        """Egy üzenet feldolgozása alatt a session egyszer töltődik be és egyszer íródik vissza.
+        
+        Megosztott backendnél a betöltés és a mentés szálon fut, nem az event
+        loopon; a közben hívott get_session / mentések csak a memóriát érintik.
+        """
+        key = (salon_name, chat_id)
+        if not self.backend.shared or key in self._pinned:
+            yield
+            return
+        
+        session = self.user_sessions.get(key) if self.hot_reads else None
+        if session is None:
+            try:
+                session = await asyncio.to_thread(self.backend.load, key)
+            except Exception as e:
+                logger.error(f"❌ Session betöltési hiba ({salon_name}, {chat_id}): {e}")
+        self._pinned[key] = session or Session()
+        try:
+            yield
+        finally:
+            session = self._pinned.pop(key)
+            write = self._pending_writes.pop(key, None)
+            if write is not None:
+                try:
+                    if write == 'save':
+                        await asyncio.to_thread(self.backend.save, key, session)
+                    else:
+                        await asyncio.to_thread(self.backend.delete, key)
+                except Exception as e:
+                    logger.error(f"❌ Session mentési hiba ({salon_name}, {chat_id}): {e}")
+                if self.hot_reads and write == 'save':
+                    self.user_sessions.set(key, session)
+    
+    def get_session(self, salon_name: str, chat_id: int) -> Session:
+        """Session lekérése vagy létrehozása (feldolgozás alatt -> hot cache -> backend -> új session)"""
+        key = (salon_name, chat_id)
+        session = self._pinned.get(key)
+        if session is not None:
+            session.last_activity = time.time()
+            return session
+        session = self.user_sessions.get(key) if self.hot_reads else None
+        if session is None:
+            if self.backend.shared:
+                session = self.backend.load(key)
+            if session is None:
+                session = Session()
+            if self.hot_reads:
+                self.user_sessions.set(key, session)
+        session.last_activity = time.time()
+        return session
+    
+    def _save_session(self, salon_name: str, chat_id: int, session: Session):
+        """Módosított session visszaírása a közös backendbe (write-through)"""
+        if not self.backend.shared:
+            return
+        key = (salon_name, chat_id)
+        if key in self._pinned:
+            # A session_scope végén egyszer mentjük
+            self._pending_writes[key] = 'save'
+            return
+        try:
+            self.backend.save(key, session)
+        except Exception as e:
+            logger.error(f"❌ Session mentési hiba ({salon_name}, {chat_id}): {e}")
+    
+    def get_session_stats(self) -> Dict[str, Any]:
+        """Session tár metrikák (hot cache + backend)"""
+        stats = {'hot_cache': self.user_sessions.get_stats(with_memory=True)}
+        if self.backend.shared:
+            stats['backend'] = self.backend.get_stats()
+        return stats
+    
     def get_conversation_history(self, salon_name: str, chat_id: int) -> List[str]:
-        """Beszélgetés előzmények lekérése AI-hoz"""
-        session = self.get_session(salon_name, chat_id)
-        return session.get('conversation_history', [])
+        """Beszélgetés előzmények az AI promptokhoz: összefoglaló + legutóbbi üzenetek (token kereten belül)"""
+        history = self.get_session(salon_name, chat_id).conversation_history
+        return history.render() if history else []
     
-    def add_to_conversation_history(self, salon_name: str, chat_id: int, message: str):
+    def add_to_conversation_history(self, salon_name: str, chat_id: int, message: str, role: str = BOT):
         """Üzenet hozzáadása a beszélgetés előzményekhez"""
+        if role == USER:
+            self.record_exchange(salon_name, chat_id, user_text=message)
+        else:
+            self.record_exchange(salon_name, chat_id, bot_text=message)
+    
+    def record_exchange(self, salon_name: str, chat_id: int, user_text: str = None, bot_text: str = None):
+        """Ügyfél üzenet + bot válasz rögzítése egy mentéssel - a keret fölött a régiek összefoglalóba kerülnek"""
         session = self.get_session(salon_name, chat_id)
         
-        if 'conversation_history' not in session:
-            session['conversation_history'] = []
+        if session.conversation_history is None:
+            session.conversation_history = ConversationHistory()
         
-        session['conversation_history'].append(message)
+        history = session.conversation_history
+        compressed = 0
+        for role, text in ((USER, user_text), (BOT, bot_text)):
+            if text:
+                compressed += history.add(role, text, session.extracted_info)
+        if compressed:
+            logger.debug(f"🗜️ Előzmény összevonva ({salon_name}, {chat_id}): {compressed} üzenet, ~{history.tokens} token marad")
         
-        # Csak az utolsó 10 üzenetet tartjuk meg
-        if len(session['conversation_history']) > 10:
-            session['conversation_history'] = session['conversation_history'][-10:]
+        self._save_session(salon_name, chat_id, session)
     
     def update_session(self, salon_name: str, chat_id: int, extracted_info: Dict, global_user_info: Dict):
         session = self.get_session(salon_name, chat_id)
+        info = session.extracted_info
         
         # Kinyert információk hozzáadása (csak ha nem None)
         for key, value in extracted_info.items():
-            if value and key != 'confidence':
-                session['extracted_info'][key] = value
+            if value and key not in ('confidence', 'field_confidence'):
+                info[key] = value
         
         # Globális user info-ból hiányzó adatok kitöltése
-        if global_user_info.get('name') and not session['extracted_info'].get('name'):
-            session['extracted_info']['name'] = global_user_info['name']
-        
-        if global_user_info.get('phone') and not session['extracted_info'].get('phone'):
-            session['extracted_info']['phone'] = global_user_info['phone']
+        if global_user_info.get('name') and not info.get('name'):
+            info['name'] = global_user_info['name']
         
-        # Hiányzó információk meghatározása
-        required_fields = ['service', 'date', 'time', 'name', 'phone']
-        session['missing_info'] = [
-            field for field in required_fields 
-            if not session['extracted_info'].get(field)
-        ]
+        if global_user_info.get('phone') and not info.get('phone'):
+            info['phone'] = global_user_info['phone']
         
-        session['conversation_step'] += 1
+        # Hiányzó információk meghatározása (bitmaszk)
+        session.missing_mask = missing_mask(info)
+        session.conversation_step += 1
+        self._save_session(salon_name, chat_id, session)
+    
+    def forget_fields(self, salon_name: str, chat_id: int, *fields: str):
+        """Mezők törlése a sessionből (pl. időközben foglalt időpont) - újra kérdezzük őket"""
+        session = self.get_session(salon_name, chat_id)
+        for field in fields:
+            session.extracted_info.pop(field, None)
+        session.missing_mask = missing_mask(session.extracted_info)
+        self._save_session(salon_name, chat_id, session)
     
     def mark_greeting_handled(self, salon_name: str, chat_id: int):
         """Köszönés kezelésének megjelölése"""
         session = self.get_session(salon_name, chat_id)
-        session['is_greeting_handled'] = True
+        session.is_greeting_handled = True
+        self._save_session(salon_name, chat_id, session)
     
     def is_greeting_handled(self, salon_name: str, chat_id: int) -> bool:
         """Ellenőrzi, hogy kezeltük-e már a köszönést"""
-        session = self.get_session(salon_name, chat_id)
-        return session.get('is_greeting_handled', False)
-    
-    def get_missing_info(self, salon_name: str, chat_id: int) -> List[str]:
-        """Hiányzó információk lekérése"""
-        session = self.get_session(salon_name, chat_id)
-        return session.get('missing_info', [])
-    
-    def get_extracted_info(self, salon_name: str, chat_id: int) -> Dict:
-        """Kinyert információk lekérése"""
-        session = self.get_session(salon_name, chat_id)
-        return session.get('extracted_info', {})
+        return self.get_session(salon_name, chat_id).is_greeting_handled
     
     def clear_session(self, salon_name: str, chat_id: int):
         """Session törlése"""
-        session_id = f"{salon_name}_{chat_id}"
-        if session_id in self.user_sessions:
-            del self.user_sessions[session_id]
-        def get_conversation_history(self, salon_name: str, chat_id: int) -> List[str]:
-            session_id = f"{salon_name}_{chat_id}"
-            session = self.user_sessions.get(session_id, {})
-            return session.get('conversation_history', [])
-        
-        def add_to_conversation_history(self, salon_name: str, chat_id: int, message: str):
-            """Üzenet hozzáadása a beszélgetés előzményekhez"""
-            session_id = f"{salon_name}_{chat_id}"
-            if session_id not in self.user_sessions:
-                self.user_sessions[session_id] = {}
-            
-            if 'conversation_history' not in self.user_sessions[session_id]:
-                self.user_sessions[session_id]['conversation_history'] = []
-            
-            self.user_sessions[session_id]['conversation_history'].append(message)
-            
-            # Csak az utolsó 10 üzenetet tartjuk meg
-            if len(self.user_sessions[session_id]['conversation_history']) > 10:
-                self.user_sessions[session_id]['conversation_history'] = \
-                    self.user_sessions[session_id]['conversation_history'][-10:]
-    
-    def get_missing_info(self, salon_name: str, chat_id: int) -> List[str]:
-        """Hiányzó információk lekérése - DEBUG-GEL"""
+        key = (salon_name, chat_id)
+        self.user_sessions.pop(key)
+        if not self.backend.shared:
+            return
+        if key in self._pinned:
+            self._pinned[key] = Session()
+            self._pending_writes[key] = 'delete'
+            return
+        try:
+            self.backend.delete(key)
+        except Exception as e:
+            logger.error(f"❌ Session törlési hiba ({salon_name}, {chat_id}): {e}")
+    
+    def get_missing_info(self, salon_name: str, chat_id: int) -> Tuple[str, ...]:
+        """Hiányzó információk (megosztott, változtathatatlan tuple - nincs másolás)"""
         session = self.get_session(salon_name, chat_id)
-        extracted_info = session.get('extracted_info', {})
-        
-        required_fields = ['service', 'date', 'time', 'name', 'phone']
-        missing = [field for field in required_fields if not extracted_info.get(field)]
-
-        if extracted_info.get('date') and not extracted_info.get('time') and not extracted_info.get('time_period'):
-            if 'time_period' not in missing:
-                missing.append('time_period')
-        
-        logger.info(f"🔍 [DEBUG] Missing info check:")
-        logger.info(f"🔍 [DEBUG] - Session: {salon_name}_{chat_id}")
-        logger.info(f"🔍 [DEBUG] - Extracted info: {extracted_info}")
-        logger.info(f"🔍 [DEBUG] - Required fields: {required_fields}")
-        logger.info(f"🔍 [DEBUG] - Missing: {missing}")
-        
+        missing = session.missing_info
+        logger.debug(f"🔍 Hiányzó mezők ({salon_name}, {chat_id}): {missing}")
         return missing
     
-    def get_extracted_info(self, salon_name: str, chat_id: int) -> Dict:
-        """Kinyert információk lekérése - DEBUG-GEL"""
-        session = self.get_session(salon_name, chat_id)
-        extracted_info = session.get('extracted_info', {})
-        
-        logger.info(f"🔍 [DEBUG] Get extracted info: {extracted_info}")
-        return extracted_info.copy()  # Másolat, hogy ne módosuljon
+    def get_extracted_info(self, salon_name: str, chat_id: int) -> Mapping[str, Any]:
+        """Kinyert információk - csak olvasható nézet, másolás nélkül"""
+        return MappingProxyType(self.get_session(salon_name, chat_id).extracted_info)
+    
+    def snapshot_extracted_info(self, salon_name: str, chat_id: int) -> Dict:
+        """Kinyert információk másolata - ha a hívó módosítani akarja"""
+        return dict(self.get_session(salon_name, chat_id).extracted_info)
 
 conversation_manager = ConversationManager()
\ No newline at end of file
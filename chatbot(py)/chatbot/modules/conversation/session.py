@@ -0,0 +1,88 @@
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .history import ConversationHistory
+
+# Foglaláshoz szükséges mezők és bitjeik a hiányzó-mezők maszkban
+REQUIRED_FIELDS = ('service', 'date', 'time', 'name', 'phone')
+FIELD_BITS = {
+    'service': 1 << 0,
+    'date': 1 << 1,
+    'time': 1 << 2,
+    'name': 1 << 3,
+    'phone': 1 << 4,
+    'time_period': 1 << 5,
+}
+ALL_REQUIRED_MASK = sum(FIELD_BITS[field] for field in REQUIRED_FIELDS)
+_FIELD_ORDER = REQUIRED_FIELDS + ('time_period',)
+
+# maszk -> mezőnevek (lusta, legfeljebb 64 bejegyzés; a tuple-öket minden hívó megosztja)
+_MASK_NAMES: Dict[int, Tuple[str, ...]] = {}
+
+SessionKey = Tuple[str, int]
+
+
+def missing_mask(extracted_info: Dict) -> int:
+    """Hiányzó mezők maszkja (dátum mellé idő vagy időszak kell)"""
+    mask = 0
+    for field in REQUIRED_FIELDS:
+        if not extracted_info.get(field):
+            mask |= FIELD_BITS[field]
+    if extracted_info.get('date') and not extracted_info.get('time') and not extracted_info.get('time_period'):
+        mask |= FIELD_BITS['time_period']
+    return mask
+
+
+def mask_to_fields(mask: int) -> Tuple[str, ...]:
+    """Maszk -> hiányzó mezőnevek (fix sorrendben, gyorsítótárazva)"""
+    names = _MASK_NAMES.get(mask)
+    if names is None:
+        names = tuple(field for field in _FIELD_ORDER if mask & FIELD_BITS[field])
+        _MASK_NAMES[mask] = names
+    return names
+
+
+class Session:
+    """Egy beszélgetés állapota - tömör, slotolt rekord"""
+
+    __slots__ = ('extracted_info', 'missing_mask', 'conversation_step',
+                 'last_activity', 'is_greeting_handled', 'conversation_history')
+
+    def __init__(self, extracted_info: Dict = None, missing_mask: int = ALL_REQUIRED_MASK,
+                 conversation_step: int = 0, last_activity: float = None,
+                 is_greeting_handled: bool = False, conversation_history: Optional[ConversationHistory] = None):
+        self.extracted_info = extracted_info if extracted_info is not None else {}
+        self.missing_mask = missing_mask
+        self.conversation_step = conversation_step
+        self.last_activity = last_activity if last_activity is not None else time.time()  # epoch mp
+        self.is_greeting_handled = is_greeting_handled
+        self.conversation_history = conversation_history  # csak ha volt üzenet
+
+    @property
+    def missing_info(self) -> Tuple[str, ...]:
+        return mask_to_fields(self.missing_mask)
+
+    def to_dict(self) -> Dict:
+        """Rövid kulcsos dict a szerializáláshoz"""
+        data = {
+            'e': self.extracted_info,
+            'm': self.missing_mask,
+            's': self.conversation_step,
+            'a': round(self.last_activity, 1),
+        }
+        if self.is_greeting_handled:
+            data['g'] = 1
+        if self.conversation_history:
+            data['h'] = self.conversation_history.to_dict()
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Session':
+        return cls(
+            extracted_info=data.get('e') or {},
+            missing_mask=data.get('m', ALL_REQUIRED_MASK),
+            conversation_step=data.get('s', 0),
+            last_activity=data.get('a'),
+            is_greeting_handled=bool(data.get('g')),
+            conversation_history=ConversationHistory.from_dict(data['h']) if data.get('h') else None,
+        )
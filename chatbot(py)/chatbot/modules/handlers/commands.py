@@ -1,6 +1,7 @@
 from typing import Dict, Any
 from telegram.ext import ApplicationBuilder, CommandHandler, MessageHandler, filters
 from config import get_salon_configs
+from modules.salon.context import build_salon_context
 
 from .messages import handle_intelligent_message
 from .commands_base import (
@@ -15,9 +16,10 @@ async def setup_handlers():
     if not salon_configs:
         raise Exception("Nincs érvényes szalon konfiguráció")
     
-    first_salon_cfg = next(iter(salon_configs.values()))
+    first_salon, first_salon_cfg = next(iter(salon_configs.items()))
     
     app = ApplicationBuilder().token(first_salon_cfg["token"]).build()
+    build_salon_context(first_salon, first_salon_cfg, app)
 
     # Handlerek regisztrálása
     app.add_handler(CommandHandler("start", start_command))
@@ -2,6 +2,7 @@
 import logging
 from telegram import Update
 from telegram.ext import ContextTypes
+from modules.salon.context import get_salon_context
 
 logger = logging.getLogger(__name__)
 
@@ -13,13 +14,11 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         # BACKEND: Szalon konfiguráció lekérése
         from backend.database.salon_operations import get_opening_hours
         
-        # Az első szalon nyitvatartásának lekérése
-        salon_configs = {k: v for k, v in context.bot_data.get('CONFIG', {}).items() 
-                        if isinstance(v, dict) and "token" in v}
+        # A bot saját szalonjának nyitvatartása
+        salon = get_salon_context(context)
         
-        if salon_configs:
-            first_salon = next(iter(salon_configs.keys()))
-            opening_hours = await get_opening_hours(first_salon)
+        if salon is not None:
+            opening_hours = await get_opening_hours(salon.name)
             
             # Nyitvatartás formázása
             hours_text = format_opening_hours(opening_hours)
@@ -84,15 +83,13 @@ async def opening_hours_command(update: Update, context: ContextTypes.DEFAULT_TY
         # BACKEND: Szalon konfiguráció lekérése
         from backend.database.salon_operations import get_opening_hours
         
-        salon_configs = {k: v for k, v in context.bot_data.get('CONFIG', {}).items() 
-                        if isinstance(v, dict) and "token" in v}
+        salon = get_salon_context(context)
         
-        if not salon_configs:
+        if salon is None:
             await update.message.reply_text("❌ Nincs szalon konfigurálva.")
             return
         
-        first_salon = next(iter(salon_configs.keys()))
-        opening_hours = await get_opening_hours(first_salon)
+        opening_hours = await get_opening_hours(salon.name)
         hours_text = format_opening_hours(opening_hours)
         
         await update.message.reply_text(hours_text, parse_mode='Markdown')
@@ -0,0 +1,115 @@
+import asyncio
+import contextlib
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _ChatQueue:
+    """Egy chat várakozó üzenetei"""
+
+    __slots__ = ('items', 'last_arrival', 'first_arrival', 'arrived', 'task')
+
+    def __init__(self):
+        self.items: List[tuple] = []  # (update, context, text, tracker)
+        self.last_arrival = 0.0
+        self.first_arrival = 0.0
+        self.arrived = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+
+class ChatMailbox:
+    """Chatenkénti postafiók - soros feldolgozás, a gyors egymás utáni üzenetek összevonva.
+
+    Egy chat üzeneteit mindig egyetlen task dolgozza fel, így a session
+    nem versenyez önmagával. Az érkezés után `debounce` másodpercig várunk
+    további üzenetekre (legfeljebb `max_delay`-ig), majd a szövegeket egy
+    feldolgozásban adjuk át a handlernek.
+    """
+
+    def __init__(self, handler: Callable[[Any, Any, str], Awaitable[Any]],
+                 debounce: float = 0.8, max_delay: float = 3.0, separator: str = " "):
+        self.handler = handler
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.separator = separator
+        self._queues: Dict[Hashable, _ChatQueue] = {}
+        self.stats = {'messages': 0, 'batches': 0, 'merged': 0}
+
+    async def submit(self, key: Hashable, update, context, text: str, tracker=None):
+        """Üzenet leadása - azonnal visszatér, a feldolgozás a chat saját taskjában fut.
+
+        `tracker` (pl. ChatOrderedUpdateProcessor): a feldolgozás az ő limitjén
+        belül fut (`work_slot`), és a végéig a várakozó munkái közt számolja.
+        """
+        if tracker is not None:
+            tracker.defer()
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = _ChatQueue()
+            self._queues[key] = queue
+
+        now = time.monotonic()
+        if not queue.items:
+            queue.first_arrival = now
+        queue.items.append((update, context, text, tracker))
+        queue.last_arrival = now
+        queue.arrived.set()
+        self.stats['messages'] += 1
+
+        if queue.task is None or queue.task.done():
+            queue.task = asyncio.create_task(self._drain(key, queue))
+
+    async def _wait_for_quiet(self, queue: _ChatQueue):
+        """Várakozás, amíg `debounce` ideig nem jön új üzenet (max_delay felső korláttal)"""
+        while True:
+            now = time.monotonic()
+            quiet_at = queue.last_arrival + self.debounce
+            deadline = queue.first_arrival + self.max_delay
+            wait = min(quiet_at, deadline) - now
+            if wait <= 0:
+                return
+            queue.arrived.clear()
+            try:
+                await asyncio.wait_for(queue.arrived.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                return
+
+    async def _drain(self, key: Hashable, queue: _ChatQueue):
+        """A chat üzeneteinek soros feldolgozása, amíg van várakozó"""
+        try:
+            while queue.items:
+                if self.debounce > 0:
+                    await self._wait_for_quiet(queue)
+
+                batch, queue.items = queue.items, []
+                update, context, _, tracker = batch[-1]
+                text = self.separator.join(item[2] for item in batch if item[2])
+
+                self.stats['batches'] += 1
+                if len(batch) > 1:
+                    self.stats['merged'] += len(batch) - 1
+                    logger.info(f"📬 {len(batch)} üzenet összevonva ({key}): {text}")
+
+                try:
+                    async with (tracker.work_slot() if tracker is not None else contextlib.nullcontext()):
+                        await self.handler(update, context, text)
+                except Exception as e:
+                    logger.error(f"❌ Hiba a chat feldolgozásában ({key}): {e}")
+                finally:
+                    for item in batch:
+                        if item[3] is not None:
+                            item[3].finish_deferred()
+        finally:
+            if not queue.items and self._queues.get(key) is queue:
+                del self._queues[key]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Postafiók metrikák"""
+        return {
+            'active_chats': len(self._queues),
+            'pending': sum(len(queue.items) for queue in self._queues.values()),
+            **self.stats,
+        }
@@ -1,28 +1,51 @@
 # chatbot/modules/handlers/messages.py
 import logging
 import datetime
+import os
 from telegram import Update
 from telegram.ext import ContextTypes
 from typing import List, Optional
 
 # AI IMPORTOK
 from modules.ai.hybrid_extractor import HybridInfoExtractor
-from modules.ai.smart_response_generator import SmartResponseGenerator
+from modules.ai.smart_response_generator import SmartResponseGenerator, StreamInterrupted
+from modules.ai.llm_executor import llm_executor
+from modules.ai.llm_provider import create_llm_provider
 
 # BACKEND IMPORTOK
 from backend.database.user_operations import get_global_user_info, insert_global_user
-from backend.database.salon_operations import get_service_duration, get_available_slots
-from backend.calendar.google_calendar import create_event
-from backend.database.event_operations import insert_event
+from backend.database.salon_operations import get_service_duration, get_available_slots_for_service, get_busy_slots
+from backend.calendar.outbox_worker import booking_outbox_worker
+from backend.database.outbox_operations import make_booking_event_id, enqueue_booking, SlotTaken
+from backend.notifications.reminders import reminder_scheduler
+from backend.shared.time_utils import times_overlap
 
 # CONVERSATION IMPORT
 from modules.conversation.manager import conversation_manager
 
 # SECURITY IMPORT
 from backend.security.input_validator import InputValidator
+from backend.security.admission import admission_controller, AdmissionRejected, DEGRADED, SHED
+
+# SZALON KONTEXTUS
+from modules.salon.context import get_salon_context
+
+from .mailbox import ChatMailbox
+from .update_processor import ChatOrderedUpdateProcessor
+from .pipeline import MessageContext, pipeline_stats
+from .streaming import StreamingReply
 
 logger = logging.getLogger(__name__)
 
+BUSY_MESSAGE = "⏳ Most nagyon sokan írnak nekünk. Kérlek, próbáld újra pár perc múlva!"
+
+# Kinyerés + szándék + válasz egyetlen LLM hívásban (0 = külön hívások)
+LLM_COMBINED_MODE = os.getenv("LLM_COMBINED_MODE", "1") not in ("0", "false", "no")
+
+# AI válasz streamelése: helyőrző üzenet, majd throttled szerkesztések (0 = egyben küldés)
+LLM_STREAMING = os.getenv("LLM_STREAMING", "1") not in ("0", "false", "no")
+STREAM_EDIT_INTERVAL = float(os.getenv("TELEGRAM_EDIT_INTERVAL_SECONDS", "1.0"))
+
 # Globális AI szolgáltatások
 ai_services = {}
 
@@ -31,12 +54,13 @@ def initialize_ai_services(config: dict):
     global ai_services
     
     try:
-        gemini_api_key = config.get("gemini_api_key")
+        # LLM_PROVIDER: gemini (config / GEMINI_API_KEY kulccsal) vagy stub (hálózat nélküli terheléses teszt)
+        provider = create_llm_provider(config.get("gemini_api_key"))
         
-        if gemini_api_key:
-            ai_services['info_extractor'] = HybridInfoExtractor(gemini_api_key)
-            ai_services['response_generator'] = SmartResponseGenerator(gemini_api_key)
-            logger.info("✅ AI services initialized")
+        if provider:
+            ai_services['info_extractor'] = HybridInfoExtractor(provider=provider)
+            ai_services['response_generator'] = SmartResponseGenerator(provider=provider)
+            logger.info(f"✅ AI services initialized ({provider.name})")
         else:
             from modules.ai.info_extractor import info_extractor
             ai_services['info_extractor'] = info_extractor
@@ -50,124 +74,334 @@ def initialize_ai_services(config: dict):
         ai_services['response_generator'] = None
 
 async def handle_intelligent_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Intelligens üzenetkezelés - AI-INTEGRÁCIÓVAL"""
+    """Bejövő üzenet - chatenként sorba állítva, a gyors egymás utáni üzenetek összevonva"""
+    salon = get_salon_context(context)
+    key = (salon.name if salon else None, update.effective_chat.id)
+    # A tényleges feldolgozás is a bot párhuzamossági limitjén belül fut, és addig
+    # a processzor pending számában marad (webhook 503 backpressure)
+    processor = getattr(context.application, 'update_processor', None)
+    tracker = processor if isinstance(processor, ChatOrderedUpdateProcessor) else None
+    await message_mailbox.submit(key, update, context, update.message.text, tracker)
+
+async def process_intelligent_message(update: Update, context: ContextTypes.DEFAULT_TYPE, text: str):
+    """Egy (összevont) üzenet feldolgozása - a session egyszer töltődik be és egyszer íródik vissza"""
+    salon = get_salon_context(context)
+    async with conversation_manager.session_scope(salon.name if salon else None, update.effective_chat.id):
+        await _process_message(update, context, text)
+
+async def _process_message(update: Update, context: ContextTypes.DEFAULT_TYPE, text: str):
+    """Intelligens üzenetkezelés - szakaszolt pipeline (egy chat egyszerre egy futás)
+
+    validate után a független szakaszok (user, extract, intent, időpont
+    előtöltés) párhuzamosan futnak, így a késleltetés a leglassabb függőséghez
+    közelít; minden szakasz legfeljebb egyszer fut, a fel nem használtak a
+    végén megszakadnak. Kombinált módban a kinyerés, a szándék és a válasz
+    egyetlen LLM hívásból jön; ha az elbukik, a külön hívásos út fut.
+    """
+    ctx = None
     try:
         chat_id = update.effective_chat.id
         user_id = update.effective_user.id
         user_name = update.effective_user.full_name if update.effective_user else "Ismeretlen"
-        text = update.message.text
-
 
         logger.info(f"🔍 Üzenet: {user_name} ({user_id}): {text}")
 
-        # 🛡️ 1. BIZTONSÁGI ELLENŐRZÉS
-        is_valid, clean_text, validation_info = InputValidator.validate_input(text, user_id)
-        
-        if not is_valid:
-            if validation_info.get("injection_detected"):
-                logger.warning(f"🚨 Injection attempt blocked from user {user_id}")
-                await update.message.reply_text("Kérlek, használd a botot időpontfoglalásra! 😊")
-                return
-            else:
-                await update.message.reply_text("Kérlek, érvényes üzenetet küldj! 📝")
-                return
-
-        # 🏪 2. SZALON KONFIGURÁCIÓ
-        salon_configs = {k: v for k, v in context.bot_data.get('CONFIG', {}).items() 
-                        if isinstance(v, dict) and "token" in v}
-        
-        if not salon_configs:
+        # 🏪 SZALON KONTEXTUS (induláskor a bothoz csatolva)
+        salon = get_salon_context(context)
+        if salon is None:
             await update.message.reply_text("❌ Nincs szalon konfigurálva.")
             return
+        salon_name = salon.name
 
-        salon_name = next(iter(salon_configs.keys()))
-        cfg = salon_configs[salon_name]
-
-        # 🤖 3. AI SZOLGÁLTATÁSOK INICIALIZÁLÁSA (ha még nem történt meg)
+        # 🤖 AI SZOLGÁLTATÁSOK INICIALIZÁLÁSA (ha még nem történt meg)
         if not ai_services:
             initialize_ai_services(context.bot_data.get('CONFIG', {}))
 
-        # 👤 4. USER INFORMÁCIÓK LEKÉRÉSE
-        global_user_info = await get_global_user_info(chat_id)
-        
-        # 🔍 5. INFORMÁCIÓK KINYERÉSE (AI VAGY RULE-BASED)
-        info_extractor = ai_services.get('info_extractor')
-        
-        if not info_extractor:
-            # Fallback ha nincs AI
-            from modules.ai.info_extractor import info_extractor as fallback_extractor
-            extracted_info = await fallback_extractor.extract_all(clean_text, salon_name)
+        ctx = MessageContext(update, context, text, salon, chat_id, user_id)
+
+        # 🚦 TERHELÉS: túlterhelésnél azonnal "próbáld újra", lassulásnál csak szabályalapú feldolgozás
+        load_level = admission_controller.level(salon_name)
+        if load_level == SHED:
+            await update.message.reply_text(BUSY_MESSAGE)
+            return
+        # Nyitott LLM megszakító (lassú / hibás szolgáltató) = szabályalapú feldolgozás
+        ctx.degraded = load_level == DEGRADED or llm_executor.breaker.is_open()
+
+        # 🛡️ 1. BIZTONSÁGI ELLENŐRZÉS
+        if not await ctx.run_stage('validate', lambda: _stage_validate(ctx)):
+            return
+
+        # ⚡ FÜGGETLEN LEKÉRDEZÉSEK INDÍTÁSA - user adatok, és ha a session-ben
+        # már van dátum, az időpontok spekulatív előtöltése
+        ctx.start_stage('user', lambda: _stage_user(ctx))
+        session_info = conversation_manager.get_extracted_info(salon_name, chat_id)
+        _prefetch_slots(ctx, 'prefetch_session', session_info.get('date'), session_info.get('service'))
+
+        # 🧠 KOMBINÁLT MÓD: kinyerés + szándék + válasz egy LLM hívásban
+        combined = None
+        extracted_info = None
+        if _combined_mode_enabled(ctx):
+            combined = await ctx.run_stage('combined', lambda: _stage_combined(ctx, session_info))
+            if combined['reply'] is None:
+                # A kombinált hívás elbukott: a kinyerés már megvan, szándék és válasz külön
+                extracted_info = combined['extracted']
+                combined = None
+
+        # 🔍 2. INFORMÁCIÓK KINYERÉSE (AI VAGY RULE-BASED) - egyszer
+        if combined is None:
+            ctx.start_stage('intent', lambda: _stage_intent(ctx))
+            if extracted_info is None:
+                extracted_info = await ctx.run_stage('extract', lambda: _stage_extract(ctx))
         else:
-            # AI-alapú kinyerés
-            extracted_info = await info_extractor.extract_all(clean_text, salon_name)
-        
-        logger.info(f"🔍 Kinyert információk: {extracted_info}")
+            extracted_info = combined['extracted']
+            ctx.reply = combined['reply']
 
-        # ❓ ELŐSZÖR ELLENŐRIZZÜK A SZOLGÁLTATÁS SZÁNDÉKOT
-        services_intent = await detect_services_intent(clean_text, salon_name, info_extractor)
+        # 📅 Dátum megvan → időpontok előtöltése, amíg a szándékra várunk
+        _prefetch_slots(
+            ctx, 'prefetch_extract',
+            extracted_info.get('date') or session_info.get('date'),
+            extracted_info.get('service') or session_info.get('service')
+        )
+
+        # ❓ 3. SZOLGÁLTATÁS SZÁNDÉK - egyszer
+        if combined is not None:
+            services_intent = combined['services_intent']
+        else:
+            services_intent = await ctx.run_stage('intent', lambda: _stage_intent(ctx))
         if services_intent:
             # ✅ HA SZOLGÁLTATÁSOKAT KÉR, CSAK AZT KÜLDI
-            return await handle_services_inquiry(update, salon_name)
-
-        # 💬 6. SESSION FRISSÍTÉSE
-        conversation_manager.update_session(salon_name, chat_id, extracted_info, global_user_info)
-        
-        # 📅 7. SZABAD IDŐPONTOK LEKÉRÉSE
-        available_slots = []
-        current_info = conversation_manager.get_extracted_info(salon_name, chat_id)
-        current_date = current_info.get('date')
-        current_service = current_info.get('service', 'Hajvágás')
-        
-        if current_date:
-            try:
-                service_duration = await get_service_duration(salon_name, current_service)
-                calendar_id = cfg.get("calendar_id")
-                available_slots = await get_available_slots(salon_name, current_date, service_duration, calendar_id)
-                
-                formatted_slots = []
-                for slot in available_slots[:8]:
-                    if hasattr(slot, 'strftime'):
-                        formatted_slots.append(slot.strftime("%H:%M"))
-                    else:
-                        formatted_slots.append(str(slot))
-                
-                available_slots = formatted_slots
-                logger.info(f"🔍 Elérhető időpontok: {available_slots}")
-                
-            except Exception as e:
-                logger.error(f"Hiba az időpontok lekérésekor: {e}")
-                available_slots = []
-    
-    # 🔄 IDŐSZAK FELDOLGOZÁSA - ha időszakot adott meg, de nincs pontos idő
-        extracted_info = await info_extractor.extract_all(clean_text, salon_name)
-        
-        # ✅ HA IDŐSZAKOT ADOTT MEG, DE NINCS PONTOS IDŐ
-        if extracted_info.get('time_period') and not extracted_info.get('time'):
-            # Szűrjük az elérhető időpontokat az időszak alapján
-            available_slots = await _filter_slots_by_period(available_slots, extracted_info['time_period'])
-            logger.info(f"🔍 Időszak alapján szűrt időpontok ({extracted_info['time_period']}): {available_slots}")
-        # ❓ 8. HIÁNYZÓ INFORMÁCIÓK ELLENŐRZÉSE
-        missing_info = conversation_manager.get_missing_info(salon_name, chat_id)
-        
-        if not missing_info:
-            # ✅ MINDEN INFORMÁCIÓ MEGVAN - FOGLALÁS
-            await confirm_and_book_appointment(update, salon_name, cfg, chat_id)
+            await ctx.run_stage('respond', lambda: handle_services_inquiry(update, salon_name))
+            conversation_manager.record_exchange(salon_name, chat_id, ctx.clean_text, "📋 (szolgáltatás lista elküldve)")
             return
-        else:
-            # ❌ HIÁNYZÓ INFORMÁCIÓK - VÁLASZ GENERÁLÁS
-            response = await generate_intelligent_response(
-                clean_text, missing_info, available_slots, salon_name, chat_id
-            )
-            await update.message.reply_text(response)
-        services_intent = await detect_services_intent(clean_text, salon_name, info_extractor)
 
-        if services_intent:
-            return await handle_services_inquiry(update, salon_name)
+        # 💬 4. SESSION FRISSÍTÉSE (globális user adatokkal)
+        current_info = await ctx.run_stage('session', lambda: _stage_session(ctx, extracted_info))
 
+        # 📅 5. SZABAD IDŐPONTOK (időszak szerint szűrve)
+        available_slots = await ctx.run_stage('availability', lambda: _stage_availability(ctx, current_info))
+
+        # 💬 6. FOGLALÁS VAGY VÁLASZ
+        await ctx.run_stage('respond', lambda: _stage_respond(ctx, available_slots))
             
+    except AdmissionRejected as e:
+        logger.warning(f"🚦 Nincs szabad kapacitás ({e}), az üzenet elutasítva")
+        await update.message.reply_text(BUSY_MESSAGE)
     except Exception as e:
         logger.error(f"❌ Hiba az intelligens üzenetkezelésben: {e}")
         await update.message.reply_text("❌ Hiba történt. Kérlek, próbáld újra!")
+    finally:
+        if ctx is not None:
+            cancelled = ctx.cancel_pending()
+            if cancelled:
+                logger.debug(f"🛑 {cancelled} fel nem használt szakasz megszakítva ({ctx.chat_id})")
+            pipeline_stats.record(ctx)
+            logger.info(f"⏱️ Pipeline ({ctx.chat_id}): {ctx.format_timings()}")
+
+def _prefetch_slots(ctx: MessageContext, stage: str, date, service: Optional[str]):
+    """Nyers szabad időpontok spekulatív lekérése (időtartam, nyitvatartás, Calendar egyszerre)"""
+    if not date:
+        return
+    key = (date, service or 'Hajvágás')
+    if key in ctx.prefetch:
+        return
+    ctx.prefetch[key] = stage
+    ctx.start_stage(stage, lambda: _fetch_slots(ctx, key[0], key[1]))
+
+async def _fetch_slots(ctx: MessageContext, date, service: str):
+    async with admission_controller.slot(ctx.salon_name, 'calendar'):
+        return await get_available_slots_for_service(ctx.salon_name, date, service, ctx.salon.calendar_id)
+
+def _combined_mode_enabled(ctx: MessageContext) -> bool:
+    return (LLM_COMBINED_MODE and not ctx.degraded
+            and ai_services.get('response_generator') is not None
+            and hasattr(ai_services.get('info_extractor'), 'extract_combined'))
+
+def _session_date_slots(ctx: MessageContext, session_info) -> List[str]:
+    """A session dátumára már előtöltött szabad időpontok (HH:MM) a kombinált prompthoz.
+
+    Nem vár a Calendar lekérésre: ha még nem érkezett meg, a prompt időpontok nélkül megy.
+    """
+    key = (session_info.get('date'), session_info.get('service') or 'Hajvágás')
+    stage = ctx.prefetch.get(key)
+    available_slots = ctx.result(stage) if stage is not None else None
+    if not available_slots:
+        return []
+    return [slot.strftime("%H:%M") if hasattr(slot, 'strftime') else str(slot) for slot in available_slots[:16]]
+
+async def _stage_combined(ctx: MessageContext, session_info) -> dict:
+    """Egyetlen LLM hívás (reply None esetén szándék és válasz a külön hívásos úton)"""
+    global_user_info = await ctx.run_stage('user', lambda: _stage_user(ctx))
+    slots = _session_date_slots(ctx, session_info)
+    known_info = dict(session_info)
+    for field in ('name', 'phone'):
+        if not known_info.get(field) and global_user_info.get(field):
+            known_info[field] = global_user_info[field]
+    
+    history = conversation_manager.get_conversation_history(ctx.salon_name, ctx.chat_id)
+    # LLM helyet csak a tényleges kombinált hívás foglal (a szabályalapú előszűrés nem)
+    return await ai_services['info_extractor'].extract_combined(
+        ctx.clean_text, ctx.salon_name, known_info, slots, history,
+        ai_slot=lambda: admission_controller.slot(ctx.salon_name, 'llm')
+    )
+
+async def _stage_validate(ctx: MessageContext) -> bool:
+    """Bemenet validálása - érvénytelen üzenetre itt válaszolunk"""
+    is_valid, clean_text, validation_info = InputValidator.validate_input(ctx.text, ctx.user_id)
+    
+    if not is_valid:
+        if validation_info.get("injection_detected"):
+            logger.warning(f"🚨 Injection attempt blocked from user {ctx.user_id}")
+            await ctx.update.message.reply_text("Kérlek, használd a botot időpontfoglalásra! 😊")
+        else:
+            await ctx.update.message.reply_text("Kérlek, érvényes üzenetet küldj! 📝")
+        return False
+    
+    ctx.clean_text = clean_text
+    return True
+
+def _get_info_extractor():
+    info_extractor = ai_services.get('info_extractor')
+    if not info_extractor:
+        # Fallback ha nincs AI
+        from modules.ai.info_extractor import info_extractor as fallback_extractor
+        return fallback_extractor
+    return info_extractor
+
+async def _stage_extract(ctx: MessageContext) -> dict:
+    """Információk kinyerése az üzenetből (terhelés alatt csak szabályalapúan)"""
+    from modules.ai.info_extractor import info_extractor as rule_based_extractor
+    
+    info_extractor = rule_based_extractor if ctx.degraded else _get_info_extractor()
+    if info_extractor is rule_based_extractor:
+        extracted_info = await info_extractor.extract_all(ctx.clean_text, ctx.salon_name)
+    else:
+        # A session-ben (és a globális user adatokban) már meglévő mezőket nem kérjük az AI-tól;
+        # LLM helyet csak a tényleges AI hívás foglal
+        known_info = dict(conversation_manager.get_extracted_info(ctx.salon_name, ctx.chat_id))
+        for field, value in (ctx.result('user') or {}).items():
+            known_info.setdefault(field, value)
+        extracted_info = await info_extractor.extract_all(
+            ctx.clean_text, ctx.salon_name, known_info,
+            ai_slot=lambda: admission_controller.slot(ctx.salon_name, 'llm')
+        )
+    logger.info(f"🔍 Kinyert információk: {extracted_info}")
+    return extracted_info
+
+async def _stage_intent(ctx: MessageContext) -> bool:
+    """Szolgáltatás lista kérés felismerése (terhelés alatt kulcsszavas)"""
+    info_extractor = ai_services.get('info_extractor')
+    if ctx.degraded or not hasattr(info_extractor, 'extract_services_intent'):
+        return await detect_services_intent(ctx.clean_text, ctx.salon_name, None)
+    async with admission_controller.slot(ctx.salon_name, 'llm'):
+        return await detect_services_intent(ctx.clean_text, ctx.salon_name, info_extractor)
+
+async def _stage_user(ctx: MessageContext) -> dict:
+    """Globális user adatok (név, telefon)"""
+    async with admission_controller.slot(ctx.salon_name, 'db'):
+        return await get_global_user_info(ctx.chat_id)
+
+async def _stage_session(ctx: MessageContext, extracted_info: dict):
+    """Session frissítése - visszaadja az összesített kinyert adatokat"""
+    global_user_info = await ctx.run_stage('user', lambda: _stage_user(ctx))
+    conversation_manager.update_session(ctx.salon_name, ctx.chat_id, extracted_info, global_user_info)
+    return conversation_manager.get_extracted_info(ctx.salon_name, ctx.chat_id)
+
+async def _stage_availability(ctx: MessageContext, current_info) -> List[str]:
+    """Szabad időpontok a kiválasztott napra - időszak szerint szűrve, formázva"""
+    current_date = current_info.get('date')
+    if not current_date:
+        return []
+    
+    current_service = current_info.get('service') or 'Hajvágás'
+    try:
+        # Az előtöltött lekérdezés újrahasznosítása, ha ugyanarra a napra/szolgáltatásra szól
+        key = (current_date, current_service)
+        stage = ctx.prefetch.get(key)
+        for other_key, other_stage in ctx.prefetch.items():
+            if other_key != key and ctx.cancel_stage(other_stage):
+                logger.debug(f"🛑 Felesleges előtöltés megszakítva: {other_stage}")
+        
+        if stage is None:
+            available_slots = await _fetch_slots(ctx, current_date, current_service)
+        else:
+            available_slots = await ctx.run_stage(stage, None)
+        
+        # 🔄 HA IDŐSZAKOT ADOTT MEG, DE NINCS PONTOS IDŐ - a levágás előtt szűrünk
+        time_period = current_info.get('time_period')
+        if time_period and not current_info.get('time'):
+            available_slots = await _filter_slots_by_period(available_slots, time_period)
+            logger.info(f"🔍 Időszak alapján szűrve ({time_period}): {len(available_slots)} időpont")
+        
+        formatted_slots = []
+        for slot in available_slots[:8]:
+            if hasattr(slot, 'strftime'):
+                formatted_slots.append(slot.strftime("%H:%M"))
+            else:
+                formatted_slots.append(str(slot))
+        
+        logger.info(f"🔍 Elérhető időpontok: {formatted_slots}")
+        return formatted_slots
+        
+    except Exception as e:
+        logger.error(f"Hiba az időpontok lekérésekor: {e}")
+        return []
+
+async def _stage_respond(ctx: MessageContext, available_slots: List[str]):
+    """Foglalás, ha minden adat megvan - egyébként a hiányzó adatot kérdezzük"""
+    missing_info = conversation_manager.get_missing_info(ctx.salon_name, ctx.chat_id)
+    
+    if not missing_info:
+        # ✅ MINDEN INFORMÁCIÓ MEGVAN - FOGLALÁS
+        await confirm_and_book_appointment(ctx.update, ctx.salon_name, ctx.salon.config, ctx.chat_id)
+        return
+    
+    # ❌ HIÁNYZÓ INFORMÁCIÓK - VÁLASZ GENERÁLÁS (terhelés alatt sablonból)
+    if ctx.reply:
+        # A kombinált hívás már megírta - nincs újabb LLM kör
+        response = ctx.reply
+    elif ctx.degraded or not ai_services.get('response_generator'):
+        response = await generate_rule_based_response(missing_info, available_slots, ctx.salon_name)
+    else:
+        async with admission_controller.slot(ctx.salon_name, 'llm'):
+            if LLM_STREAMING:
+                # A válasz darabonként jelenik meg - nem várjuk meg a teljes generálást
+                chunks = ai_services['response_generator'].stream_conversational_response(
+                    ctx.clean_text, missing_info, available_slots,
+                    _conversation_context(ctx.salon_name, ctx.chat_id, missing_info)
+                )
+                reply = StreamingReply(ctx.update.message, min_interval=STREAM_EDIT_INTERVAL)
+                await reply.start()
+                try:
+                    async for chunk in chunks:
+                        await reply.push(chunk)
+                except StreamInterrupted as e:
+                    # A félbemaradt szöveg helyére (és az előzménybe) a tartalék válasz kerül
+                    response = await reply.finish(final_text=e.fallback)
+                else:
+                    response = await reply.finish()
+                ctx.timings['first_text'] = reply.time_to_first_text
+                conversation_manager.record_exchange(ctx.salon_name, ctx.chat_id, ctx.clean_text, response)
+                return
+            response = await generate_intelligent_response(
+                ctx.clean_text, missing_info, available_slots, ctx.salon_name, ctx.chat_id
+            )
+    await ctx.update.message.reply_text(response)
+    # Előzmény a következő promptokhoz (token keret fölött összefoglalóvá tömörül)
+    conversation_manager.record_exchange(ctx.salon_name, ctx.chat_id, ctx.clean_text, response)
+
+# Chatenkénti postafiók: egy löketnyi üzenet = egy kinyerés / egy foglalás
+message_mailbox = ChatMailbox(
+    process_intelligent_message,
+    debounce=float(os.getenv("MESSAGE_DEBOUNCE_SECONDS", "0.8")),
+    max_delay=float(os.getenv("MESSAGE_DEBOUNCE_MAX_SECONDS", "3.0"))
+)
+
+def _conversation_context(salon_name: str, chat_id: int, missing_info: List[str]) -> dict:
+    return {
+        'previous_responses': conversation_manager.get_conversation_history(salon_name, chat_id),
+        'missing_info': missing_info,
+        'salon_name': salon_name
+    }
 
 async def generate_intelligent_response(text: str, missing_info: List[str], available_slots: List[str], 
                                        salon_name: str, chat_id: int) -> str:
@@ -177,14 +411,8 @@ async def generate_intelligent_response(text: str, missing_info: List[str], avai
         
         if response_generator:
             # 🧠 AI-ALAPÚ VÁLASZ
-            conversation_context = {
-                'previous_responses': conversation_manager.get_conversation_history(salon_name, chat_id),
-                'missing_info': missing_info,
-                'salon_name': salon_name
-            }
-            
             return await response_generator.generate_conversational_response(
-                text, missing_info, available_slots, conversation_context
+                text, missing_info, available_slots, _conversation_context(salon_name, chat_id, missing_info)
             )
         else:
             # 📋 RULE-BASED VÁLASZ (fallback)
@@ -257,10 +485,6 @@ async def confirm_and_book_appointment(update: Update, salon_name: str, cfg: dic
         # ⏱️ 3. SZOLGÁLTATÁS IDŐTARTAMÁNAK LEKÉRÉSE
         service_duration = await get_service_duration(salon_name, appointment_data['service'])
 
-        # 👤 4. USER MENTÉSE
-        await insert_global_user(appointment_data['name'], chat_id, appointment_data['phone'])
-        
-        # 📅 5. CALENDAR ESEMÉNY LÉTREHOZÁSA
         appointment_datetime = datetime.datetime.combine(
             appointment_data['date'], 
             appointment_data['time']
@@ -269,37 +493,42 @@ async def confirm_and_book_appointment(update: Update, salon_name: str, cfg: dic
         end_datetime = appointment_datetime + datetime.timedelta(minutes=service_duration)
         event_summary = f"{appointment_data['service']} - {appointment_data['name']} ({appointment_data['phone']})"
         
-        # ⚠️ JAVÍTÁS: chat_id PARAMÉTER ELTÁVOLÍTÁSA
-        event = create_event(
-            start_dt=appointment_datetime,
-            calendar_id=cfg["calendar_id"],
-            service_name=event_summary,
-            duration_minutes=service_duration
-        )
+        # 🔒 4. FOGLALTSÁG ÚJRAELLENŐRZÉSE (Calendar + még szinkronra váró foglalások)
+        busy_slots = await get_busy_slots(salon_name, appointment_data['date'], cfg.get('calendar_id'))
+        if busy_slots and any(times_overlap(appointment_datetime.time(), end_datetime.time(), busy_start, busy_end)
+                              for busy_start, busy_end in busy_slots):
+            await reoffer_taken_slot(update, salon_name, cfg, chat_id, appointment_data)
+            return
         
-        # 💾 6. ESEMÉNY MENTÉSE AZ ADATBÁZISBA - JAVÍTOTT IDŐPONT ADATOKKAL
-        # ⭐ JAVÍTÁS: Időpont adatok formázása és átadása
-        event_date = appointment_datetime.strftime('%Y-%m-%d')  # '2024-01-15'
-        start_time = appointment_datetime.strftime('%H:%M')     # '14:00'
-        end_time = end_datetime.strftime('%H:%M')               # '15:00'
-        
-        print(f"🎯 INSERT_EVENT WITH TIME DATA:")
-        print(f"   event_date: {event_date}")
-        print(f"   start_time: {start_time}")
-        print(f"   end_time: {end_time}")
-        
-        await insert_event(
-            salon_name=salon_name,
-            chat_id=chat_id,
-            event_id=event['id'],
-            service=appointment_data['service'],
-            event_date=event_date,    # ✅ Dátum
-            start_time=start_time,    # ✅ Kezdési idő
-            end_time=end_time,        # ✅ Befejezési idő
-            status=0
+        # 📥 5. FOGLALÁS RÖGZÍTÉSE AZ OUTBOXBA (lokális tranzakció, ütközés-ellenőrzéssel)
+        # A Calendar eseményt a háttér worker hozza létre ugyanezzel az ID-val
+        event_id = make_booking_event_id(
+            salon_name, chat_id, update.message.message_id,
+            appointment_datetime, appointment_data['service']
         )
+        try:
+            is_saved = await enqueue_booking(
+                salon_name=salon_name,
+                chat_id=chat_id,
+                event_id=event_id,
+                service=appointment_data['service'],
+                summary=event_summary,
+                start_dt=appointment_datetime,
+                duration_minutes=service_duration
+            )
+        except SlotTaken:
+            # Egy párhuzamos megerősítés megelőzött
+            await reoffer_taken_slot(update, salon_name, cfg, chat_id, appointment_data)
+            return
+        
+        if not is_saved:
+            await update.message.reply_text("❌ Hiba történt az időpont foglalása során.")
+            return
+        
+        booking_outbox_worker.notify()
+        reminder_scheduler.add_booking(salon_name, event_id, chat_id, appointment_data['service'], appointment_datetime)
         
-        # 🎉 7. SIKERES VISSZAIGAZOLÁS
+        # 🎉 6. SIKERES VISSZAIGAZOLÁS - csak a lokális commitra várunk
         formatted_time = appointment_datetime.strftime("%Y.%m.%d. %H:%M")
         formatted_end_time = end_datetime.strftime("%H:%M")
         
@@ -307,6 +536,9 @@ async def confirm_and_book_appointment(update: Update, salon_name: str, cfg: dic
         await update.message.reply_text(success_message)
         logger.info(f"✅ Időpont foglalva: {appointment_data['name']} - {formatted_time}")
         
+        # 👤 7. USER MENTÉSE (a visszaigazolás után)
+        await insert_global_user(appointment_data['name'], chat_id, appointment_data['phone'])
+        
         # 🧹 8. SESSION TÖRLÉSE
         conversation_manager.clear_session(salon_name, chat_id)
         
@@ -314,6 +546,26 @@ async def confirm_and_book_appointment(update: Update, salon_name: str, cfg: dic
         logger.error(f"❌ Hiba az időpont foglalásánál: {e}")
         await update.message.reply_text("❌ Hiba történt az időpont foglalása során.")
 
+async def reoffer_taken_slot(update: Update, salon_name: str, cfg: dict, chat_id: int, appointment_data):
+    """A kért időpont időközben betelt - az időt töröljük a sessionből és új időpontokat ajánlunk"""
+    date = appointment_data['date']
+    available_slots = await get_available_slots_for_service(
+        salon_name, date, appointment_data['service'], cfg.get('calendar_id')
+    )
+    formatted_slots = [slot.strftime("%H:%M") for slot in available_slots[:8]]
+    # Az időt (üres napnál a dátumot is) újra kérdezzük
+    conversation_manager.forget_fields(salon_name, chat_id, *(('time',) if formatted_slots else ('time', 'date')))
+    if formatted_slots:
+        message = (f"😔 Sajnos a {appointment_data['time'].strftime('%H:%M')} időpontot közben lefoglalták.\n"
+                   f"Szabad időpontok {date.strftime('%Y.%m.%d.')}: {', '.join(formatted_slots)}\n"
+                   f"Melyik legyen?")
+    else:
+        message = (f"😔 Sajnos a {appointment_data['time'].strftime('%H:%M')} időpontot közben lefoglalták, "
+                   f"és {date.strftime('%Y.%m.%d.')} napra nincs több szabad hely. Melyik másik nap jó?")
+    await update.message.reply_text(message)
+    conversation_manager.record_exchange(salon_name, chat_id, bot_text=message)
+    logger.info(f"⛔ Foglalt időpont, újraajánlás ({salon_name}, {chat_id}): {len(formatted_slots)} időpont")
+
 async def generate_success_message(appointment_data: dict, salon_name: str, formatted_time: str, formatted_end_time: str) -> str:
     """Sikeres foglalás üzenet generálása"""
     try:
@@ -387,7 +639,7 @@ async def handle_services_inquiry(update: Update, salon_name: str):
         await update.message.reply_text("❌ Hiba történt a szolgáltatások lekérése során.")
         return True
 # chatbot/modules/handlers/messages.py - ÚJ SEGÉDFÜGGVÉNY
-async def _filter_slots_by_period(self, available_slots: List[str], time_period: str) -> List[str]:
+async def _filter_slots_by_period(available_slots: List, time_period: str) -> List:
     """Időpontok szűrése időszak alapján"""
     try:
         filtered_slots = []
@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Szakaszok a feldolgozás sorrendjében
+PIPELINE_STAGES = ('validate', 'user', 'prefetch_session', 'combined', 'extract', 'prefetch_extract', 'intent',
+                   'session', 'availability', 'respond')
+
+
+class MessageContext:
+    """Egy (összevont) üzenet feldolgozási állapota.
+
+    Minden szakasz eredménye memoizált: ugyanazt a szakaszt többször kérve
+    is legfeljebb egyszer fut le (párhuzamos kérők ugyanarra a futásra
+    várnak), és a futási ideje a `timings`-be kerül.
+    """
+
+    def __init__(self, update, context, text: str, salon, chat_id: int, user_id: int):
+        self.update = update
+        self.context = context
+        self.text = text
+        self.salon = salon  # SalonContext
+        self.salon_name = salon.name
+        self.chat_id = chat_id
+        self.user_id = user_id
+        self.clean_text: Optional[str] = None
+        self.degraded = False  # terhelés alatt: csak szabályalapú kinyerés / válasz
+        self.reply: Optional[str] = None  # a kombinált LLM hívás által már megírt válasz
+        self.timings: Dict[str, float] = {}
+        self.prefetch: Dict[Hashable, str] = {}  # előtöltés kulcsa -> szakasz neve
+        self._stages: Dict[str, asyncio.Future] = {}
+        self._started = time.perf_counter()
+
+    def start_stage(self, name: str, func: Callable[[], Awaitable[Any]]) -> asyncio.Future:
+        """Szakasz indítása a háttérben (ha még nem fut) - nem vár az eredményre"""
+        stage = self._stages.get(name)
+        if stage is None:
+            stage = asyncio.ensure_future(self._timed(name, func))
+            self._stages[name] = stage
+        return stage
+
+    async def run_stage(self, name: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Szakasz futtatása (vagy a már kiszámolt eredmény visszaadása)"""
+        return await self.start_stage(name, func)
+
+    def cancel_stage(self, name: str) -> bool:
+        """Még futó szakasz megszakítása (pl. feleslegessé vált előtöltés)"""
+        stage = self._stages.get(name)
+        if stage is None or stage.done():
+            return False
+        stage.cancel()
+        return True
+
+    def cancel_pending(self) -> int:
+        """Minden még futó szakasz megszakítása - a feldolgozás után nem marad árva task"""
+        cancelled = 0
+        for stage in self._stages.values():
+            if not stage.done():
+                stage.cancel()
+                cancelled += 1
+            elif not stage.cancelled():
+                stage.exception()  # a fel nem használt hiba ne kerüljön a loop naplójába
+        return cancelled
+
+    def has_run(self, name: str) -> bool:
+        return name in self._stages
+
+    def result(self, name: str, default: Any = None) -> Any:
+        """Lefutott szakasz eredménye (várakozás nélkül)"""
+        stage = self._stages.get(name)
+        if stage is None or not stage.done() or stage.cancelled() or stage.exception():
+            return default
+        return stage.result()
+
+    async def _timed(self, name: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        started = time.perf_counter()
+        try:
+            return await func()
+        finally:
+            self.timings[name] = time.perf_counter() - started
+
+    def total_time(self) -> float:
+        return time.perf_counter() - self._started
+
+    def format_timings(self) -> str:
+        """Szakaszidők naplózáshoz (ms)"""
+        parts = [f"{name}={self.timings[name] * 1000:.0f}ms" for name in PIPELINE_STAGES if name in self.timings]
+        parts.extend(f"{name}={value * 1000:.0f}ms" for name, value in self.timings.items() if name not in PIPELINE_STAGES)
+        parts.append(f"total={self.total_time() * 1000:.0f}ms")
+        return " ".join(parts)
+
+
+class PipelineStats:
+    """Szakaszidők összesítése (átlag, max) minden feldolgozott üzenetre"""
+
+    def __init__(self):
+        self.messages = 0
+        self._totals: Dict[str, float] = {}
+        self._counts: Dict[str, int] = {}
+        self._max: Dict[str, float] = {}
+
+    def record(self, ctx: MessageContext):
+        self.messages += 1
+        for name, value in list(ctx.timings.items()) + [('total', ctx.total_time())]:
+            self._totals[name] = self._totals.get(name, 0.0) + value
+            self._counts[name] = self._counts.get(name, 0) + 1
+            self._max[name] = max(self._max.get(name, 0.0), value)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'messages': self.messages,
+            'stages': {
+                name: {
+                    'runs': self._counts[name],
+                    'avg_ms': round(self._totals[name] / self._counts[name] * 1000, 1),
+                    'max_ms': round(self._max[name] * 1000, 1),
+                }
+                for name in self._totals
+            }
+        }
+
+
+pipeline_stats = PipelineStats()
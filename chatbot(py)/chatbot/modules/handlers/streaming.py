@@ -0,0 +1,126 @@
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from telegram.error import BadRequest, RetryAfter
+
+logger = logging.getLogger(__name__)
+
+PLACEHOLDER_TEXT = "✍️ ..."
+_CURSOR = " ▌"
+
+
+class StreamingStats:
+    """Streamelt válaszok mérőszámai (első látható szöveg ideje, szerkesztések)"""
+
+    def __init__(self):
+        self.replies = 0
+        self.edits = 0
+        self.skipped_edits = 0   # throttling / RetryAfter miatt kihagyva
+        self.failed_edits = 0
+        self._ttft_total = 0.0
+        self._ttft_count = 0
+        self._ttft_max = 0.0
+
+    def record_first_text(self, seconds: float):
+        self._ttft_total += seconds
+        self._ttft_count += 1
+        self._ttft_max = max(self._ttft_max, seconds)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'replies': self.replies,
+            'edits': self.edits,
+            'skipped_edits': self.skipped_edits,
+            'failed_edits': self.failed_edits,
+            'time_to_first_text_avg_ms': round(self._ttft_total / self._ttft_count * 1000, 1) if self._ttft_count else 0.0,
+            'time_to_first_text_max_ms': round(self._ttft_max * 1000, 1),
+        }
+
+
+class StreamingReply:
+    """Egy válasz fokozatos megjelenítése: helyőrző üzenet, majd throttled edit_text.
+
+    Chatenként legfeljebb `min_interval` másodpercenként szerkesztünk (Telegram
+    limit), és csak ha legalább `min_chars` új karakter jött; RetryAfter esetén
+    a megadott ideig nem szerkesztünk. A `finish` mindig a teljes szöveget írja ki.
+    """
+
+    def __init__(self, message, min_interval: float = 1.0, min_chars: int = 20,
+                 stats: StreamingStats = None, clock=time.monotonic):
+        self.message = message          # a felhasználó üzenete (erre válaszolunk)
+        self.min_interval = min_interval
+        self.min_chars = min_chars
+        self.stats = stats or streaming_stats
+        self._clock = clock
+        self._started = clock()
+        self._sent = None               # a helyőrző / szerkesztett bot üzenet
+        self._text = ""
+        self._shown = ""
+        self._last_edit = 0.0
+        self._blocked_until = 0.0
+        self.time_to_first_text: Optional[float] = None
+
+    async def start(self):
+        """Helyőrző üzenet küldése - a felhasználó azonnal lát visszajelzést"""
+        self._sent = await self.message.reply_text(PLACEHOLDER_TEXT)
+        self.stats.replies += 1
+
+    async def push(self, chunk: str):
+        """Új darab hozzáfűzése - szerkesztés csak, ha a throttling engedi"""
+        if not chunk:
+            return
+        self._text += chunk
+        now = self._clock()
+        if self.time_to_first_text is None and now >= self._blocked_until:
+            # Az első darab azonnal megjelenik
+            if await self._edit(self._text + _CURSOR):
+                self.time_to_first_text = now - self._started
+                self.stats.record_first_text(self.time_to_first_text)
+            return
+        if (now - self._last_edit < self.min_interval or now < self._blocked_until
+                or len(self._text) + len(_CURSOR) - len(self._shown) < self.min_chars):
+            self.stats.skipped_edits += 1
+            return
+        await self._edit(self._text + _CURSOR)
+
+    async def finish(self, final_text: str = None) -> str:
+        """Végleges szöveg kiírása (kurzor nélkül) - a megjelenített szöveggel tér vissza"""
+        text = (final_text if final_text is not None else self._text).strip()
+        if self._sent is None:
+            await self.message.reply_text(text)
+        elif text != self._shown:
+            if self._clock() < self._blocked_until:
+                logger.debug("⏳ RetryAfter alatt a végleges szerkesztés új üzenetként megy ki")
+                await self.message.reply_text(text)
+            elif not await self._edit(text):
+                await self.message.reply_text(text)
+        if self.time_to_first_text is None:
+            self.time_to_first_text = self._clock() - self._started
+            self.stats.record_first_text(self.time_to_first_text)
+        return text
+
+    async def _edit(self, text: str) -> bool:
+        try:
+            await self._sent.edit_text(text)
+        except RetryAfter as e:
+            retry_after = e.retry_after
+            seconds = retry_after.total_seconds() if hasattr(retry_after, 'total_seconds') else float(retry_after)
+            self._blocked_until = self._clock() + seconds
+            self.stats.failed_edits += 1
+            return False
+        except BadRequest as e:
+            if 'not modified' in str(e).lower():
+                self._shown = text
+                return True
+            logger.warning(f"⚠️ Üzenet szerkesztési hiba: {e}")
+            self.stats.failed_edits += 1
+            return False
+        self._shown = text
+        self._last_edit = self._clock()
+        self.stats.edits += 1
+        return True
+
+
+# Globális streaming mérőszám példány
+streaming_stats = StreamingStats()
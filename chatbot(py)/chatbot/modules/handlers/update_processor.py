@@ -0,0 +1,131 @@
+import asyncio
+import contextlib
+import logging
+from typing import Any, AsyncIterator, Awaitable, Dict, Optional
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+logger = logging.getLogger(__name__)
+
+# Szalon neve -> processzor (in-flight mérőszámokhoz)
+_processors: Dict[str, 'ChatOrderedUpdateProcessor'] = {}
+
+
+class _ChatLock:
+    """Egy chat zárja és a rá várakozó update-ek száma"""
+
+    __slots__ = ('lock', 'users')
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.users = 0
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """Párhuzamos update feldolgozás, chaten belül érkezési sorrendben.
+
+    Legfeljebb `max_concurrent_updates` update fut egyszerre; ugyanannak a
+    chatnek az update-jei egy FIFO zárral egymás után futnak, így egy lassú
+    válasz csak a saját chatjét tartja fel, a szalon többi ügyfelét nem.
+    A háttér sorba (postafiók) adott munka is ezen a limiten belül fut
+    (`work_slot`), és a befejezéséig a `pending` része marad.
+    """
+
+    def __init__(self, max_concurrent_updates: int, salon_name: str):
+        super().__init__(max_concurrent_updates)
+        self.salon_name = salon_name
+        self._chats: Dict[int, _ChatLock] = {}
+        self._work_slots = asyncio.Semaphore(max_concurrent_updates)
+        self.in_flight = 0
+        self.accepted = 0  # átvett, még be nem fejezett update-ek (a limitre várók is)
+        self.deferred = 0  # postafiókba adott, még fel nem dolgozott update-ek
+        self.stats = {'processed': 0, 'failed': 0, 'peak_in_flight': 0}
+        _processors[salon_name] = self
+
+    @property
+    def pending(self) -> int:
+        """Feldolgozásra váró / futó update-ek (a webhook backpressure ezt nézi)"""
+        return self.accepted + self.deferred
+
+    def defer(self):
+        """Update átadva egy háttér sornak - a `finish_deferred` hívásig pending marad"""
+        self.deferred += 1
+
+    def finish_deferred(self, count: int = 1):
+        self.deferred -= count
+
+    @contextlib.asynccontextmanager
+    async def work_slot(self) -> AsyncIterator[None]:
+        """Tényleges feldolgozás a `max_concurrent_updates` limiten belül (in-flight mérés)"""
+        async with self._work_slots:
+            self.in_flight += 1
+            self.stats['peak_in_flight'] = max(self.stats['peak_in_flight'], self.in_flight)
+            try:
+                yield
+            finally:
+                self.in_flight -= 1
+
+    @staticmethod
+    def _chat_id(update: Any) -> Optional[int]:
+        if isinstance(update, Update) and update.effective_chat:
+            return update.effective_chat.id
+        return None
+
+    async def process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        self.accepted += 1
+        try:
+            await super().process_update(update, coroutine)
+        finally:
+            self.accepted -= 1
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        chat_id = self._chat_id(update)
+        if chat_id is None:
+            await self._run(coroutine)
+            return
+
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            chat = _ChatLock()
+            self._chats[chat_id] = chat
+        chat.users += 1
+        try:
+            async with chat.lock:
+                await self._run(coroutine)
+        finally:
+            chat.users -= 1
+            if chat.users == 0 and self._chats.get(chat_id) is chat:
+                del self._chats[chat_id]
+
+    async def _run(self, coroutine: Awaitable[Any]):
+        async with self.work_slot():
+            try:
+                await coroutine
+                self.stats['processed'] += 1
+            except Exception:
+                self.stats['failed'] += 1
+                raise
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        """In-flight mérőszám és számlálók"""
+        return {
+            'in_flight': self.in_flight,
+            'pending': self.pending,
+            'deferred': self.deferred,
+            'active_chats': len(self._chats),
+            'waiting': sum(chat.users - chat.lock.locked() for chat in self._chats.values()),
+            'limit': self.max_concurrent_updates,
+            **self.stats,
+        }
+
+
+def get_update_processor_stats() -> Dict[str, Dict[str, Any]]:
+    """Szalononkénti in-flight mérőszámok"""
+    return {salon_name: processor.get_stats() for salon_name, processor in _processors.items()}
@@ -0,0 +1,8 @@
+# chatbot/modules/salon/__init__.py
+from .context import SalonContext, build_salon_context, get_salon_context
+
+__all__ = [
+    'SalonContext',
+    'build_salon_context',
+    'get_salon_context'
+]
@@ -0,0 +1,53 @@
+import logging
+from types import MappingProxyType
+from typing import Any, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SalonContext:
+    """Egy bot szalonjának előre összeállított, megváltoztathatatlan környezete.
+
+    Induláskor egyszer épül fel és az Application `bot_data`-jába kerül, így
+    a handlerek üzenetenként O(1) idő alatt érik el (nincs CONFIG bejárás).
+    """
+
+    __slots__ = ('name', 'token', 'database', 'calendar_id', 'service_account_file',
+                 'config', 'notification_queue')
+
+    def __init__(self, name: str, config: Mapping[str, Any], notification_queue=None):
+        set_field = super().__setattr__
+        set_field('name', name)
+        set_field('token', config.get('token'))
+        set_field('database', config.get('database') or name)
+        set_field('calendar_id', config.get('calendar_id'))
+        set_field('service_account_file', config.get('service_account_file'))
+        set_field('config', MappingProxyType(dict(config)))
+        set_field('notification_queue', notification_queue)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"A SalonContext nem módosítható ({name})")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"A SalonContext nem módosítható ({name})")
+
+    def __repr__(self) -> str:
+        return f"SalonContext({self.name!r}, calendar_id={self.calendar_id!r})"
+
+
+def build_salon_context(salon_name: str, config: Mapping[str, Any], application=None) -> SalonContext:
+    """SalonContext összeállítása és (ha van Application) csatolása a bothoz"""
+    notification_queue = None
+    if application is not None:
+        from backend.notifications.telegram_queue import get_notification_queue
+        notification_queue = get_notification_queue(application)
+
+    salon = SalonContext(salon_name, config, notification_queue)
+    if application is not None:
+        application.bot_data['salon_context'] = salon
+    return salon
+
+
+def get_salon_context(context) -> Optional[SalonContext]:
+    """A handler botjához tartozó SalonContext (None, ha nincs beállítva)"""
+    return context.bot_data.get('salon_context')
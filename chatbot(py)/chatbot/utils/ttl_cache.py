@@ -0,0 +1,144 @@
+import collections
+import sys
+import time
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class TTLCache:
+    """Korlátos méretű cache tétlenségi TTL-lel és LRU kiszorítással.
+
+    A bejegyzések utolsó hozzáférés szerinti sorrendben vannak (OrderedDict),
+    így a lejárt elemek mindig a sor elején gyűlnek: a takarítás amortizáltan,
+    minden `sweep_every`-edik műveletnél csak a legrégebbi elemeket nézi.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 3600.0,
+                 sweep_every: int = 64, on_evict: Callable[[Hashable, Any, str], None] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.sweep_every = sweep_every
+        self.on_evict = on_evict
+        self._clock = clock
+
+        self._data: "collections.OrderedDict[Hashable, list]" = collections.OrderedDict()  # key -> [value, last_access]
+        self._ops = 0
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'expired': 0,
+            'evicted_lru': 0,
+            'sweeps': 0,
+        }
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._data.get(key)
+        return entry is not None and not self._is_expired(entry, self._clock())
+
+    def _is_expired(self, entry: list, now: float) -> bool:
+        return now - entry[1] > self.ttl_seconds
+
+    def _tick(self, now: float):
+        """Amortizált takarítás: N műveletenként a sor eleje"""
+        self._ops += 1
+        if self._ops >= self.sweep_every:
+            self._ops = 0
+            self.sweep(now)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Érték lekérése (és frissítése legutóbb használtnak)"""
+        now = self._clock()
+        self._tick(now)
+        entry = self._data.get(key)
+        if entry is None or self._is_expired(entry, now):
+            if entry is not None:
+                self._evict(key, 'expired')
+            self.stats['misses'] += 1
+            return default
+        entry[1] = now
+        self._data.move_to_end(key)
+        self.stats['hits'] += 1
+        return entry[0]
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """Érték lekérése, hiányzó / lejárt kulcsnál létrehozása"""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = factory()
+            self.set(key, value)
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        """Érték beállítása; telítettségnél a legrégebben használt esik ki"""
+        now = self._clock()
+        self._tick(now)
+        if key in self._data:
+            self._data.move_to_end(key)
+        self._data[key] = [value, now]
+        while len(self._data) > self.max_entries:
+            oldest = next(iter(self._data))
+            self._evict(oldest, 'evicted_lru')
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Bejegyzés eltávolítása (nem számít kiszorításnak)"""
+        entry = self._data.pop(key, None)
+        return default if entry is None else entry[0]
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Lejárt bejegyzések eltávolítása a sor elejéről"""
+        now = self._clock() if now is None else now
+        removed = 0
+        while self._data:
+            key, entry = next(iter(self._data.items()))
+            if not self._is_expired(entry, now):
+                break
+            self._evict(key, 'expired')
+            removed += 1
+        self.stats['sweeps'] += 1
+        return removed
+
+    def _evict(self, key: Hashable, reason: str):
+        entry = self._data.pop(key)
+        self.stats[reason] += 1
+        if self.on_evict is not None:
+            self.on_evict(key, entry[0], reason)
+
+    def clear(self):
+        self._data.clear()
+
+    def approx_memory_bytes(self) -> int:
+        """Hozzávetőleges memóriahasználat (sekély méret, O(n))"""
+        total = sys.getsizeof(self._data)
+        for key, entry in self._data.items():
+            total += sys.getsizeof(key) + sys.getsizeof(entry) + _shallow_size(entry[0])
+        return total
+
+    def get_stats(self, with_memory: bool = False) -> Dict[str, Any]:
+        """Cache metrikák (méret, találati arány, kiszorítások)"""
+        lookups = self.stats['hits'] + self.stats['misses']
+        stats = {
+            'size': len(self._data),
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl_seconds,
+            'hit_rate': round(self.stats['hits'] / lookups, 3) if lookups else None,
+            **self.stats,
+        }
+        if with_memory:
+            stats['approx_memory_bytes'] = self.approx_memory_bytes()
+        return stats
+
+
+_MISSING = object()
+
+
+def _shallow_size(value: Any) -> int:
+    """Érték mérete egy szint mélységig (dict / list tartalommal)"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set)):
+        size += sum(sys.getsizeof(v) for v in value)
+    return size
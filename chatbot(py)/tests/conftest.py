@@ -0,0 +1,5 @@
+import os
+import sys
+
+# A bot modulok a chatbot mappából importálnak (modules..., utils...)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'chatbot'))
@@ -0,0 +1,139 @@
+import datetime
+import json
+
+import pytest
+
+from modules.ai.combined_response import CombinedResponseError, build_combined_prompt, parse_combined_response
+
+SERVICES = ['Hajvágás', 'Festés']
+
+
+def payload(**overrides):
+    data = {
+        'service': None, 'date': None, 'time': None, 'time_period': None,
+        'name': None, 'phone': None, 'confidence': 0.8,
+        'services_intent': False, 'reply': 'Melyik napra szeretnéd? 📅',
+    }
+    data.update(overrides)
+    return json.dumps(data, ensure_ascii=False)
+
+
+def test_valid_response():
+    result = parse_combined_response(payload(
+        service='Hajvágás', date='2026-10-20', time='14:30', name='Kiss Anna', phone='+36301234567'
+    ), SERVICES)
+
+    assert result['services_intent'] is False
+    assert result['reply'] == 'Melyik napra szeretnéd? 📅'
+    extracted = result['extracted']
+    assert extracted['service'] == 'Hajvágás'
+    assert extracted['date'] == datetime.date(2026, 10, 20)
+    assert extracted['time'] == datetime.time(14, 30)
+    assert extracted['name'] == 'Kiss Anna'
+    assert extracted['phone'] == '+36301234567'
+    assert extracted['confidence'] == 0.8
+
+
+@pytest.mark.parametrize('raw', [
+    '```json\n' + payload() + '\n```',
+    '```\n' + payload() + '\n```',
+    '  ' + payload() + '\n',
+])
+def test_code_fenced_json(raw):
+    assert parse_combined_response(raw)['reply'] == 'Melyik napra szeretnéd? 📅'
+
+
+@pytest.mark.parametrize('raw', [
+    'Szívesen segítek!',
+    '[1, 2]',
+    '',
+])
+def test_not_a_json_object(raw):
+    with pytest.raises(CombinedResponseError):
+        parse_combined_response(raw)
+
+
+@pytest.mark.parametrize('value', ['true', 1, None, 'igen'])
+def test_services_intent_must_be_bool(value):
+    with pytest.raises(CombinedResponseError):
+        parse_combined_response(payload(services_intent=value))
+
+
+def test_services_intent_missing():
+    data = json.loads(payload())
+    del data['services_intent']
+    with pytest.raises(CombinedResponseError):
+        parse_combined_response(json.dumps(data))
+
+
+@pytest.mark.parametrize('reply', ['', '   ', None, 'null', 'x' * 1001, 42])
+def test_empty_oversized_or_non_text_reply(reply):
+    with pytest.raises(CombinedResponseError):
+        parse_combined_response(payload(reply=reply))
+
+
+def test_reply_at_length_limit():
+    assert len(parse_combined_response(payload(reply='x' * 1000))['reply']) == 1000
+
+
+@pytest.mark.parametrize('field, value', [
+    ('date', '2026-13-01'),
+    ('date', '20.10.2026'),
+    ('date', 'holnap'),
+    ('time', '25:00'),
+    ('time', '14.30'),
+    ('time', 'délután'),
+])
+def test_bad_date_or_time(field, value):
+    with pytest.raises(CombinedResponseError):
+        parse_combined_response(payload(**{field: value}))
+
+
+def test_unknown_time_period():
+    with pytest.raises(CombinedResponseError):
+        parse_combined_response(payload(time_period='este'))
+    result = parse_combined_response(payload(date='2026-10-20', time_period='délután'))
+    assert result['extracted']['time_period'] == 'délután'
+
+
+@pytest.mark.parametrize('value', ['0.5', True, None])
+def test_confidence_must_be_number(value):
+    with pytest.raises(CombinedResponseError):
+        parse_combined_response(payload(confidence=value))
+
+
+def test_confidence_is_clamped():
+    assert parse_combined_response(payload(confidence=3))['extracted']['confidence'] == 1.0
+    assert parse_combined_response(payload(confidence=-1))['extracted']['confidence'] == 0.0
+
+
+def test_null_strings_are_none():
+    extracted = parse_combined_response(payload(name='null', phone='  ', date='null'))['extracted']
+    assert extracted['name'] is None
+    assert extracted['phone'] is None
+    assert extracted['date'] is None
+
+
+def test_service_mapped_to_catalog():
+    assert parse_combined_response(payload(service='hajvágás'), SERVICES)['extracted']['service'] == 'Hajvágás'
+    assert parse_combined_response(payload(service='Balayage'), SERVICES)['extracted']['service'] is None
+    # Katalógus nélkül a név változatlan marad
+    assert parse_combined_response(payload(service='Balayage'))['extracted']['service'] == 'Balayage'
+
+
+def test_non_string_field_rejected():
+    with pytest.raises(CombinedResponseError):
+        parse_combined_response(payload(name=123))
+
+
+def test_prompt_requests_only_given_fields():
+    today = datetime.date(2026, 10, 19)
+    full = build_combined_prompt('holnap 10-kor', SERVICES, {}, [], today=today)
+    partial = build_combined_prompt('holnap 10-kor', SERVICES, {}, [], today=today, fields=('service', 'name'))
+    reply_only = build_combined_prompt('holnap 10-kor', SERVICES, {'date': today}, ['10:00'], today=today, fields=())
+
+    assert 'csak ezeket' not in full
+    assert 'csak ezeket: service, name' in partial
+    assert 'adatot nem kell kinyerni' in reply_only
+    assert '"date": "2026-10-19"' in reply_only
+    assert '2026-10-19 (hétfő)' in full
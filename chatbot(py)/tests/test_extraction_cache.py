@@ -0,0 +1,42 @@
+import datetime
+
+import pytest
+
+from modules.ai.extraction_cache import ExtractionCache, is_absolute_date_text
+
+SERVICES = ['Hajvágás', 'Festés']
+
+
+@pytest.mark.parametrize('text', [
+    'holnap 14.30',
+    'holnap 14.30-kor',
+    'holnap 14:30',
+    'holnap 10.30.',
+    'kedd 12.30-ra',
+    '06-20-123-4567 a számom',
+])
+def test_times_and_phone_numbers_are_not_absolute_dates(text):
+    assert not is_absolute_date_text(text)
+
+
+@pytest.mark.parametrize('text', [
+    '2026.10.20 10:00',
+    '10.20.',
+    '10.20-án 14.30',
+    'október 20',
+    'szept. 3',
+])
+def test_calendar_dates_are_absolute(text):
+    assert is_absolute_date_text(text)
+
+
+def test_relative_date_with_time_is_shifted_to_today():
+    today = [datetime.date(2026, 10, 19)]
+    cache = ExtractionCache(today=lambda: today[0])
+    cache.set('holnap 14.30', SERVICES, {'date': datetime.date(2026, 10, 20), 'time': '14:30'})
+
+    today[0] = datetime.date(2026, 10, 22)
+    result = cache.get('holnap 14.30', SERVICES)
+
+    assert result['date'] == datetime.date(2026, 10, 23)
+    assert result['time'] == '14:30'
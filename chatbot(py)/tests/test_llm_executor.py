@@ -0,0 +1,277 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from modules.ai.llm_executor import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, LLMExecutor, LLMTimeout, LLMUnavailable
+from modules.ai.llm_provider import StubProvider
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_breaker(threshold=2, reset=30.0):
+    clock = FakeClock()
+    return CircuitBreaker(failure_threshold=threshold, reset_timeout=reset, clock=clock), clock
+
+
+# --- CircuitBreaker ---
+
+def test_breaker_opens_after_threshold():
+    breaker, _ = make_breaker(threshold=2)
+    breaker.record_failure()
+    assert breaker.state == CLOSED and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.is_open()
+    assert not breaker.allow()
+    assert breaker.stats['opened'] == 1
+
+
+def test_half_open_allows_single_probe():
+    breaker, clock = make_breaker(threshold=1, reset=30.0)
+    breaker.record_failure()
+    clock.now += 29.9
+    assert not breaker.allow()
+
+    clock.now += 0.2
+    assert not breaker.is_open()
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()  # a próba még fut
+
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.allow() and breaker.allow()
+
+
+def test_failed_probe_reopens():
+    breaker, clock = make_breaker(threshold=3, reset=10.0)
+    for _ in range(3):
+        breaker.record_failure()
+    clock.now += 10.0
+    assert breaker.allow()
+    breaker.record_failure()  # egyetlen hiba félig nyitva is visszanyit
+    assert breaker.state == OPEN
+    assert breaker.stats['opened'] == 2
+    assert not breaker.allow()
+
+
+def test_release_frees_the_probe():
+    breaker, clock = make_breaker(threshold=1, reset=5.0)
+    breaker.record_failure()
+    clock.now += 5.0
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+
+
+def test_cancelled_call_releases_probe_without_failure():
+    breaker, clock = make_breaker(threshold=1, reset=5.0)
+    executor = LLMExecutor(max_workers=2, hedge=False, breaker=breaker)
+    breaker.record_failure()
+    clock.now += 5.0
+
+    async def main():
+        started = asyncio.Event()
+
+        async def hang():
+            started.set()
+            await asyncio.sleep(10)
+
+        task = asyncio.ensure_future(executor._guarded(hang, deadline=10))
+        await started.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    assert breaker.state == HALF_OPEN
+    assert executor.stats['errors'] == 0 and executor.stats['timeouts'] == 0
+    assert breaker.allow()
+
+
+def test_open_breaker_short_circuits_calls():
+    breaker, _ = make_breaker(threshold=1)
+    breaker.record_failure()
+    executor = LLMExecutor(max_workers=1, hedge=False, breaker=breaker)
+    with pytest.raises(LLMUnavailable):
+        asyncio.run(executor.call(lambda: 'nem fut le'))
+    assert executor.stats['short_circuited'] == 1
+    assert executor.stats['calls'] == 0
+
+
+def test_call_timeout_records_failure():
+    breaker, _ = make_breaker(threshold=5)
+    executor = LLMExecutor(max_workers=1, hedge=False, breaker=breaker)
+    with pytest.raises(LLMTimeout):
+        asyncio.run(executor.call(lambda: time.sleep(0.2), deadline=0.02))
+    executor.shutdown()
+    assert executor.stats['timeouts'] == 1
+    assert breaker.failures == 1
+
+
+# --- hedge ---
+
+def make_hedging_executor(max_workers=2):
+    executor = LLMExecutor(max_workers=max_workers, hedge=True, hedge_min_delay=0.02, min_samples=1,
+                           breaker=CircuitBreaker(failure_threshold=5))
+    executor.latency.record(0.01)
+    return executor
+
+
+def first_call_behaves(first, then):
+    """Az első hívás `first`, minden további `then` szerint fut"""
+    calls = []
+    lock = threading.Lock()
+
+    def func():
+        with lock:
+            calls.append(None)
+            index = len(calls)
+        return (first if index == 1 else then)()
+    return func, calls
+
+
+def test_hedge_wins_when_primary_is_slow():
+    executor = make_hedging_executor()
+    func, calls = first_call_behaves(lambda: time.sleep(0.5) or 'lassú', lambda: 'gyors')
+    assert asyncio.run(executor.call(func, deadline=2)) == 'gyors'
+    executor.shutdown()
+    assert len(calls) == 2
+    assert executor.stats['hedged'] == 1
+    assert executor.stats['hedge_wins'] == 1
+
+
+def test_hedge_survives_primary_error():
+    executor = make_hedging_executor()
+
+    def fail():
+        time.sleep(0.05)
+        raise RuntimeError('elsődleges hiba')
+
+    func, _ = first_call_behaves(fail, lambda: time.sleep(0.1) or 'tartalék')
+    assert asyncio.run(executor.call(func, deadline=2)) == 'tartalék'
+    executor.shutdown()
+    assert executor.stats['hedge_wins'] == 1
+    assert executor.breaker.failures == 0
+
+
+def test_primary_wins_and_loser_is_cancelled():
+    executor = make_hedging_executor(max_workers=3)
+    release = threading.Event()
+    func, calls = first_call_behaves(lambda: time.sleep(0.05) or 'elsődleges',
+                                     lambda: release.wait(2) or 'hedge')
+    assert asyncio.run(executor.call(func, deadline=2)) == 'elsődleges'
+    release.set()
+    executor.shutdown()
+    assert executor.stats['hedged'] == 1
+    assert executor.stats['hedge_wins'] == 0
+
+
+def test_no_hedge_without_free_worker():
+    executor = make_hedging_executor(max_workers=1)
+    func, calls = first_call_behaves(lambda: time.sleep(0.1) or 'egyetlen', lambda: 'hedge')
+    assert asyncio.run(executor.call(func, deadline=2)) == 'egyetlen'
+    executor.shutdown()
+    assert len(calls) == 1
+    assert executor.stats['hedged'] == 0
+
+
+def test_no_hedge_before_enough_samples():
+    executor = LLMExecutor(max_workers=2, hedge=True, min_samples=20)
+    assert executor.hedge_delay() is None
+    for _ in range(20):
+        executor.latency.record(0.2)
+    assert executor.hedge_delay() == pytest.approx(0.5)  # hedge_min_delay alatt nem indul
+
+
+# --- stream ---
+
+async def collect(executor, provider, **kwargs):
+    chunks = []
+    stream = executor.stream(lambda: provider.open_stream('válasz'), **kwargs)
+    try:
+        async for chunk in stream:
+            chunks.append(chunk)
+    finally:
+        await stream.aclose()
+    return chunks
+
+
+def test_stream_success_closes_breaker():
+    breaker, clock = make_breaker(threshold=1, reset=1.0)
+    breaker.record_failure()
+    clock.now += 1.0
+    executor = LLMExecutor(breaker=breaker)
+    provider = StubProvider(latency=0, chunk_delay=0, responses={'reply': 'Holnap 10:00 jó?'})
+
+    chunks = asyncio.run(collect(executor, provider))
+
+    assert ''.join(chunks) == 'Holnap 10:00 jó?'
+    assert breaker.state == CLOSED
+    assert executor.stats['calls'] == 1
+
+
+def test_stream_chunk_gap_times_out():
+    breaker, _ = make_breaker(threshold=5)
+    executor = LLMExecutor(breaker=breaker)
+    provider = StubProvider(latency=0, chunk_delay=0.2, responses={'reply': 'egy kettő'})
+
+    with pytest.raises(LLMTimeout):
+        asyncio.run(collect(executor, provider, chunk_timeout=0.02))
+    assert executor.stats['timeouts'] == 1
+    assert breaker.failures == 1
+
+
+def test_stream_overall_deadline():
+    breaker, _ = make_breaker(threshold=5)
+    executor = LLMExecutor(breaker=breaker)
+    provider = StubProvider(latency=0, chunk_delay=0.03, responses={'reply': ' '.join(['szó'] * 20)})
+
+    chunks = []
+
+    async def main():
+        stream = executor.stream(lambda: provider.open_stream('válasz'), chunk_timeout=1.0, deadline=0.1)
+        async for chunk in stream:
+            chunks.append(chunk)
+
+    with pytest.raises(LLMTimeout):
+        asyncio.run(main())
+    assert 0 < len(chunks) < 20
+    assert breaker.failures == 1
+
+
+def test_stream_open_timeout():
+    executor = LLMExecutor(deadline=0.02, breaker=CircuitBreaker(failure_threshold=5))
+    provider = StubProvider(latency=0.5)
+
+    with pytest.raises(LLMTimeout):
+        asyncio.run(collect(executor, provider))
+    assert executor.stats['timeouts'] == 1
+
+
+def test_stream_closed_by_consumer_releases_probe():
+    breaker, clock = make_breaker(threshold=1, reset=1.0)
+    breaker.record_failure()
+    clock.now += 1.0
+    executor = LLMExecutor(breaker=breaker)
+    provider = StubProvider(latency=0, chunk_delay=0, responses={'reply': 'egy kettő három'})
+
+    async def main():
+        stream = executor.stream(lambda: provider.open_stream('válasz'))
+        first = await stream.__anext__()
+        await stream.aclose()
+        return first
+
+    assert asyncio.run(main()) == 'egy '
+    assert breaker.state == HALF_OPEN
+    assert breaker.failures == 1  # a megszakítás nem számít hibának
+    assert breaker.allow()
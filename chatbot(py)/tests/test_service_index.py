@@ -0,0 +1,76 @@
+import time
+
+import pytest
+
+from modules.ai.service_index import ServiceIndex, fold_accents
+
+SERVICES = ['Hajvágás', 'Festés', 'Melírozás', 'Férfi hajvágás', 'Női hajvágás', 'Szakáll igazítás']
+
+
+@pytest.fixture(scope='module')
+def index():
+    return ServiceIndex(SERVICES)
+
+
+def test_fold_accents():
+    assert fold_accents('Hajvágás ŐSZ') == 'hajvagas osz'
+
+
+@pytest.mark.parametrize('text, service', [
+    ('hajvagasra jönnék holnap', 'Hajvágás'),
+    ('melirozas', 'Melírozás'),
+    ('HAJVÁGÁS', 'Hajvágás'),
+    ('szeretnék egy hajvágást', 'Hajvágás'),
+    ('festést kérnék', 'Festés'),
+    ('ferfi hajvagas', 'Férfi hajvágás'),
+    ('szakall igazitasra', 'Szakáll igazítás'),
+])
+def test_typos_accents_and_suffixes(index, text, service):
+    match = index.match(text)
+    assert match is not None
+    assert match[0] == service
+    assert 0.8 <= match[1] <= 1.0
+
+
+@pytest.mark.parametrize('text', [
+    'holnap 14:00',
+    'jó napot kívánok',
+    'igen, az jó lesz',
+    'Kiss Anna 06301234567',
+])
+def test_non_service_text_stays_below_threshold(index, text):
+    assert index.match(text) is None
+
+
+def test_threshold_is_configurable():
+    assert ServiceIndex(['Melírozás']).match('melirzas') is not None
+    assert ServiceIndex(['Melírozás'], min_score=0.99).match('melirzas') is None
+
+
+def test_full_multi_word_name_beats_its_own_word(index):
+    # "hajvágás" a két többszavas névben is szerepel: a teljes egyezés nyer,
+    # a többszavas megnevezésnél pedig a hosszabb (teljes) név
+    assert index.match('hajvágás')[0] == 'Hajvágás'
+    assert index.match('női hajvágásra jönnék')[0] == 'Női hajvágás'
+
+
+def test_shared_word_goes_to_first_listed_service():
+    index = ServiceIndex(['Férfi hajvágás', 'Női hajvágás'])
+    assert index.match('hajvágás')[0] == 'Férfi hajvágás'
+    assert index.match('női hajvágás')[0] == 'Női hajvágás'
+
+
+def test_empty_index():
+    index = ServiceIndex([])
+    assert len(index) == 0
+    assert index.match('hajvágás') is None
+
+
+def test_match_latency(index):
+    text = 'holnap délután hajvagasra jönnék szeretettel'
+    runs = 200
+    started = time.perf_counter()
+    for _ in range(runs):
+        index.match(text)
+    # ~0.3 ms / üzenet; bő keret, hogy lassú CI-n se legyen instabil
+    assert (time.perf_counter() - started) / runs < 0.005